@@ -0,0 +1,85 @@
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Sends the same /analyze request to one of the servers at different
+# concurrency levels and reports throughput and latency for each level.
+# While the load is running, /get_transcript (if the server has it) is
+# probed to show whether other endpoints still answer.
+
+SERVERS = {
+    "distilbert": "http://localhost:8001",
+    "sentiment": "http://localhost:8002",
+    "custom": "http://localhost:8003",
+}
+
+
+def timed_post(url, payload):
+    start = time.perf_counter()
+    response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
+    return response.status_code, time.perf_counter() - start
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_level(base_url, payload, total_requests, concurrency, probe):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, ThreadPoolExecutor(max_workers=1) as probe_pool:
+        start = time.perf_counter()
+        futures = [pool.submit(timed_post, f"{base_url}/analyze", payload) for _ in range(total_requests)]
+        probe_future = None
+        if probe:
+            # Give the load a moment to build up before probing
+            time.sleep(0.1)
+            probe_future = probe_pool.submit(timed_post, f"{base_url}/get_transcript", {"video_id": "benchmark"})
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for _, latency in results]
+    errors = sum(1 for status, _ in results if status != 200)
+    row = {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "throughput_rps": total_requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+    if probe_future is not None:
+        row["get_transcript_ms"] = probe_future.result()[1] * 1000
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent request throughput benchmark")
+    parser.add_argument("--server", choices=SERVERS.keys(), default="sentiment")
+    parser.add_argument("--url", help="Base URL of the server (overrides --server)")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma separated concurrency levels")
+    parser.add_argument("--comment", default="I really enjoy this channel. Your card manipulation skills are mind blowing.")
+    parser.add_argument("--transcript", default="", help="Transcript to send as context")
+    args = parser.parse_args()
+
+    base_url = args.url or SERVERS[args.server]
+    payload = {"comment": args.comment, "transcript": args.transcript, "video_id": "benchmark"}
+    probe = args.server != "distilbert"
+
+    rows = []
+    for concurrency in [int(level) for level in args.concurrency.split(",")]:
+        print(f"Running {args.requests} requests with concurrency {concurrency} against {base_url} ...")
+        rows.append(run_level(base_url, payload, args.requests, concurrency, probe))
+
+    print()
+    print(json.dumps(rows, indent=2))
+    baseline = rows[0]["throughput_rps"]
+    for row in rows:
+        print(f"concurrency {row['concurrency']:>3}: {row['throughput_rps']:8.2f} req/s "
+              f"(x{row['throughput_rps'] / baseline:.2f}), p50 {row['p50_ms']:.0f} ms, p95 {row['p95_ms']:.0f} ms"
+              + (f", /get_transcript {row['get_transcript_ms']:.0f} ms" if "get_transcript_ms" in row else ""))
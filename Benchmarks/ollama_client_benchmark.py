@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import OllamaClient
+
+# Compares the per-request overhead of a plain requests.post (new TCP
+# connection for every comment) with the pooled keep-alive OllamaClient.
+# Run it against stub_ollama_server.py with --delay 0 so that only the
+# HTTP overhead is measured.
+
+PAYLOAD = {
+    "model": "benchmark",
+    "prompt": "Analyze the sentiment of the YouTube comment",
+    "stream": False,
+    "format": {
+        "type": "object",
+        "properties": {
+            "sentiment": {"enum": ["POSITIVE", "NEUTRAL", "NEGATIVE"]},
+            "reasoning": {"type": "string"}
+        },
+        "required": ["sentiment", "reasoning"]
+    },
+}
+
+
+def time_requests(send, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<24} mean {statistics.mean(latencies) * 1000:7.3f} ms, "
+          f"median {statistics.median(latencies) * 1000:7.3f} ms")
+    return statistics.mean(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ollama client connection overhead benchmark")
+    parser.add_argument("--url", default="http://localhost:11434/api/generate")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    def unpooled():
+        response = requests.post(args.url, json=PAYLOAD, headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+        return response.json()
+
+    client = OllamaClient(args.url)
+
+    # Warm up both paths once
+    unpooled()
+    client.generate(PAYLOAD)
+
+    unpooled_mean = report("requests.post", time_requests(unpooled, args.requests))
+    pooled_mean = report("OllamaClient (pooled)", time_requests(lambda: client.generate(PAYLOAD), args.requests))
+    print(f"\nOverhead saved per request: {(unpooled_mean - pooled_mean) * 1000:.3f} ms "
+          f"({(1 - pooled_mean / unpooled_mean) * 100:.0f}%)")
+    client.close()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+
+# Checks that Ollama's own reuse of the KV cache for a shared prompt prefix
+# does not change the answers. The servers put the per-video part of the
+# prompt (instructions and transcript) first, so consecutive comments on a
+# video share it and Ollama only evaluates the new comment. Every comment is
+# answered twice at temperature 0:
+#   cold: after an unrelated prompt, so nothing of the prefix is cached
+#   warm: right after another comment with the same prefix
+# and the answers must be identical. Run Ollama with OLLAMA_NUM_PARALLEL=1,
+# so both requests land on the same cache slot.
+
+# Helper modules shared by the servers and scripts live in shared/; the
+# prompt is the one of the Ollama Sentiment server (sentiment_prompt.py)
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "shared"))
+sys.path.insert(0, os.path.join(HERE, "..", "Ollama Sentiment Classification"))
+from ollama_client import OLLAMA_URL, OllamaClient
+from sentiment_prompt import build_prompt, default_schema
+
+DEFAULT_COMMENTS = [
+    "This is the best explanation I have seen so far, thank you!",
+    "The audio is way too quiet in the second half.",
+    "I don't agree with the part about batteries at all.",
+    "Watched it twice, still not sure what the conclusion was.",
+]
+
+
+def generate(client, model, prompt, num_ctx):
+    return client.generate({
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "format": default_schema,
+        "options": {"temperature": 0, "seed": 1, "num_ctx": num_ctx},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare answers with and without Ollama's prompt prefix reuse")
+    parser.add_argument("--url", default=OLLAMA_URL)
+    parser.add_argument("--model", default="mistral-small:22b")
+    parser.add_argument("--transcript", default=None, help="Text file with a transcript (default: a short sample)")
+    parser.add_argument("--comments", nargs="+", default=DEFAULT_COMMENTS)
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    args = parser.parse_args()
+
+    if args.transcript:
+        with open(args.transcript, 'r', encoding='utf-8') as file:
+            transcript = file.read()
+    else:
+        transcript = "Today we compare three electric cars on range, charging speed and price. " * 40
+
+    client = OllamaClient(args.url)
+    mismatches = 0
+    cold_tokens = []
+    warm_tokens = []
+    for index, comment in enumerate(args.comments):
+        prompt = build_prompt(transcript, comment)
+
+        # Cold: an unrelated prompt first, so no prefix is cached
+        generate(client, args.model, "Reply with OK.", args.num_ctx)
+        cold = generate(client, args.model, prompt, args.num_ctx)
+        # Warm: the same prefix with another comment first
+        other = args.comments[index - 1] if len(args.comments) > 1 else comment + " (again)"
+        generate(client, args.model, build_prompt(transcript, other), args.num_ctx)
+        warm = generate(client, args.model, prompt, args.num_ctx)
+
+        cold_tokens.append(cold.get("prompt_eval_count") or 0)
+        warm_tokens.append(warm.get("prompt_eval_count") or 0)
+        same = cold["response"] == warm["response"]
+        mismatches += not same
+        print(f"[{index + 1}] {'same' if same else 'DIFFERENT'}: prompt tokens evaluated cold {cold_tokens[-1]}, warm {warm_tokens[-1]}")
+        if not same:
+            print(f"    cold: {cold['response']}\n    warm: {warm['response']}")
+
+    print(f"\n{len(args.comments) - mismatches}/{len(args.comments)} answers identical; "
+          f"prompt tokens evaluated per comment: cold {sum(cold_tokens) / len(cold_tokens):.0f}, "
+          f"warm {sum(warm_tokens) / len(warm_tokens):.0f}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
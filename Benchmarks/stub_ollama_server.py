@@ -0,0 +1,126 @@
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A stand-in for the Ollama API used by the benchmarks. /api/generate sleeps
+# for a fixed time and answers with a response that matches the requested JSON
+# schema, so the servers and batch scripts can be benchmarked without a model.
+# With "stream": true the response comes in pieces of a few characters, one
+# every TOKEN_DELAY seconds, followed by a final chunk with the durations.
+
+DELAY = 0.0
+TOKEN_DELAY = 0.0
+# Characters per streamed piece
+TOKEN_CHARS = 4
+# Comment IDs of batch prompts ("[1] ...")
+BATCH_ID_PATTERN = re.compile(r"^\s*\[(\d+)\] ", re.MULTILINE)
+
+
+def stub_value(schema, ids=()):
+    # Build the simplest value that satisfies the (sub)schema. Arrays of
+    # objects with an "id" get one entry per comment ID of a batch prompt.
+    if "enum" in schema:
+        return schema["enum"][0]
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return {name: stub_value(prop, ids) for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        items = schema.get("items")
+        if items is None:
+            return []
+        if "id" in items.get("properties", {}):
+            return [dict(stub_value(items), id=comment_id) for comment_id in ids]
+        return [stub_value(items)] * schema.get("minItems", 0)
+    if schema_type in ("integer", "number"):
+        return 0
+    return "stub"
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this keep-alive
+    # connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(DELAY)
+
+        schema = payload.get("format")
+        if isinstance(schema, dict):
+            ids = [int(comment_id) for comment_id in BATCH_ID_PATTERN.findall(payload.get("prompt", ""))]
+            response = json.dumps(stub_value(schema, ids))
+        else:
+            response = ""
+        if payload.get("stream") is True:
+            self.stream(payload, response)
+            return
+        body = json.dumps({
+            "model": payload.get("model"),
+            "response": response,
+            "done": True,
+            "context": [1, 2, 3],
+            "total_duration": int(DELAY * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": len(payload.get("prompt", "").split()),
+            "prompt_eval_duration": int(DELAY * 1e9 / 2),
+            "eval_count": 1,
+            "eval_duration": int(DELAY * 1e9 / 2),
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, payload, response):
+        # Newline-delimited JSON chunks, in chunked transfer encoding
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [response[i:i + TOKEN_CHARS] for i in range(0, len(response), TOKEN_CHARS)]
+        chunks = [{"model": payload.get("model"), "response": piece, "done": False} for piece in pieces]
+        chunks.append({
+            "model": payload.get("model"),
+            "response": "",
+            "done": True,
+            "context": [1, 2, 3],
+            "total_duration": int((DELAY + TOKEN_DELAY * len(pieces)) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": len(payload.get("prompt", "").split()),
+            "prompt_eval_duration": int(DELAY * 1e9),
+            "eval_count": len(pieces),
+            "eval_duration": int(TOKEN_DELAY * len(pieces) * 1e9),
+        })
+        try:
+            for chunk in chunks:
+                data = json.dumps(chunk).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+                if not chunk["done"]:
+                    time.sleep(TOKEN_DELAY)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, like a cancelled Ollama generation
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Ollama server for benchmarks")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds each generation takes")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between the pieces of a streamed response")
+    args = parser.parse_args()
+
+    DELAY = args.delay
+    TOKEN_DELAY = args.token_delay
+    print(f"Stub Ollama server listening on port {args.port} (delay {DELAY}s)")
+    ThreadingHTTPServer(("0.0.0.0", args.port), StubOllamaHandler).serve_forever()
@@ -2,20 +2,81 @@ import streamlit as st
 import requests
 import json
 import os
+import sys
 import csv
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill
 import pandas as pd
 from datetime import datetime
 import time
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import get_client
+from batch_prompt import BATCH_INSTRUCTIONS, classify_comments, format_batch_input, make_batch_schema
 
 # Function to parse the Ollama API response to JSON
-def parse_response_to_json(response):
-    parsed_response = response.json()
+def parse_response_to_json(parsed_response):
     json_response_string = parsed_response['response']
     json_response = json.loads(json_response_string)
     return json_response
 
+# Function to process uploaded files in batch prompt mode: several files per
+# Ollama request, falling back to one request per file if the IDs don't match
+def process_files_in_batches(uploaded_files, url, model, prompt_template, schema, output_file_path, files_per_prompt):
+    with open(output_file_path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Input", "Sentiment", "Reasoning"])
+
+    progress_bar = st.progress(0)
+    total_files = len(uploaded_files)
+    start_time = time.time()
+    requests_sent = 0
+    fallback_batches = 0
+
+    def generate_single(content):
+        return get_client(url).generate({
+            "model": model,
+            "prompt": prompt_template.format(input=content),
+            "stream": False,
+            "format": schema
+        })
+
+    def generate_batch(contents):
+        return get_client(url).generate({
+            "model": model,
+            "prompt": prompt_template.format(input=f"{BATCH_INSTRUCTIONS}\n\n{format_batch_input(contents)}"),
+            "stream": False,
+            "format": make_batch_schema(schema)
+        })
+
+    for start in range(0, total_files, files_per_prompt):
+        batch_files = uploaded_files[start:start + files_per_prompt]
+        st.write(f"Processing files {start + 1}-{start + len(batch_files)}/{total_files}")
+        contents = [uploaded_file.read().decode("utf-8") for uploaded_file in batch_files]
+
+        try:
+            entries, stats = classify_comments(
+                contents, generate_single, generate_batch, files_per_prompt, required=schema.get("required", [])
+            )
+            requests_sent += stats["requests"]
+            fallback_batches += stats["fallback_batches"]
+        except requests.exceptions.RequestException as e:
+            entries = []
+            st.error(f"Error processing files {start + 1}-{start + len(batch_files)}: {e}")
+
+        with open(output_file_path, mode="a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            for content, entry in zip(contents, entries):
+                writer.writerow([content, entry["result"].get("sentiment"), entry["result"].get("reasoning")])
+
+        progress_bar.progress((start + len(batch_files)) / total_files)
+
+    elapsed_time = time.time() - start_time
+    st.sidebar.write(f"Processing time: {elapsed_time:.2f} seconds")
+    st.sidebar.write(f"Ollama requests: {requests_sent} ({fallback_batches} batches fell back to single files)")
+
+    st.success("All files processed successfully!")
+
 # Function to process uploaded files using Ollama
 def process_files_with_ollama(uploaded_files, url, model, prompt_template, schema, output_file_path):
     # Create the CSV file and write the header
@@ -45,10 +106,17 @@ def process_files_with_ollama(uploaded_files, url, model, prompt_template, schem
             "format": schema
         }
 
-        # Send the request to Ollama
-        response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
-
-        if response.status_code == 200:
+        # Send the request to Ollama over the pooled keep-alive session
+        try:
+            response = get_client(url).generate(payload)
+        except requests.exceptions.HTTPError as e:
+            response = None
+            st.error(f"Error processing file {uploaded_file.name}: {e.response.status_code}")
+        except requests.exceptions.RequestException as e:
+            response = None
+            st.error(f"Error processing file {uploaded_file.name}: {e}")
+
+        if response is not None:
             # Parse the response and extract sentiment and reasoning
             json_response = parse_response_to_json(response)
             sentiment = json_response['sentiment']
@@ -58,8 +126,6 @@ def process_files_with_ollama(uploaded_files, url, model, prompt_template, schem
             with open(output_file_path, mode="a", newline="", encoding="utf-8") as file:
                 writer = csv.writer(file)
                 writer.writerow([content, sentiment, reasoning])
-        else:
-            st.error(f"Error processing file {uploaded_file.name}: {response.status_code}")
 
         # Update progress bar
         progress_bar.progress((i + 1) / total_files)
@@ -91,6 +157,9 @@ prompt_template = st.sidebar.text_area(
     height=100
 )
 
+# Batch prompt mode: several files in one request
+files_per_prompt = st.sidebar.number_input("Files per prompt", min_value=1, max_value=50, value=1, step=1)
+
 # Input field for the schema
 default_schema = {
     "type": "object",
@@ -141,9 +210,15 @@ with tab1:
         # Process the uploaded files with Ollama
         if st.button("Analyze Sentiment"):
             with st.spinner("Processing files..."):
-                process_files_with_ollama(
-                    uploaded_files, url, model, prompt_template, schema, st.session_state.output_file_name
-                )
+                if files_per_prompt > 1:
+                    process_files_in_batches(
+                        uploaded_files, url, model, prompt_template, schema, st.session_state.output_file_name,
+                        int(files_per_prompt)
+                    )
+                else:
+                    process_files_with_ollama(
+                        uploaded_files, url, model, prompt_template, schema, st.session_state.output_file_name
+                    )
 
             # Load the results into a DataFrame and store it in session state
             st.session_state.results_df = pd.read_csv(st.session_state.output_file_name)
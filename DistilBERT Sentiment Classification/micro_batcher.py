@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import Counter
+
+
+class MicroBatcher:
+    # Collects single requests that arrive within a short window into one
+    # call of batch_fn (a blocking function mapping a list of inputs to a list
+    # of results in the same order) and hands each result back to its caller.
+    # on_wait(seconds) is called with the queue wait of every request.
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=10, executor=None, on_wait=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.on_wait = on_wait
+        self.queue = None
+        self.worker = None
+
+        # Metrics
+        self.total_requests = 0
+        self.total_batches = 0
+        self.batch_sizes = Counter()
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+        # Fail whatever is still waiting so no caller hangs on shutdown
+        while self.queue is not None and not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            items = [item for item, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+
+            # Record how long each request sat in the queue
+            dispatched_at = time.perf_counter()
+            for _, _, queued_at in batch:
+                wait_time = dispatched_at - queued_at
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+                if self.on_wait is not None:
+                    self.on_wait(wait_time)
+            self.total_requests += len(batch)
+            self.total_batches += 1
+            self.batch_sizes[len(batch)] += 1
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.batch_fn, items)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                # The caller may have gone away (client disconnect)
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "avg_batch_size": self.total_requests / self.total_batches if self.total_batches else 0,
+            "batch_size_distribution": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "avg_wait_ms": self.total_wait_time / self.total_requests * 1000 if self.total_requests else 0,
+            "max_wait_ms_observed": self.max_wait_time * 1000,
+        }
@@ -1,38 +1,57 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-import csv
 from datetime import datetime
-from transformers import pipeline
 import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 import os
+import sys
 
-# Path to the CSV file
+from micro_batcher import MicroBatcher
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from bert_backend import BERT_BACKEND, MAX_LENGTH, BertBackend
+from log_sink import LogSink, log_path
+from server_metrics import CONTENT_TYPE, MetricsRegistry
+
+# Path to the result log (the extension follows LOG_FORMAT)
 CSV_FILE = os.path.join(os.path.dirname(__file__), "analyzed_comments_bert_sentiment.csv")
 
 # Ensure the directory exists
 os.makedirs(os.path.dirname(CSV_FILE), exist_ok=True)
 
-def save_to_csv(comment, sentiment, confidence=None, model=None, execution_time=None):
-    with open(CSV_FILE, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        # Write the header if the file is empty
-        if file.tell() == 0:
-            writer.writerow([
-                "Timestamp", "Comment", "Classification", "Type", 
-                "Confidence", "Model", "ExecutionTime"
-            ])
-        # Write the comment data with execution time
-        writer.writerow([
-            datetime.now().isoformat(),
-            comment,
-            sentiment,
-            "sentiment",
-            confidence,
-            model,
-            f"{execution_time:.2f}" if execution_time is not None else None
-        ])
+# Columns of the result log, one row per analyzed comment
+LOG_FIELDS = [
+    "Timestamp", "Comment", "Classification", "Type",
+    "Confidence", "Model", "ExecutionTime"
+]
+# Written in the background in LOG_FORMAT (csv, jsonl or parquet), see log_sink.py
+log_sink = LogSink(log_path(CSV_FILE), LOG_FIELDS)
+
+def log_result(comment, sentiment, confidence=None, model=None, execution_time=None):
+    # Queue the comment data with execution time; never waits for the disk
+    log_sink.log(dict(zip(LOG_FIELDS, [
+        datetime.now().isoformat(),
+        comment,
+        sentiment,
+        "sentiment",
+        confidence,
+        model,
+        f"{execution_time:.2f}" if execution_time is not None else None
+    ])))
+
+# Inference is blocking, so it runs in a bounded thread pool instead of on
+# the event loop. MAX_CONCURRENT_INFERENCE limits how many pipeline calls run
+# at the same time.
+MAX_CONCURRENT_INFERENCE = int(os.environ.get("MAX_CONCURRENT_INFERENCE", 1))
+inference_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_INFERENCE, thread_name_prefix="inference")
+
+async def run_blocking(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
 
 # Create a FastAPI instance
 app = FastAPI()
@@ -49,12 +68,69 @@ app.add_middleware(
     allow_headers=["Content-Type"],
 )
 
-# Load the BERT sentiment analysis pipeline
-bert_sentiment_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+# Load the BERT sentiment analysis model. BERT_BACKEND selects eager
+# PyTorch (default), torchscript, compile, onnx or onnx-int8 (see
+# bert_backend.py); all of them are called like the transformers pipeline.
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+bert_sentiment_pipeline = BertBackend(MODEL_NAME, BERT_BACKEND)
+
+# Prometheus metrics, served at GET /metrics. The labels match the Ollama
+# servers; DistilBERT never gets a transcript, so context is always "without".
+metrics = MetricsRegistry(prefix="bert_sentiment_")
+REQUESTS = metrics.counter("requests_total", "Requests", ["endpoint", "model", "context"])
+ERRORS = metrics.counter("errors_total", "Failed requests by error type", ["endpoint", "model", "context", "type"])
+REQUEST_SECONDS = metrics.histogram("request_seconds", "Request latency", ["endpoint", "model", "context"])
+# queue_wait (micro-batcher), model_call (one forward pass) and log_write
+STAGE_SECONDS = metrics.histogram("stage_seconds", "Latency of the request stages", ["stage", "model", "context"])
+LABELS = {"model": MODEL_NAME, "context": "without"}
+
+# Number of comments per forward pass in /analyze_batch
+BATCH_SIZE = int(os.environ.get("BERT_BATCH_SIZE", 32))
+
+
+def analyze_batch_of_comments(comments, batch_size=BATCH_SIZE):
+    # Returns one (result, execution_time) pair per comment, in input order.
+    # predict_bucketed tokenizes once and runs batches of similar length.
+    probabilities, batches = bert_sentiment_pipeline.predict_bucketed(
+        comments, batch_size=batch_size, max_length=MAX_LENGTH
+    )
+    for batch in batches:
+        STAGE_SECONDS.observe(batch["seconds"], stage="model_call", **LABELS)
+    # Spread the total model time evenly over the comments
+    per_item_time = sum(batch["seconds"] for batch in batches) / len(comments)
+    results = []
+    for row in probabilities:
+        best = int(row.argmax())
+        results.append(({"label": bert_sentiment_pipeline.labels[best], "score": float(row[best])}, per_item_time))
+    return results
+
+
+# Concurrent /analyze requests that arrive within BERT_BATCH_WINDOW_MS of each
+# other are grouped into a single pipeline call of up to BERT_MAX_BATCH_SIZE
+micro_batcher = MicroBatcher(
+    lambda comments: [result for result, _ in analyze_batch_of_comments(comments)],
+    max_batch_size=int(os.environ.get("BERT_MAX_BATCH_SIZE", BATCH_SIZE)),
+    max_wait_ms=float(os.environ.get("BERT_BATCH_WINDOW_MS", 10)),
+    executor=inference_executor,
+    on_wait=lambda seconds: STAGE_SECONDS.observe(seconds, stage="queue_wait", **LABELS),
+)
+
+@app.on_event("startup")
+async def start_micro_batcher():
+    await micro_batcher.start()
+    await log_sink.start()
+
+@app.on_event("shutdown")
+async def stop_micro_batcher():
+    await micro_batcher.stop()
+    inference_executor.shutdown(wait=True)
+    # Rows still queued are written before the server exits
+    await log_sink.stop()
 
 @app.post("/analyze")
 async def analyze_comment(request: Request):
     start_time = time.time()
+    error_type = None
     try:
         body = await request.json()
         logger.info(f"Incoming request body: {body}")
@@ -63,35 +139,113 @@ async def analyze_comment(request: Request):
         
         if not comment:
             logger.error("Comment is required")
+            error_type = "bad_request"
             raise HTTPException(status_code=400, detail="Comment is required")
         # Use BERT for sentiment analysis
         logger.info("Using BERT (DistilBERT) for sentiment analysis")
 
-        # Analyze the comment using BERT
-        result = bert_sentiment_pipeline(comment)[0]
+        # Analyze the comment using BERT (batched with concurrent requests)
+        result = await micro_batcher.submit(comment)
         sentiment = result["label"].upper()
         confidence = result["score"]
 
         logger.info(f"BERT sentiment analysis result: {sentiment}, Confidence: {confidence}")
 
-        # Save the comment and analysis result to a CSV file
+        # Log the comment and analysis result (written in the background)
         execution_time = time.time() - start_time
-        save_to_csv(
-            comment=comment, 
-            sentiment=sentiment, 
-            confidence=confidence, 
-            model="distilbert-base-uncased-finetuned-sst-2-english", 
-            execution_time=execution_time
-        )
+        with STAGE_SECONDS.time(stage="log_write", **LABELS):
+            log_result(
+                comment=comment,
+                sentiment=sentiment,
+                confidence=confidence,
+                model=MODEL_NAME,
+                execution_time=execution_time
+            )
 
         # Return sentiment and confidence to the Chrome extension
         return {"sentiment": sentiment, "confidence": confidence}
 
 
+    except HTTPException:
+        # A missing comment stays a 400
+        ERRORS.inc(endpoint="/analyze", type=error_type or "internal", **LABELS)
+        raise
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Error analyzing comment: {str(e)}. Execution time: {execution_time:.2f}s")
+        ERRORS.inc(endpoint="/analyze", type=error_type or "internal", **LABELS)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        REQUESTS.inc(endpoint="/analyze", **LABELS)
+        REQUEST_SECONDS.observe(time.time() - start_time, endpoint="/analyze", **LABELS)
+
+@app.post("/analyze_batch")
+async def analyze_comments_batch(request: Request):
+    start_time = time.time()
+    try:
+        body = await request.json()
+        comments = body.get("comments")
+
+        if not isinstance(comments, list) or not comments:
+            logger.error("A non-empty list of comments is required")
+            raise HTTPException(status_code=400, detail="A non-empty list of comments is required")
+        if not all(isinstance(comment, str) and comment for comment in comments):
+            logger.error("Every comment must be a non-empty string")
+            raise HTTPException(status_code=400, detail="Every comment must be a non-empty string")
+
+        logger.info(f"Using BERT (DistilBERT) for batch sentiment analysis of {len(comments)} comments")
+        results = await run_blocking(inference_executor, analyze_batch_of_comments, comments)
+
+        response = []
+        rows = []
+        for comment, (result, execution_time) in zip(comments, results):
+            sentiment = result["label"].upper()
+            confidence = result["score"]
+            rows.append({
+                "comment": comment,
+                "sentiment": sentiment,
+                "confidence": confidence,
+                "model": MODEL_NAME,
+                "execution_time": execution_time
+            })
+            response.append({"sentiment": sentiment, "confidence": confidence})
+
+        with STAGE_SECONDS.time(stage="log_write", **LABELS):
+            for row in rows:
+                log_result(**row)
+
+        execution_time = time.time() - start_time
+        logger.info(f"Analyzed {len(comments)} comments in {execution_time:.2f}s")
+
+        # Results are returned in the same order as the input comments
+        return {"results": response}
+
+    except HTTPException:
+        ERRORS.inc(endpoint="/analyze_batch", type="bad_request", **LABELS)
+        raise
+    except Exception as e:
+        execution_time = time.time() - start_time
+        logger.error(f"Error analyzing comments: {str(e)}. Execution time: {execution_time:.2f}s")
+        ERRORS.inc(endpoint="/analyze_batch", type="internal", **LABELS)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        REQUESTS.inc(endpoint="/analyze_batch", **LABELS)
+        REQUEST_SECONDS.observe(time.time() - start_time, endpoint="/analyze_batch", **LABELS)
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text format
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/log_stats")
+async def get_log_stats():
+    # Rows queued, written and dropped by the background result log
+    return log_sink.stats()
+
+@app.get("/batcher_stats")
+async def get_batcher_stats():
+    # Queue depth, batch size distribution and queue wait time of /analyze
+    return micro_batcher.stats()
 
 # Run the server
 if __name__ == "__main__":
@@ -1,18 +1,21 @@
+import argparse
 import requests
 import json
 import csv
 import time
 import os
+import sys
 from datetime import datetime
 import unicodedata
-from transformers import DistilBertTokenizer, DistilBertForSequenceClassification
-import torch
-from torch.nn.functional import softmax
 import numpy as np
 
-# Initialize DistilBERT model and tokenizer
-tokenizer = DistilBertTokenizer.from_pretrained('distilbert-base-uncased-finetuned-sst-2-english')
-model = DistilBertForSequenceClassification.from_pretrained('distilbert-base-uncased-finetuned-sst-2-english')
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from bert_backend import BERT_BACKEND, BertBackend
+
+# Initialize DistilBERT; BERT_BACKEND selects eager PyTorch (default),
+# torchscript, compile, onnx or onnx-int8 (see bert_backend.py)
+backend = BertBackend('distilbert-base-uncased-finetuned-sst-2-english', BERT_BACKEND)
 
 
 # Function to clean a single string
@@ -64,27 +67,15 @@ def save_model_results_to_csv(results, output_file="model_analysis_results22.csv
                 ])
             writer.writerow(row)
 
-def analyze(comments):
+def analyze(comments, batch_size=32):
+    # Tokenizes all comments at once and scores them in length-sorted
+    # batches; results keep the input order
+    print(f"Analyzing {len(comments)} comments in batches of {batch_size} ({backend.kind} backend)")
+    probabilities, batches = backend.predict_bucketed(comments, batch_size=batch_size, max_length=512)
+
     results = {}
-    device = torch.device('mps' if torch.cuda.is_available() else 'cpu')
-    model.to(device)
-    model.eval()
-    
-    for counter, comment in enumerate(comments, 1):
-        print(f"Analyzing comment {counter}/{len(comments)}")
-        
-        # Tokenize and prepare input
-        inputs = tokenizer(comment, return_tensors="pt", truncation=True, max_length=512, padding=True)
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        
-        start_time = time.time()
-        
-        with torch.no_grad():
-            outputs = model(**inputs)
-            predictions = softmax(outputs.logits, dim=-1)
-            
+    for comment, sentiment_scores in zip(comments, probabilities):
         # Convert predictions to sentiment labels (SST-2 is binary: negative=0, positive=1)
-        sentiment_scores = predictions[0].cpu().numpy()
         sentiment_label = 'POSITIVE' if np.argmax(sentiment_scores) == 1 else 'NEGATIVE'
         
         # Calculate confidence scores
@@ -93,9 +84,6 @@ def analyze(comments):
             'POSITIVE': float(sentiment_scores[1])
         }
         
-        end_time = time.time()
-        duration = end_time - start_time
-        
         # Store results
         if comment not in results:
             results[comment] = {}
@@ -105,35 +93,69 @@ def analyze(comments):
             'reasoning': f"Confidence scores - Negative: {confidence_scores['NEGATIVE']:.3f}, Positive: {confidence_scores['POSITIVE']:.3f}"
         }
     
-    return results
+    return results, batches
+
 
+def save_batch_latencies(batches, output_file):
+    # One row per batch: size, padded token length and latency
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Batch', 'Size', 'Padded Length', 'Seconds', 'Milliseconds per Comment'])
+        for index, batch in enumerate(batches, 1):
+            writer.writerow([
+                index, batch['size'], batch['padded_length'],
+                f"{batch['seconds']:.4f}", f"{1000 * batch['seconds'] / batch['size']:.2f}"
+            ])
+
+
+def print_latency_summary(batches):
+    batch_times = sorted(batch['seconds'] for batch in batches)
+    comments = sum(batch['size'] for batch in batches)
+    model_time = sum(batch_times)
+    print(f"{len(batches)} batches, {comments} comments, model time {model_time:.2f}s "
+          f"({comments / model_time:.1f} comments/s)")
+    print(f"Per batch: median {1000 * batch_times[len(batch_times) // 2]:.1f} ms, max {1000 * batch_times[-1]:.1f} ms")
+    print(f"Per comment: {1000 * model_time / comments:.2f} ms")
 
 
 # Main process
 def main():
+    parser = argparse.ArgumentParser(description="Classify comments with DistilBERT (SST-2) in length-bucketed batches")
+    parser.add_argument("--comments", default="UserEvaluationStudy_20_Comments.csv",
+                        help="CSV with a header row; every row is one comment")
+    parser.add_argument("--column", default=None,
+                        help="Column holding the comment (default: all columns of a row joined)")
+    parser.add_argument("--output", default="model_analysis_distilbert.csv")
+    parser.add_argument("--latency-output", default="distilbert_batch_latency.csv")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
     start_time_total = time.time()
-    
-    # Define the path to the comments CSV file
-    filepath_comments_csv = "UserEvaluationStudy_20_Comments.csv"
 
     # Read and clean comments
     cleaned_comments = []
-    with open(filepath_comments_csv, mode="r", newline="", encoding="utf-8") as file:
-        reader = csv.reader(file, quotechar='"')
-        next(reader)  # Skip the header
-        for row in reader:
-            comment = " ".join(row)
-            cleaned_comment = clean_string(comment)
-            cleaned_comments.append(cleaned_comment)
+    with open(args.comments, mode="r", newline="", encoding="utf-8") as file:
+        if args.column:
+            for row in csv.DictReader(file, quotechar='"'):
+                cleaned_comments.append(clean_string(row[args.column]))
+        else:
+            reader = csv.reader(file, quotechar='"')
+            next(reader)  # Skip the header
+            for row in reader:
+                comment = " ".join(row)
+                cleaned_comment = clean_string(comment)
+                cleaned_comments.append(cleaned_comment)
 
     print("Analyzing comments using DistilBERT...")
-    results = analyze(cleaned_comments)
+    results, batches = analyze(cleaned_comments, args.batch_size)
     
     # Save results
-    save_model_results_to_csv(results, "model_analysis_distilbert.csv")
+    save_model_results_to_csv(results, args.output)
+    save_batch_latencies(batches, args.latency_output)
+    print_latency_summary(batches)
     
     total_duration = time.time() - start_time_total
     print(f"\nTotal execution time: {total_duration:.2f} seconds")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,43 +1,69 @@
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from chart_pipeline import ChartJob, render_all
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
 # Read the CSV file
-#df = pd.read_csv('f1_scores_without_context.csv')
-#df = pd.read_csv('f1_scores.csv')
-#df = pd.read_csv('/Users/marc/Documents/GitHub/_MASTER_/GithubUpload/macro_f1_scores_three-way-classification_with_context.csv')
-df = pd.read_csv('/Users/marc/Documents/GitHub/_MASTER_/GithubUpload/macro_f1_scores_three-way-classification_zero_context.csv')
+#MACRO_F1_FILE = 'macro_f1_scores_three-way-classification_with_context.csv'
+MACRO_F1_FILE = 'macro_f1_scores_three-way-classification_zero_context.csv'
+
+# Bootstrap confidence intervals from significance.py, drawn as error bars
+CI_FILE = 'f1_confidence_intervals_three-way-classification_zero_context.csv'
+
+
+def load_data(directory=HERE):
+    df = pd.read_csv(os.path.join(directory, MACRO_F1_FILE))
+    ci_file = os.path.join(directory, CI_FILE)
+    if os.path.exists(ci_file):
+        df = df.merge(pd.read_csv(ci_file)[['Model', 'Macro_F1_Low', 'Macro_F1_High']], on='Model', how='left')
+
+    # Sort the dataframe by Macro_F1 score in descending order
+    return df.sort_values(by='Macro_F1', ascending=True)
+
+
+def set_style():
+    plt.style.use('ggplot')
+    sns.set_palette("husl")
+
 
-# Sort the dataframe by Macro_F1 score in descending order
-df = df.sort_values(by='Macro_F1', ascending=True)
+def error_bars(df, metric):
+    if f'{metric}_Low' not in df.columns:
+        return None
+    return [(df[metric] - df[f'{metric}_Low']).clip(lower=0).fillna(0), (df[f'{metric}_High'] - df[metric]).clip(lower=0).fillna(0)]
 
-# Set style
-plt.style.use('seaborn')
-sns.set_palette("husl")
 
-def create_visualizations():
-    # 1. Overall Macro F1 Score Comparison
+# 1. Overall Macro F1 Score Comparison
+def macro_f1_comparison(output, df):
+    set_style()
     plt.figure(figsize=(15, 8))
-    
+
     # Create color array based on score threshold
-    colors = ['#FF0000' if model == 'DistilBERT-sst2' else '#1a02f2' if score > 0.280 else '#95a5a6' 
+    colors = ['#FF0000' if model == 'DistilBERT-sst2' else '#1a02f2' if score > 0.280 else '#95a5a6'
               for model, score in zip(df['Model'], df['Macro_F1'])]
-    bars = plt.barh(df['Model'], df['Macro_F1'], color=colors)
-    
+    bars = plt.barh(df['Model'], df['Macro_F1'], color=colors, xerr=error_bars(df, 'Macro_F1'), capsize=3)
+
     plt.title('Macro F1 Scores for Three-way Classification by Model without Context', fontsize=14, pad=20)
     plt.xlabel('Macro F1 Score')
-    
+
     # Add value labels on the bars
     for bar in bars:
         width = bar.get_width()
         plt.text(width, bar.get_y() + bar.get_height()/2,
                 f'{width:.3f}', ha='left', va='center', fontsize=10)
-    
+
     plt.tight_layout()
-    plt.savefig('visualizations/macro_f1_comparison.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
-    # 2. Detailed F1 Scores (Positive, Neutral, Negative)
+
+# 2. Detailed F1 Scores (Positive, Neutral, Negative)
+def detailed_f1_scores(output, df):
+    set_style()
     plt.figure(figsize=(15, 10))
     x = range(len(df['Model']))
     width = 0.25
@@ -51,25 +77,33 @@ def create_visualizations():
     plt.title('Detailed F1 Scores by Sentiment Class with Context', fontsize=14, pad=20)
     plt.legend()
     plt.tight_layout()
-    plt.savefig('visualizations/detailed_f1_scores.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
-    # 3. Heatmap of F1 Scores
+
+# 3. Heatmap of F1 Scores
+def f1_scores_heatmap(output, df):
+    set_style()
     plt.figure(figsize=(12, 8))
     scores_heatmap = df[['Positive_F1', 'Neutral_F1', 'Negative_F1']]
-    sns.heatmap(scores_heatmap.T, annot=True, fmt='.3f', 
+    sns.heatmap(scores_heatmap.T, annot=True, fmt='.3f',
                 yticklabels=['Positive', 'Neutral', 'Negative'],
                 xticklabels=df['Model'], cmap='YlOrRd')
     plt.title('F1 Scores Heatmap Sentiment with Context', fontsize=14, pad=20)
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    plt.savefig('visualizations/f1_scores_heatmap.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
+
+def chart_jobs(df, output_dir='visualizations'):
+    return [
+        ChartJob(os.path.join(output_dir, 'macro_f1_comparison.png'), macro_f1_comparison, (df,)),
+        ChartJob(os.path.join(output_dir, 'detailed_f1_scores.png'), detailed_f1_scores, (df,)),
+        ChartJob(os.path.join(output_dir, 'f1_scores_heatmap.png'), f1_scores_heatmap, (df,)),
+    ]
+
+
 if __name__ == "__main__":
-    # Create visualizations directory if it doesn't exist
-    import os
-    os.makedirs('visualizations', exist_ok=True)
-    
-    create_visualizations()
-    print("Visualizations have been created in the 'visualizations' directory.")
\ No newline at end of file
+    render_all(chart_jobs(load_data(os.getcwd())))
+    print("Visualizations have been created in the 'visualizations' directory.")
@@ -4,8 +4,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 # Read the data
-#df = pd.read_csv('detailed_f1_scores_without_context.csv')
-df = pd.read_csv('detailed_f1_scores.csv')
+#df = pd.read_csv('detailed_f1_scores_three-way-classification_zero_context.csv')
+df = pd.read_csv('detailed_f1_scores_three-way-classification_with_context.csv')
 
 def create_detailed_heatmap():
     # Create a directory for the heatmap
@@ -1,16 +1,43 @@
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from chart_pipeline import ChartJob, render_all
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
 # Read the CSV file
-df = pd.read_csv('/Users/marc/Documents/GitHub/_MASTER_/GithubUpload/weighted_f1_scores_gemma3.csv')
+WEIGHTED_F1_FILE = 'weighted_f1_scores_three-way-classification_with_context.csv'
+
+# Bootstrap confidence intervals from significance.py, drawn as error bars
+CI_FILE = 'f1_confidence_intervals_three-way-classification_with_context.csv'
+
+
+def load_data(directory=HERE):
+    df = pd.read_csv(os.path.join(directory, WEIGHTED_F1_FILE))
+    ci_file = os.path.join(directory, CI_FILE)
+    if os.path.exists(ci_file):
+        df = df.merge(pd.read_csv(ci_file)[['Model', 'Weighted_F1_Low', 'Weighted_F1_High']], on='Model', how='left')
+    return df
+
+
+def set_style():
+    # Set style - using a valid style
+    plt.style.use('ggplot')  # Changed from 'seaborn' to 'ggplot' which is more widely available
+    sns.set_palette("husl")
+
+
+def error_bars(df, metric):
+    if f'{metric}_Low' not in df.columns:
+        return None
+    return [(df[metric] - df[f'{metric}_Low']).clip(lower=0).fillna(0), (df[f'{metric}_High'] - df[metric]).clip(lower=0).fillna(0)]
 
-# Set style - using a valid style
-plt.style.use('ggplot')  # Changed from 'seaborn' to 'ggplot' which is more widely available
-sns.set_palette("husl")
 
-def create_visualizations():
-    # 1. Overall Weighted F1 Score Comparison
+# 1. Overall Weighted F1 Score Comparison
+def weighted_f1_comparison(output, df):
+    set_style()
     plt.figure(figsize=(15, 8))
     
     # Create color array based on score threshold and highlight DistilBERT-sst2 in red
@@ -25,7 +52,7 @@ def create_visualizations():
         else:
             colors.append('#95a5a6')
     
-    bars = plt.barh(df['Model'], df['Weighted_F1'], color=colors)
+    bars = plt.barh(df['Model'], df['Weighted_F1'], color=colors, xerr=error_bars(df, 'Weighted_F1'), capsize=3)
     
     plt.title('Weighted F1 Scores by Model with Context', fontsize=14, pad=20)
     plt.xlabel('Weighted F1 Score')
@@ -37,10 +64,13 @@ def create_visualizations():
                 f'{width:.3f}', ha='left', va='center', fontsize=10)
     
     plt.tight_layout()
-    plt.savefig('visualizations/weighted_f1_comparison.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
-    # 2. Detailed F1 Scores (Positive, Neutral, Negative)
+
+# 2. Detailed F1 Scores (Positive, Neutral, Negative)
+def detailed_weighted_f1_scores(output, df):
+    set_style()
     plt.figure(figsize=(15, 10))
     x = range(len(df['Model']))
     width = 0.25
@@ -54,10 +84,13 @@ def create_visualizations():
     plt.title('Detailed F1 Scores by Sentiment Class (Weighted Analysis)', fontsize=14, pad=20)
     plt.legend()
     plt.tight_layout()
-    plt.savefig('visualizations/detailed_weighted_f1_scores.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
-    # 3. Heatmap of F1 Scores
+
+# 3. Heatmap of F1 Scores
+def weighted_f1_scores_heatmap(output, df):
+    set_style()
     plt.figure(figsize=(12, 8))
     scores_heatmap = df[['Positive_F1', 'Neutral_F1', 'Negative_F1']]
     sns.heatmap(scores_heatmap.T, annot=True, fmt='.3f', 
@@ -66,10 +99,13 @@ def create_visualizations():
     plt.title('F1 Scores Heatmap by Sentiment (Weighted Analysis)', fontsize=14, pad=20)
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    plt.savefig('visualizations/weighted_f1_scores_heatmap.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
-    
-    # 4. Support Distribution Visualization
+
+
+# 4. Support Distribution Visualization
+def support_distribution(output, df):
+    set_style()
     plt.figure(figsize=(15, 10))
     
     # Create a stacked bar chart for support counts
@@ -94,13 +130,19 @@ def create_visualizations():
                         color='black', fontweight='bold', fontsize=9)
     
     plt.tight_layout()
-    plt.savefig('visualizations/support_distribution.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
+
+def chart_jobs(df, output_dir='visualizations'):
+    return [
+        ChartJob(os.path.join(output_dir, 'weighted_f1_comparison.png'), weighted_f1_comparison, (df,)),
+        ChartJob(os.path.join(output_dir, 'detailed_weighted_f1_scores.png'), detailed_weighted_f1_scores, (df,)),
+        ChartJob(os.path.join(output_dir, 'weighted_f1_scores_heatmap.png'), weighted_f1_scores_heatmap, (df,)),
+        ChartJob(os.path.join(output_dir, 'support_distribution.png'), support_distribution, (df,)),
+    ]
+
+
 if __name__ == "__main__":
-    # Create visualizations directory if it doesn't exist
-    import os
-    os.makedirs('visualizations', exist_ok=True)
-    
-    create_visualizations()
-    print("Weighted F1 score visualizations have been created in the 'visualizations' directory.")
\ No newline at end of file
+    render_all(chart_jobs(load_data(os.getcwd())))
+    print("Weighted F1 score visualizations have been created in the 'visualizations' directory.")
@@ -1,7 +1,18 @@
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from metrics import LABEL_SETS, find_truth_column
+from significance import analyze
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Label matrix of the same run with the human annotations, for the F1 ranking
+# with bootstrap confidence intervals (significance.py)
+LABEL_MATRIX = os.path.join(HERE, 'modified_RESULTS_All_Models_User Evaluation Study - 20 Comments_WITHOUT_context.csv')
+
 # Read the CSV file
 df = pd.read_csv('/Users/marc/Documents/GitHub/_MASTER_/GithubUpload/ModelAnalysis/Charts/Analysis/Best_Model_Data_20_Comments_WITHOUT_context_with_reasoning.csv', sep=';')
 #df = pd.read_csv('Best_Models_20_Comments_with_transcript_as_context_with_reasoning.csv', sep=';')
@@ -32,6 +43,12 @@ for model in models:
 performance_df = pd.DataFrame(performance_data).T
 sentiment_df = pd.DataFrame({model: sentiment_data[model] for model in models})
 
+# Macro F1 against the human annotations with 95% bootstrap intervals
+label_matrix = pd.read_csv(LABEL_MATRIX, sep=';')
+truth_column = find_truth_column(label_matrix)
+intervals, _ = analyze(label_matrix[['Comment', truth_column] + models], LABEL_SETS['three-way'], truth_column)
+ranking_df = intervals.sort_values(by='Macro_F1', ascending=True)
+
 # Plotting
 plt.style.use('seaborn')
 fig = plt.figure(figsize=(20, 12))
@@ -53,7 +70,7 @@ plt.ylabel('Count')
 plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
 
 # 3. Sentiment Distribution
-ax3 = plt.subplot(2, 1, 2)
+ax3 = plt.subplot(2, 2, 3)
 sentiment_proportions = pd.DataFrame({
     model: sentiment_data[model] / sentiment_data[model].sum() * 100
     for model in models
@@ -64,11 +81,21 @@ plt.xticks(rotation=45)
 plt.ylabel('Percentage')
 plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
 
+# 4. Macro F1 Ranking with 95% bootstrap confidence intervals
+ax4 = plt.subplot(2, 2, 4)
+errors = [(ranking_df['Macro_F1'] - ranking_df['Macro_F1_Low']).clip(lower=0),
+          (ranking_df['Macro_F1_High'] - ranking_df['Macro_F1']).clip(lower=0)]
+ax4.barh(ranking_df['Model'], ranking_df['Macro_F1'], xerr=errors, capsize=3)
+plt.title('Macro F1 Ranking (95% bootstrap CI)')
+plt.xlabel('Macro F1 Score')
+
 plt.tight_layout()
 plt.show()
 
 # Print detailed statistics
 print("\nPerformance Metrics Summary:")
 print(performance_df.round(2))
+print("\nMacro F1 with 95% bootstrap confidence intervals:")
+print(ranking_df[['Model', 'Macro_F1', 'Macro_F1_Low', 'Macro_F1_High']].iloc[::-1].round(3).to_string(index=False))
 print("\nSentiment Distribution Summary:")
 print(sentiment_df.fillna(0).astype(int))
\ No newline at end of file
@@ -3,6 +3,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
+from agreement import cohen_kappa, consensus, fleiss_kappa, one_hot, pairwise_agreement
+
 # Read the CSV file
 df = pd.read_csv('modified_RESULTS_All_Models_User Evaluation Study - 20 Comments_with_context.csv', sep=';')
 #df = pd.read_csv('modified_RESULTS_All_Models_User Evaluation Study - 20 Comments_WITHOUT_context.csv', sep=';')
@@ -14,15 +16,8 @@ os.makedirs('visualization_outputs', exist_ok=True)
 # 1. Heatmap of Model Agreement
 plt.figure(figsize=(15, 10))
 model_columns = df.columns[1:]  # Skip 'Comment' column
-agreement_matrix = pd.DataFrame(index=model_columns, columns=model_columns, dtype=float)  # Specify dtype
-
-for model1 in model_columns:
-    for model2 in model_columns:
-        agreement = (df[model1] == df[model2]).mean()
-        agreement_matrix.loc[model1, model2] = float(agreement)  # Explicit conversion to float
-
-# Convert the entire matrix to float
-agreement_matrix = agreement_matrix.astype(float)
+encoded, categories = one_hot(df, model_columns)
+agreement_matrix = pd.DataFrame(pairwise_agreement(encoded), index=model_columns, columns=model_columns)
 
 sns.heatmap(agreement_matrix, annot=True, cmap='YlOrRd', fmt='.2f')
 plt.title('Model Agreement Heatmap with Context')
@@ -51,13 +46,8 @@ plt.savefig('visualization_outputs/sentiment_distribution.png', dpi=300, bbox_in
 plt.close()
 
 # 3. Agreement with Human Annotator
-human_agreement = pd.Series(index=model_columns)
 human_column = '(MODUS) Human Annotator'
-
-for model in model_columns:
-    if model != human_column:
-        agreement = (df[model] == df[human_column]).mean()
-        human_agreement[model] = agreement
+human_agreement = agreement_matrix[human_column].drop(human_column)
 
 plt.figure(figsize=(12, 6))
 human_agreement.sort_values(ascending=True).plot(kind='barh')
@@ -68,13 +58,9 @@ plt.savefig('visualization_outputs/human_agreement.png', dpi=300, bbox_inches='t
 plt.close()
 
 # 4. Sentiment Consistency Across Comments
-consistency_matrix = pd.DataFrame(index=df['Comment'], columns=['Agreement_Rate'])
-
-for idx, row in df.iterrows():
-    # Calculate the most common sentiment for this comment
-    sentiments = row[1:].value_counts()
-    max_agreement = sentiments.iloc[0] / len(row[1:])
-    consistency_matrix.loc[row['Comment'], 'Agreement_Rate'] = max_agreement
+comment_consensus = consensus(encoded, categories)
+comment_consensus.index = df['Comment']
+consistency_matrix = comment_consensus[['Agreement_Rate']]
 
 plt.figure(figsize=(10, 6))
 consistency_matrix.sort_values('Agreement_Rate').plot(kind='barh')
@@ -84,4 +70,24 @@ plt.tight_layout()
 plt.savefig('visualization_outputs/comment_consistency.png', dpi=300, bbox_inches='tight')
 plt.close()
 
+# 5. Cohen's Kappa between Models (agreement corrected for chance)
+plt.figure(figsize=(15, 10))
+kappa_matrix = pd.DataFrame(cohen_kappa(encoded), index=model_columns, columns=model_columns)
+sns.heatmap(kappa_matrix, annot=True, cmap='RdYlGn', fmt='.2f', vmin=-1, vmax=1)
+plt.title(f"Cohen's Kappa between Models (Fleiss' Kappa over all: {fleiss_kappa(encoded):.3f})")
+plt.xticks(rotation=45, ha='right')
+plt.yticks(rotation=0)
+plt.tight_layout()
+plt.savefig('visualization_outputs/model_kappa_heatmap.png', dpi=300, bbox_inches='tight')
+plt.close()
+
+# 6. Disagreement per Comment
+plt.figure(figsize=(10, 6))
+comment_consensus['Entropy'].sort_values().plot(kind='barh')
+plt.title('Label Entropy across Models per Comment')
+plt.xlabel('Entropy (bits)')
+plt.tight_layout()
+plt.savefig('visualization_outputs/comment_entropy.png', dpi=300, bbox_inches='tight')
+plt.close()
+
 print("All visualizations have been generated in the 'visualization_outputs' directory!")
\ No newline at end of file
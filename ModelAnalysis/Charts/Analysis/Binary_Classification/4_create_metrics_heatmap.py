@@ -4,7 +4,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 # Read the data
-df = pd.read_csv('../ModelAnalysis/Charts/Analysis/Binary_Classification/binary_detailed_f1_scores_without_context.csv')
+df = pd.read_csv('../detailed_f1_scores_binary-classification_zero_context.csv')
 
 def create_detailed_heatmap():
     # Create a directory for the heatmap
@@ -2,23 +2,27 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+import sys
 import os
 
-# Create output directory if it doesn't exist
-os.makedirs('comment_visualizations', exist_ok=True)
+# results_store.py lives in ModelAnalysis/
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", ".."))
+from results_store import load_label_matrix
 
-# Load the CSV file
+# chart_pipeline.py lives in Charts/Analysis/
+sys.path.insert(0, os.path.join(HERE, ".."))
+from chart_pipeline import ChartJob, render_all
+
+
+def load_data():
+    # Load the CSV file
+    #return load_label_matrix('binary', 'with', os.path.join(HERE, 'with_context/binary-classification-with-context.csv'))
+    return load_label_matrix('binary', 'without', os.path.join(HERE, 'without_context/binary-classification-zero-context.csv'))
 
-df = pd.read_csv('../ModelAnalysis/Charts/Analysis/Binary_Classification/with_context/binary-classification-with-context.csv', sep=';')
-df = pd.read_csv('../ModelAnalysis/Charts/Analysis/Binary_Classification/without_context/binary-classification-zero-context.csv', sep=';')
 
 # Function to visualize sentiment for a single comment
-def visualize_single_comment(comment_idx):
-    row = df.iloc[comment_idx]
-    comment = row['Comment']
-    sentiments = row.iloc[1:].values
-    models = df.columns[1:]
-    
+def visualize_single_comment(output, comment, models, sentiments):
     # Define color mapping for sentiments
     sentiment_colors = {
         'POSITIVE': '#4CAF50',  # Green
@@ -95,20 +99,13 @@ def visualize_single_comment(comment_idx):
     plt.tight_layout()
     
     # Save the figure
-    plt.savefig(f'comment_visualizations/{comment}_sentiment.png', dpi=300, bbox_inches='tight')
-    
-    return fig
-
-# Create individual visualizations for each comment
-for i in range(len(df)):
-    print(f"Creating visualization for {df.iloc[i]['Comment']}...")
-    fig = visualize_single_comment(i)
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close(fig)  # Close the figure to free memory
 
 # Create aggregate analysis visualizations
 
 # 1. Model Agreement with Human Annotations
-def create_agreement_visualization():
+def create_agreement_visualization(output, df):
     # Calculate agreement rates
     human_sentiment = df['Human Annotator']
     agreement_rates = {}
@@ -142,11 +139,11 @@ def create_agreement_visualization():
     ax.set_xlabel('Agreement Rate (%)', fontsize=12)
     ax.grid(axis='x', linestyle='--', alpha=0.7)
     plt.tight_layout()
-    plt.savefig('overall_model_agreement.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
 # 2. Sentiment Distribution by Model
-def create_distribution_visualization():
+def create_distribution_visualization(output, df):
     # Calculate sentiment distribution for each model
     models = df.columns[1:]  # Skip 'Comment'
     sentiments = ['POSITIVE', 'NEGATIVE']
@@ -208,11 +205,24 @@ def create_distribution_visualization():
     ax.get_yticklabels()[human_idx].set_color('blue')
     
     plt.tight_layout()
-    plt.savefig('binary_classification_zero_context_sentiment_distribution_by_model.png', dpi=300, bbox_inches='tight')
+    plt.savefig(output, dpi=300, bbox_inches='tight')
     plt.close()
 
-# Create the aggregate visualizations
-create_agreement_visualization()
-create_distribution_visualization()
 
-print("All visualizations have been created successfully.")
\ No newline at end of file
+def chart_jobs(df, output_dir='.'):
+    # One chart per comment plus the aggregate charts
+    jobs = []
+    for _, row in df.iterrows():
+        jobs.append(ChartJob(
+            os.path.join(output_dir, 'comment_visualizations', f"{row['Comment']}_sentiment.png"),
+            visualize_single_comment,
+            (row['Comment'], list(df.columns[1:]), list(row.iloc[1:].values)),
+        ))
+    jobs.append(ChartJob(os.path.join(output_dir, 'overall_model_agreement.png'), create_agreement_visualization, (df,)))
+    jobs.append(ChartJob(os.path.join(output_dir, 'binary_classification_zero_context_sentiment_distribution_by_model.png'), create_distribution_visualization, (df,)))
+    return jobs
+
+
+if __name__ == '__main__':
+    render_all(chart_jobs(load_data()))
+    print("All visualizations have been created successfully.")
@@ -0,0 +1,95 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Agreement between raters (models and human annotators) as matrix products
+# over a one-hot encoding of the label matrix, instead of comparing columns
+# pair by pair and comments row by row. Raw labels are used as categories,
+# so answers like N/A count as labels of their own; missing cells match
+# nothing.
+#
+#   python agreement.py --csv "modified_RESULTS_All_Models_User Evaluation Study - 20 Comments_with_context.csv"
+
+
+def one_hot(df, columns=None):
+    # -> (comments, raters, categories) 0/1 array and the category names
+    columns = list(df.columns[1:] if columns is None else columns)
+    codes, categories = pd.factorize(df[columns].to_numpy().ravel())
+    codes = codes.reshape(len(df), len(columns))
+    encoded = np.zeros((len(df), len(columns), len(categories)), dtype=np.float64)
+    rows, raters = np.nonzero(codes >= 0)
+    encoded[rows, raters, codes[rows, raters]] = 1
+    return encoded, list(categories)
+
+
+def pairwise_agreement(encoded):
+    # Share of comments on which rater i and rater j give the same label
+    return np.einsum('nik,njk->ij', encoded, encoded) / encoded.shape[0]
+
+
+def cohen_kappa(encoded):
+    # Cohen's kappa for every pair of raters, from the observed agreement and
+    # the agreement expected from the raters' label distributions
+    observed = pairwise_agreement(encoded)
+    marginals = encoded.mean(axis=0)
+    expected = marginals @ marginals.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected < 1, (observed - expected) / (1 - expected), np.nan)
+
+
+def fleiss_kappa(encoded):
+    # Fleiss' kappa over all raters; comments may have different numbers of
+    # labels when cells are missing
+    counts = encoded.sum(axis=1)
+    raters = counts.sum(axis=1)
+    rated = raters > 1
+    counts, raters = counts[rated], raters[rated]
+    per_comment = ((counts ** 2).sum(axis=1) - raters) / (raters * (raters - 1))
+    proportions = counts.sum(axis=0) / raters.sum()
+    expected = (proportions ** 2).sum()
+    return (per_comment.mean() - expected) / (1 - expected) if expected < 1 else np.nan
+
+
+def consensus(encoded, categories):
+    # Per comment: majority label, share of raters giving it, and entropy
+    # (bits) of the label distribution
+    counts = encoded.sum(axis=1)
+    raters = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    shares = counts / raters
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(shares > 0, shares * np.log2(shares), 0).sum(axis=1)
+    return pd.DataFrame({
+        "Majority_Label": np.array(categories, dtype=object)[counts.argmax(axis=1)],
+        "Agreement_Rate": counts.max(axis=1) / encoded.shape[1],
+        "Entropy": entropy,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agreement, Cohen's and Fleiss' kappa and per-comment consensus of a label matrix")
+    parser.add_argument("--csv", required=True, help="Semicolon-separated label matrix (Comment column first)")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, sep=';')
+    columns = df.columns[1:]
+    encoded, categories = one_hot(df, columns)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    pd.DataFrame(pairwise_agreement(encoded), index=columns, columns=columns).to_csv(
+        os.path.join(args.output_dir, "model_agreement.csv"))
+    pd.DataFrame(cohen_kappa(encoded), index=columns, columns=columns).to_csv(
+        os.path.join(args.output_dir, "cohen_kappa.csv"))
+    table = consensus(encoded, categories)
+    table.insert(0, "Comment", df["Comment"])
+    table.to_csv(os.path.join(args.output_dir, "comment_consensus.csv"), index=False)
+
+    print(f"Fleiss' kappa over {len(columns)} raters: {fleiss_kappa(encoded):.3f}")
+    print(f"Results have been saved to model_agreement.csv, cohen_kappa.csv and comment_consensus.csv "
+          f"in {os.path.abspath(args.output_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+# Renders chart jobs in a process pool and skips charts whose inputs have not
+# changed since the last run. A job is one output file plus a render function
+# that draws it from plain data (DataFrames, lists, strings); its hash covers
+# the function's source and the pickled data and is kept in a manifest next
+# to the outputs.
+
+# render(output, *args) writes one image to output
+ChartJob = namedtuple("ChartJob", ["output", "render", "args"])
+
+MANIFEST = ".chart_hashes.json"
+
+
+def job_hash(job):
+    digest = hashlib.sha256()
+    digest.update(f"{job.render.__module__}.{job.render.__qualname__}".encode("utf-8"))
+    digest.update(inspect.getsource(job.render).encode("utf-8"))
+    digest.update(pickle.dumps(job.args, protocol=4))
+    return digest.hexdigest()
+
+
+def _use_agg():
+    matplotlib.use("Agg")
+
+
+def _render(job):
+    _use_agg()
+    import matplotlib.pyplot as plt
+
+    os.makedirs(os.path.dirname(job.output) or ".", exist_ok=True)
+    try:
+        job.render(job.output, *job.args)
+    finally:
+        plt.close("all")
+    return job.output
+
+
+def render_all(jobs, manifest_dir=".", workers=None, force=False):
+    # Returns (rendered, skipped) counts
+    manifest_path = os.path.join(manifest_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+
+    hashes = {}
+    pending = []
+    for job in jobs:
+        key = os.path.relpath(job.output, manifest_dir)
+        hashes[key] = job_hash(job)
+        if manifest.get(key) != hashes[key] or not os.path.exists(job.output):
+            pending.append(job)
+
+    def done(output):
+        key = os.path.relpath(output, manifest_dir)
+        manifest[key] = hashes[key]
+        print(f"Rendered {key}")
+
+    try:
+        if workers == 1 or len(pending) < 2:
+            for job in pending:
+                done(_render(job))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as executor:
+                futures = [executor.submit(_render, job) for job in pending]
+                for future in as_completed(futures):
+                    done(future.result())
+    finally:
+        # Keep what was rendered even if a later chart fails
+        os.makedirs(manifest_dir, exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+
+    return len(pending), len(jobs) - len(pending)
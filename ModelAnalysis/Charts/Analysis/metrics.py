@@ -0,0 +1,159 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# results_store.py lives in ModelAnalysis/
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from results_store import RESULTS_DATASET, load_label_matrix
+
+# Precision, recall and F1 for every model in one pass. The label matrix
+# (comments x models) is encoded as integers and all confusion matrices are
+# counted with a single np.bincount, so scoring thousands of model/config
+# columns costs about as much as scoring one.
+#
+#   python metrics.py --labels three-way --context without
+#   python metrics.py --labels binary --csv Binary_Classification/with_context/binary-classification-with-context.csv
+
+LABEL_SETS = {
+    "three-way": ["POSITIVE", "NEUTRAL", "NEGATIVE"],
+    "binary": ["POSITIVE", "NEGATIVE"],
+}
+
+# Columns holding the human annotations in the different CSV files
+TRUTH_COLUMNS = ["Human Annotator", "(MODUS) Human Annotator"]
+
+# Label matrices shipped with the repository, used when there is no dataset
+DEFAULT_CSVS = {
+    ("three-way", "with"): os.path.join(HERE, "three-way-classification-with-context.csv"),
+    ("three-way", "without"): os.path.join(HERE, "three-way-classification-zero-context.csv"),
+    ("binary", "with"): os.path.join(HERE, "Binary_Classification", "with_context", "binary-classification-with-context.csv"),
+    ("binary", "without"): os.path.join(HERE, "Binary_Classification", "without_context", "binary-classification-zero-context.csv"),
+}
+
+
+def encode(values, labels):
+    # Label strings -> 0..len(labels)-1; anything else (missing answers,
+    # labels outside the set) -> len(labels)
+    frame = pd.DataFrame(values)
+    normalized = frame.astype(str).apply(lambda column: column.str.strip().str.upper()).to_numpy()
+    encoded = np.full(frame.shape, len(labels), dtype=np.int64)
+    for index, label in enumerate(labels):
+        encoded[normalized == label] = index
+    return encoded
+
+
+def confusion_matrices(truth, predictions, n_labels):
+    # truth: (comments,), predictions: (comments, models), both encoded.
+    # Returns (models, n_labels + 1, n_labels + 1) with truth on the rows;
+    # the last row/column counts labels outside the label set.
+    size = n_labels + 1
+    models = predictions.shape[1]
+    cells = truth[:, None] * size + predictions + np.arange(models) * size * size
+    return np.bincount(cells.ravel(), minlength=models * size * size).reshape(models, size, size)
+
+
+def scores_from_confusion(confusion, n_labels):
+    # Same definitions as sklearn's precision_recall_fscore_support with an
+    # explicit label list and zero_division=0. Arrays are (models, labels)
+    # or (models,) for the averages.
+    tp = np.diagonal(confusion, axis1=1, axis2=2)[:, :n_labels].astype(float)
+    predicted = confusion.sum(axis=1)[:, :n_labels]
+    support = confusion.sum(axis=2)[:, :n_labels]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        total = support.sum(axis=1)
+        weights = np.where(total[:, None] > 0, support / total[:, None], np.nan)
+
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "support": support,
+        "macro_precision": precision.mean(axis=1),
+        "macro_recall": recall.mean(axis=1),
+        "macro_f1": f1.mean(axis=1),
+        "weighted_precision": (precision * weights).sum(axis=1),
+        "weighted_recall": (recall * weights).sum(axis=1),
+        "weighted_f1": (f1 * weights).sum(axis=1),
+        "accuracy": tp.sum(axis=1) / confusion.sum(axis=(1, 2)),
+    }
+
+
+def find_truth_column(df):
+    for column in TRUTH_COLUMNS:
+        if column in df.columns:
+            return column
+    raise ValueError(f"No human annotation column ({' / '.join(TRUTH_COLUMNS)}) in the label matrix")
+
+
+def score_models(df, labels, truth_column=None):
+    # df: label matrix (Comment, human annotations, one column per model).
+    # Returns one row per model with all metrics.
+    truth_column = truth_column or find_truth_column(df)
+    models = [column for column in df.columns if column not in ("Comment", truth_column)]
+    truth = encode(df[truth_column], labels)[:, 0]
+    predictions = encode(df[models], labels)
+    result = scores_from_confusion(confusion_matrices(truth, predictions, len(labels)), len(labels))
+
+    table = {"Model": models}
+    for index, label in enumerate(labels):
+        name = label.capitalize()
+        table[f"{name}_Precision"] = result["precision"][:, index]
+        table[f"{name}_Recall"] = result["recall"][:, index]
+        table[f"{name}_F1"] = result["f1"][:, index]
+        table[f"{name}_Support"] = result["support"][:, index]
+    for average in ("macro", "weighted"):
+        for metric, name in (("precision", "Precision"), ("recall", "Recall"), ("f1", "F1")):
+            table[f"{average.capitalize()}_{name}"] = result[f"{average}_{metric}"]
+    table["Accuracy"] = result["accuracy"]
+    return pd.DataFrame(table)
+
+
+def load_matrix(labels, context, csv_path=None, dataset=RESULTS_DATASET):
+    if csv_path:
+        return pd.read_csv(csv_path, sep=';')
+    return load_label_matrix(labels, context, DEFAULT_CSVS[(labels, context)], dataset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precision, recall and F1 of every model against the human annotations")
+    parser.add_argument("--labels", choices=sorted(LABEL_SETS), default="three-way")
+    parser.add_argument("--context", choices=["with", "without"], default="without")
+    parser.add_argument("--csv", default=None, help="Semicolon-separated label matrix instead of the results dataset")
+    parser.add_argument("--dataset", default=RESULTS_DATASET)
+    parser.add_argument("--truth-column", default=None)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    labels = LABEL_SETS[args.labels]
+    df = load_matrix(args.labels, args.context, args.csv, args.dataset)
+    results = score_models(df, labels, args.truth_column)
+
+    # File names of the earlier scripts, read by the visualization scripts
+    variant = f"{args.labels}-classification_{'with' if args.context == 'with' else 'zero'}_context"
+    os.makedirs(args.output_dir, exist_ok=True)
+    class_f1 = [f"{label.capitalize()}_F1" for label in labels]
+    class_support = [f"{label.capitalize()}_Support" for label in labels]
+    outputs = {
+        f"macro_f1_scores_{variant}.csv": ["Model", "Macro_F1"] + class_f1,
+        f"weighted_f1_scores_{variant}.csv": ["Model", "Weighted_F1"] + class_f1 + class_support,
+        f"detailed_f1_scores_{variant}.csv": list(results.columns),
+    }
+    for name, columns in outputs.items():
+        results[columns].to_csv(os.path.join(args.output_dir, name), index=False)
+
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(results[["Model", "Macro_F1", "Weighted_F1", "Accuracy"]].sort_values("Macro_F1", ascending=False)
+              .to_string(index=False, float_format="%.3f"))
+    print(f"\nResults have been saved to {', '.join(outputs)} in {os.path.abspath(args.output_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import importlib
+import os
+import sys
+
+from chart_pipeline import render_all
+
+# One entry point for the chart scripts: collects the charts of the F1,
+# weighted F1 and per-comment scripts and renders them in a process pool
+# with the Agg backend. Charts whose inputs and drawing code are unchanged
+# since the last run are skipped (see chart_pipeline.py).
+#
+#   python render_charts.py                  # three-way and binary
+#   python render_charts.py --labels binary --workers 4
+#   python render_charts.py --force          # redraw everything
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+# (module, output directory) per label set; the modules expose
+# load_data() and chart_jobs(df, output_dir)
+SCRIPTS = {
+    "three-way": [
+        ("3_visualize_f1_scores", os.path.join(HERE, "visualizations")),
+        ("4_visualize_weighted_f1_scores", os.path.join(HERE, "visualizations")),
+        ("5_sentiment_distribution_all_Creating_Charts", HERE),
+    ],
+    "binary": [
+        ("Binary_Classification.3_visualize_f1_scores", os.path.join(HERE, "Binary_Classification", "visualizations")),
+        ("Binary_Classification.5_sentiment_distribution_all_Creating_Charts", os.path.join(HERE, "Binary_Classification")),
+    ],
+}
+
+
+def collect_jobs(label_sets):
+    jobs = []
+    for label_set in label_sets:
+        for name, output_dir in SCRIPTS[label_set]:
+            module = importlib.import_module(name)
+            try:
+                df = module.load_data()
+            except FileNotFoundError as e:
+                print(f"Skipping {name}: {e.filename} not found (run metrics.py / significance.py first)")
+                continue
+            jobs.extend(module.chart_jobs(df, output_dir))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render all charts incrementally in parallel")
+    parser.add_argument("--labels", choices=["three-way", "binary", "all"], default="all")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="Redraw charts even if their inputs are unchanged")
+    args = parser.parse_args()
+
+    label_sets = list(SCRIPTS) if args.labels == "all" else [args.labels]
+    jobs = collect_jobs(label_sets)
+    rendered, skipped = render_all(jobs, HERE, args.workers, args.force)
+    print(f"{rendered} chart(s) rendered, {skipped} unchanged")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import binom
+
+from metrics import LABEL_SETS, RESULTS_DATASET, encode, find_truth_column, load_matrix, scores_from_confusion
+
+# Uncertainty of the F1 scores, which are computed on only a few comments:
+# bootstrap confidence intervals for macro/weighted F1 of every model and
+# pairwise tests (exact McNemar on correct/incorrect, paired permutation test
+# on the macro F1 difference). All resamples are evaluated at once with
+# np.bincount over the encoded label matrix, in chunks of at most MAX_CELLS
+# label cells so memory stays bounded for large comment sets.
+#
+#   python significance.py --labels three-way --context without
+#   python significance.py --labels binary --context with --resamples 10000 --workers 4
+
+MAX_CELLS = 1 << 24
+
+
+def _f1_scores(truth, predictions, n_labels):
+    # truth: (resamples, comments), predictions: (resamples, comments, columns)
+    # -> macro and weighted F1, both (resamples, columns)
+    resamples, _, columns = predictions.shape
+    size = n_labels + 1
+    cells = (truth[:, :, None] * size + predictions
+             + (np.arange(resamples)[:, None, None] * columns + np.arange(columns)) * size * size)
+    confusion = np.bincount(cells.ravel(), minlength=resamples * columns * size * size)
+    scores = scores_from_confusion(confusion.reshape(resamples * columns, size, size), n_labels)
+    return (scores["macro_f1"].reshape(resamples, columns),
+            np.nan_to_num(scores["weighted_f1"]).reshape(resamples, columns))
+
+
+def _bootstrap_chunk(seed, resamples, truth, predictions, n_labels):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(truth), size=(resamples, len(truth)))
+    return _f1_scores(truth[rows], predictions[rows], n_labels)
+
+
+def _permutation_chunk(seed, resamples, truth, first, second, n_labels):
+    # Swap the two models' answers on a random half of the comments
+    rng = np.random.default_rng(seed)
+    swap = rng.random((resamples, len(truth), 1)) < 0.5
+    a = np.where(swap, second, first)
+    b = np.where(swap, first, second)
+    macro, _ = _f1_scores(np.broadcast_to(truth, (resamples, len(truth))),
+                          np.concatenate([a, b], axis=2), n_labels)
+    return macro[:, :first.shape[2]] - macro[:, first.shape[2]:]
+
+
+def _run_chunks(function, total, columns, comments, seed, workers, *args):
+    # Splits `total` resamples into chunks, each with its own random stream
+    # so the result does not depend on the number of workers
+    size = max(1, MAX_CELLS // max(1, comments * columns))
+    counts = [min(size, total - start) for start in range(0, total, size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    if workers > 1 and len(counts) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(function, s, count, *args) for s, count in zip(seeds, counts)]
+            return [future.result() for future in futures]
+    return [function(s, count, *args) for s, count in zip(seeds, counts)]
+
+
+def bootstrap_ci(truth, predictions, n_labels, resamples=2000, alpha=0.05, seed=0, workers=1):
+    # Percentile intervals over comments resampled with replacement
+    chunks = _run_chunks(_bootstrap_chunk, resamples, predictions.shape[1], len(truth), seed, workers,
+                         truth, predictions, n_labels)
+    macro = np.concatenate([chunk[0] for chunk in chunks])
+    weighted = np.concatenate([chunk[1] for chunk in chunks])
+    quantiles = [alpha / 2, 1 - alpha / 2]
+    return {
+        "macro": np.quantile(macro, quantiles, axis=0),
+        "weighted": np.quantile(weighted, quantiles, axis=0),
+    }
+
+
+def mcnemar(truth, predictions):
+    # Exact McNemar test for every pair of models. only_first[i, j] counts the
+    # comments model i gets right and model j gets wrong.
+    correct = (predictions == truth[:, None]).astype(np.int64)
+    only_first = correct.T @ (1 - correct)
+    discordant = only_first + only_first.T
+    smaller = np.minimum(only_first, only_first.T)
+    p_values = np.minimum(1.0, 2 * binom.cdf(smaller, discordant, 0.5))
+    p_values[discordant == 0] = 1.0
+    return only_first, p_values
+
+
+def permutation_test(truth, predictions, n_labels, pairs, permutations=2000, seed=0, workers=1):
+    # Two-sided p-values for the macro F1 difference of each (i, j) in pairs
+    if not pairs:
+        return np.zeros(0), np.zeros(0)
+    first = predictions[:, [i for i, _ in pairs]][None]
+    second = predictions[:, [j for _, j in pairs]][None]
+    observed, _ = _f1_scores(truth[None], np.concatenate([first, second], axis=2), n_labels)
+    observed = observed[0, :len(pairs)] - observed[0, len(pairs):]
+
+    chunks = _run_chunks(_permutation_chunk, permutations, 2 * len(pairs), len(truth), seed, workers,
+                         truth, first, second, n_labels)
+    differences = np.concatenate(chunks)
+    extreme = (np.abs(differences) >= np.abs(observed) - 1e-12).sum(axis=0)
+    return observed, (extreme + 1) / (permutations + 1)
+
+
+def analyze(df, labels, truth_column=None, resamples=2000, permutations=2000, alpha=0.05, seed=0, workers=1):
+    # Returns (intervals, pairwise) tables for a label matrix
+    truth_column = truth_column or find_truth_column(df)
+    models = [column for column in df.columns if column not in ("Comment", truth_column)]
+    truth = encode(df[truth_column], labels)[:, 0]
+    predictions = encode(df[models], labels)
+
+    point_macro, point_weighted = _f1_scores(truth[None], predictions[None], len(labels))
+    ci = bootstrap_ci(truth, predictions, len(labels), resamples, alpha, seed, workers)
+    intervals = pd.DataFrame({
+        "Model": models,
+        "Macro_F1": point_macro[0],
+        "Macro_F1_Low": ci["macro"][0],
+        "Macro_F1_High": ci["macro"][1],
+        "Weighted_F1": point_weighted[0],
+        "Weighted_F1_Low": ci["weighted"][0],
+        "Weighted_F1_High": ci["weighted"][1],
+    })
+
+    pairs = [(i, j) for i in range(len(models)) for j in range(i + 1, len(models))]
+    only_first, mcnemar_p = mcnemar(truth, predictions)
+    difference, permutation_p = permutation_test(truth, predictions, len(labels), pairs, permutations, seed, workers)
+    pairwise = pd.DataFrame({
+        "Model_A": [models[i] for i, _ in pairs],
+        "Model_B": [models[j] for _, j in pairs],
+        "Macro_F1_Diff": difference,
+        "A_Only_Correct": [only_first[i, j] for i, j in pairs],
+        "B_Only_Correct": [only_first[j, i] for i, j in pairs],
+        "McNemar_P": [mcnemar_p[i, j] for i, j in pairs],
+        "Permutation_P": permutation_p,
+    })
+    return intervals, pairwise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals and pairwise significance tests for the F1 scores")
+    parser.add_argument("--labels", choices=sorted(LABEL_SETS), default="three-way")
+    parser.add_argument("--context", choices=["with", "without"], default="without")
+    parser.add_argument("--csv", default=None, help="Semicolon-separated label matrix instead of the results dataset")
+    parser.add_argument("--dataset", default=RESULTS_DATASET)
+    parser.add_argument("--truth-column", default=None)
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--permutations", type=int, default=2000)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="Processes for the resampling")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    df = load_matrix(args.labels, args.context, args.csv, args.dataset)
+    intervals, pairwise = analyze(df, LABEL_SETS[args.labels], args.truth_column, args.resamples,
+                                  args.permutations, args.alpha, args.seed, args.workers)
+
+    variant = f"{args.labels}-classification_{'with' if args.context == 'with' else 'zero'}_context"
+    os.makedirs(args.output_dir, exist_ok=True)
+    intervals.to_csv(os.path.join(args.output_dir, f"f1_confidence_intervals_{variant}.csv"), index=False)
+    pairwise.to_csv(os.path.join(args.output_dir, f"pairwise_tests_{variant}.csv"), index=False)
+
+    print(intervals.sort_values("Macro_F1", ascending=False).to_string(index=False, float_format="%.3f"))
+    significant = pairwise[(pairwise["McNemar_P"] < args.alpha) | (pairwise["Permutation_P"] < args.alpha)]
+    print(f"\n{len(significant)} of {len(pairwise)} model pairs differ at alpha={args.alpha}")
+    print(f"Results have been saved to f1_confidence_intervals_{variant}.csv and pairwise_tests_{variant}.csv "
+          f"in {os.path.abspath(args.output_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,13 @@
-import requests
 import json
 import csv
 import time
 import os
+import sys
 from datetime import datetime
 import unicodedata
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import get_client
 
 # Function to clean a single string
 def clean_string(s):
@@ -107,11 +110,8 @@ def analyze(url, comments, model, temperature, seed, num_ctx):
             'stream': False,
             'format': {'type': 'object', 'properties': {'sentiment': {'enum': ['POSITIVE', 'NEUTRAL', 'NEGATIVE']}, 'reasoning': {'type': 'string'}}, 'required': ['sentiment', 'reasoning']},
             'options': {'temperature': temperature, 'seed': seed, 'num_ctx': num_ctx}}
-        response = None
-
-        response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
-        response.raise_for_status()  # This will raise an exception for bad status codes
-        response_json = response.json()
+        # Pooled keep-alive connection with timeouts and retries
+        response_json = get_client(url).generate(payload)
         result = json.loads(response_json['response'])
         
         # Store results with metrics
@@ -204,13 +204,7 @@ def main():
 
 
         print("Analysis complete.")
-        payload = {
-            'model': model,
-            'keep_alive': 0,
-            'stream': False,
-            'options': {'temperature': temperature, 'seed': seed, 'num_ctx': num_ctx}}
-        response = None
-        response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
+        response = get_client(url).unload_model(model)
         print(response)
         print(f"-- {model} model has been stopped. --\n \n")
         model_duration = time.time() - start_time_model
@@ -0,0 +1,174 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import OLLAMA_URL, get_client
+from batch_prompt import BATCH_INSTRUCTIONS, classify_comments, format_batch_input, make_batch_schema
+
+# Accuracy/throughput report for the batch prompt mode: classifies the 20
+# comments of the user evaluation study with 1, 5, 10, ... comments per
+# prompt and compares the labels with the human annotations.
+#
+# The annotation files list the comments in the same order as the
+# model_analysis_*.csv files (their Comment column holds placeholders), so
+# comments and annotations are matched by row.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ANALYSIS_DIR = os.path.join(HERE, "Charts", "Analysis")
+TRANSCRIPT_FILE = os.path.join(HERE, "..", "transcript.txt")
+LABELS = ["POSITIVE", "NEUTRAL", "NEGATIVE"]
+
+schema = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"enum": LABELS},
+        "reasoning": {"type": "string"},
+    },
+    "required": ["sentiment", "reasoning"],
+}
+
+INSTRUCTIONS = """
+            Instructions:
+            1. Analyze the comment's emotional tone, word choice, and context
+            2. If transcript is provided, consider the video context in your analysis
+            3. Classify the sentiment as POSITIVE, NEUTRAL, or NEGATIVE
+            4. Provide clear reasoning that includes:
+               - Tone analysis
+               - Key phrases or words that influenced your decision
+               - Context consideration from the transcript if available
+            5. Format your response as a JSON object with two fields:
+               - sentiment: Your classification (POSITIVE/NEUTRAL/NEGATIVE)
+               - reasoning: Your detailed analysis
+"""
+
+
+def load_comments(path):
+    with open(path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)  # Skip the header
+        return [row[0] for row in reader]
+
+
+def load_annotations(path):
+    with open(path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file, delimiter=';')
+        return [row['Human Annotator'].strip() for row in reader]
+
+
+def macro_f1(truth, predictions):
+    scores = []
+    for label in LABELS:
+        tp = sum(1 for t, p in zip(truth, predictions) if t == label and p == label)
+        fp = sum(1 for t, p in zip(truth, predictions) if t != label and p == label)
+        fn = sum(1 for t, p in zip(truth, predictions) if t == label and p != label)
+        precision = tp / (tp + fp) if tp + fp else 0
+        recall = tp / (tp + fn) if tp + fn else 0
+        scores.append(2 * precision * recall / (precision + recall) if precision + recall else 0)
+    return sum(scores) / len(scores)
+
+
+def run(client, comments, model, comments_per_prompt, context, options):
+    def generate_single(comment):
+        prompt = f"""
+            Task: Analyze the sentiment of the YouTube comment and provide detailed reasoning.
+            {context}
+{INSTRUCTIONS}
+            YouTube Comment to analyze:
+            "{comment}"
+            """
+        return client.generate({
+            'model': model, 'prompt': prompt, 'stream': False, 'format': schema, 'options': options,
+        })
+
+    def generate_batch(batch):
+        prompt = f"""
+            Task: Analyze the sentiment of each YouTube comment and provide detailed reasoning.
+            {context}
+{INSTRUCTIONS}
+            {BATCH_INSTRUCTIONS}
+
+            YouTube Comments to analyze:
+{format_batch_input(batch)}
+            """
+        return client.generate({
+            'model': model, 'prompt': prompt, 'stream': False, 'format': make_batch_schema(schema),
+            'options': options,
+        })
+
+    start_time = time.time()
+    entries, stats = classify_comments(
+        comments, generate_single, generate_batch, comments_per_prompt, required=schema["required"]
+    )
+    stats["wall_time"] = time.time() - start_time
+    return entries, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-comment and batch prompts against the human annotations")
+    parser.add_argument("--url", default=OLLAMA_URL, help="Ollama generate endpoint")
+    parser.add_argument("--models", nargs="+", default=["mistral-small:22b"])
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 5, 10, 20], help="Comments per prompt to compare")
+    parser.add_argument("--with-context", action="store_true", help="Include the video transcript in the prompt")
+    parser.add_argument("--comments", default=os.path.join(HERE, "without_context", "model_analysis_without_context_phi4.csv"),
+                        help="CSV whose first column holds the comments")
+    parser.add_argument("--annotations", default=None,
+                        help="Semicolon-separated CSV with a 'Human Annotator' column, in the same order as the comments")
+    parser.add_argument("--output", default="batch_prompt_report.csv")
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    args = parser.parse_args()
+
+    if args.annotations is None:
+        name = "three-way-classification-with-context.csv" if args.with_context else "three-way-classification-zero-context.csv"
+        args.annotations = os.path.join(ANALYSIS_DIR, name)
+
+    comments = load_comments(args.comments)
+    annotations = load_annotations(args.annotations)
+    if len(comments) != len(annotations):
+        raise SystemExit(f"{len(comments)} comments but {len(annotations)} annotations")
+
+    context = ""
+    if args.with_context:
+        with open(TRANSCRIPT_FILE, 'r', encoding='utf-8') as file:
+            context = f"\nVideo Transcript Context:\n{file.read()}"
+
+    options = {'temperature': 0, 'seed': 1, 'num_ctx': args.num_ctx}
+    client = get_client(args.url)
+    rows = []
+    for model in args.models:
+        client.load_model(model, options)
+        for k in args.k:
+            print(f"-- {model}: {k} comment(s) per prompt --")
+            entries, stats = run(client, comments, model, k, context, options)
+            predictions = [entry["result"].get("sentiment", "N/A") for entry in entries]
+            correct = sum(1 for t, p in zip(annotations, predictions) if t == p)
+            prompt_tokens = sum(entry["metrics"]["prompt_eval_count"] for entry in entries
+                                if isinstance(entry["metrics"]["prompt_eval_count"], (int, float)))
+            row = {
+                "Model": model,
+                "Comments_Per_Prompt": k,
+                "Accuracy": round(correct / len(comments), 4),
+                "Macro_F1": round(macro_f1(annotations, predictions), 4),
+                "Requests": stats["requests"],
+                "Fallback_Batches": stats["fallback_batches"],
+                "Wall_Time": round(stats["wall_time"], 2),
+                "Comments_Per_Second": round(len(comments) / stats["wall_time"], 3),
+                "Prompt_Tokens_Per_Comment": round(prompt_tokens / len(comments), 1),
+            }
+            print(json.dumps(row))
+            rows.append(row)
+        client.unload_model(model)
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+import argparse
+import csv
+import os
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import OLLAMA_URL, get_client
+from batch_prompt import BATCH_INSTRUCTIONS, classify_comments, format_batch_input, make_batch_schema
+from checkpoint_store import CheckpointStore, config_key
+from results_store import RESULTS_DATASET, ResultsStore, new_run_id
+
+# One runner for the SLM sentiment benchmarks (with / without transcript
+# context, binary / three-way labels). Each model gets several parallel
+# request slots, the next model can be loaded while the current one finishes
+# its last comments, and every finished comment is checkpointed so a rerun
+# only computes what is missing.
+#
+# Example:
+#   python benchmark_runner.py --labels binary --with-context --parallel 4 --overlap-load
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRANSCRIPT_FILE = os.path.join(HERE, "..", "transcript.txt")
+
+SLMS = [
+    "qwen2.5:0.5b",
+    "qwen2.5:1.5b",
+    "qwen2.5:3b",
+    "llama3.2:1b",
+    "llama3.2:3b",
+    "internlm2:1.8b",
+    "deepseek-r1:1.5b",
+    "smollm2:135m",
+    "smollm2:360m",
+    "smollm2:1.7b",
+    "gemma2:2b",
+    "qwen2.5:7b",
+    "phi3.5",
+    "mistral-small:22b",
+    "phi4",
+    "deepseek-r1:7b",
+    "deepseek-r1:8b",
+    "gemma2:9b",
+    "internlm2:7b",
+]
+
+LABELS = {
+    "three-way": ["POSITIVE", "NEUTRAL", "NEGATIVE"],
+    "binary": ["POSITIVE", "NEGATIVE"],
+}
+
+# Result file names of the earlier per-variant scripts, by (labels, with_context)
+OUTPUT_FILES = {
+    ("three-way", False): "model_analysis_without_context_{model}.csv",
+    ("three-way", True): "model_analysis_{model}.csv",
+    ("binary", False): "model_analysis_binary_classification_without_context_{model}.csv",
+    ("binary", True): "model_analysis_binary_classification_{model}.csv",
+}
+
+# Whether the comment is quoted in the single-comment prompt, by (labels,
+# with_context). The earlier binary without-context script sent it bare;
+# keeping each variant's prompt keeps new results comparable to the old ones.
+QUOTED_COMMENT = {
+    ("three-way", False): True,
+    ("three-way", True): True,
+    ("binary", False): False,
+    ("binary", True): True,
+}
+
+# Number of parallel requests Ollama serves per model
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", 1))
+
+
+# Function to clean a single string
+def clean_string(s):
+    s = s.replace("\xa0", " ")  # Replace \xa0 with a space
+    s = s.rstrip(";")  # Remove trailing semicolons
+    s = unicodedata.normalize("NFKC", s)  # Normalize Unicode characters
+    s = s.strip()  # Remove leading/trailing whitespace
+    return s
+
+
+def load_comments(filepath_comments_csv):
+    cleaned_comments = []
+    with open(filepath_comments_csv, mode="r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file, quotechar='"')  # Use quotechar to handle quoted fields
+        next(reader)  # Skip the header
+        for row in reader:
+            # Join the row into a single string (in case it was split by commas)
+            cleaned_comments.append(clean_string(" ".join(row)))
+    return cleaned_comments
+
+
+def format_duration(duration):
+    if duration == 'N/A':
+        return 'N/A'
+    # Convert nanoseconds to seconds and format with 2 decimal places
+    return f"{duration / 1e9:.2f}"
+
+
+def save_model_results_to_csv(results, temperature, seed, num_ctx, output_file="model_analysis_results.csv"):
+    # Create headers for the CSV
+    headers = ['Comment']
+    for model in results[list(results.keys())[0]]:
+        headers.extend([
+            f"{model} - Sentiment",
+            f"{model} - Reasoning",
+            f"{model} - Total Duration",
+            f"{model} - Load Duration",
+            f"{model} - Prompt Eval Count",
+            f"{model} - Prompt Eval Duration",
+            f"{model} - Eval Count",
+            f"{model} - Eval Duration",
+            f"{model} - Temperature",
+            f"{model} - Seed",
+            f"{model} - Num_ctx"
+        ])
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+
+        # Write comment analysis results
+        for comment, model_results in results.items():
+            row = [comment]
+            for model, analysis in model_results.items():
+                row.extend([
+                    analysis.get('sentiment', 'N/A'),
+                    analysis.get('reasoning', 'N/A'),
+                    format_duration(analysis.get('total_duration', 'N/A')),
+                    format_duration(analysis.get('load_duration', 'N/A')),
+                    analysis.get('prompt_eval_count', 'N/A'),
+                    format_duration(analysis.get('prompt_eval_duration', 'N/A')),
+                    analysis.get('eval_count', 'N/A'),
+                    format_duration(analysis.get('eval_duration', 'N/A')),
+                    temperature,
+                    seed,
+                    num_ctx
+                ])
+            writer.writerow(row)
+
+
+def make_schema(labels):
+    return {'type': 'object', 'properties': {'sentiment': {'enum': labels}, 'reasoning': {'type': 'string'}}, 'required': ['sentiment', 'reasoning']}
+
+
+def build_prompt(labels, context, comments_block, batch=False, quote=True):
+    # Same wording as the earlier scripts; the transcript step only appears
+    # when there is a transcript
+    steps = ["Analyze the comment's emotional tone, word choice, and context"]
+    if context:
+        steps.append("If transcript is provided, consider the video context in your analysis")
+    steps.append(f"Classify the sentiment as {' or '.join(labels) if len(labels) == 2 else ', '.join(labels[:-1]) + ', or ' + labels[-1]}")
+    steps.append("""Provide clear reasoning that includes:
+               - Tone analysis
+               - Key phrases or words that influenced your decision
+               - Context consideration from the transcript if available""")
+    steps.append(f"""Format your response as a JSON object with two fields:
+               - sentiment: Your classification ({'/'.join(labels)})
+               - reasoning: Your detailed analysis""")
+    instructions = "\n".join(f"            {number}. {step}" for number, step in enumerate(steps, start=1))
+    # The without-context scripts had no blank line before the instructions
+    context_lines = f"            {context}\n\n" if context else "            \n"
+
+    if batch:
+        return f"""
+            Task: Analyze the sentiment of each YouTube comment and provide detailed reasoning.
+{context_lines}            Instructions:
+{instructions}
+
+            {BATCH_INSTRUCTIONS}
+
+            YouTube Comments to analyze:
+{comments_block}
+            """
+    return f"""
+            Task: Analyze the sentiment of the YouTube comment and provide detailed reasoning.
+{context_lines}            Instructions:
+{instructions}
+
+            YouTube Comment to analyze:
+            {f'"{comments_block}"' if quote else comments_block}
+            """
+
+
+def analyze(client, comments, model, labels, context, options, parallel=1, comments_per_prompt=1, on_tail=None,
+            on_result=None, quote=True):
+    # Classifies the comments with `parallel` requests in flight. Each task is
+    # a group of comments_per_prompt comments (see batch_prompt.py). on_tail()
+    # is called once no task is waiting for a free slot any more, and
+    # on_result(comment, analysis) for every finished comment.
+    schema = make_schema(labels)
+
+    def generate_single(comment):
+        return client.generate({
+            'model': model, 'prompt': build_prompt(labels, context, comment, quote=quote), 'stream': False,
+            'format': schema, 'options': options,
+        })
+
+    def generate_batch(batch):
+        return client.generate({
+            'model': model, 'prompt': build_prompt(labels, context, format_batch_input(batch), batch=True),
+            'stream': False, 'format': make_batch_schema(schema), 'options': options,
+        })
+
+    analyses = {}
+
+    def record(comment, entry):
+        # Runs in the worker thread as soon as a comment is done
+        analyses[comment] = dict(entry['result'], **entry['metrics'])
+        if on_result is not None:
+            on_result(comment, analyses[comment])
+
+    def run_group(group):
+        return classify_comments(
+            group, generate_single, generate_batch, comments_per_prompt, required=schema['required'],
+            on_result=lambda index, entry: record(group[index], entry),
+        )
+
+    step = max(comments_per_prompt, 1)
+    groups = [comments[start:start + step] for start in range(0, len(comments), step)]
+    done = 0
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = {executor.submit(run_group, group): group for group in groups}
+        for future in as_completed(futures):
+            group = futures[future]
+            done += 1
+            try:
+                future.result()
+            except Exception as e:
+                # Unfinished comments are not checkpointed, so the next run retries them
+                print(f"Failed to analyze comment(s) of a group with model {model}: {e}")
+            print(f"Analyzed {len(analyses)}/{len(comments)} comments with model: {model}")
+            if on_tail is not None and len(groups) - done <= parallel:
+                on_tail()
+                on_tail = None
+
+    return analyses
+
+
+def save_results(store, model, comments, config, args, output_file):
+    # Result file in the order of the comments file, from the checkpoints
+    # Comments that failed in this run are written as N/A
+    results = {comment: {model: store.get(model, comment, config) or {}} for comment in comments}
+    save_model_results_to_csv(results, args.temperature, args.seed, args.num_ctx, output_file)
+
+
+def append_to_dataset(dataset, run_id, store, model, comments, config, args):
+    # One long-format row per comment in the results dataset
+    records = []
+    for comment_id, comment in enumerate(comments):
+        analysis = store.get(model, comment, config)
+        if analysis is None:
+            continue
+        records.append(dict(
+            analysis,
+            model=model, comment_id=comment_id, comment=comment,
+            labels=args.labels, context="with" if args.with_context else "without", config=config,
+            label=analysis.get('sentiment'),
+            temperature=args.temperature, seed=args.seed, num_ctx=args.num_ctx,
+        ))
+    dataset.append(records, run_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SLM sentiment benchmark over several models")
+    parser.add_argument("--url", default=OLLAMA_URL, help="Ollama generate endpoint")
+    parser.add_argument("--models", nargs="+", default=SLMS)
+    parser.add_argument("--labels", choices=sorted(LABELS), default="three-way")
+    parser.add_argument("--with-context", action="store_true", help="Include the video transcript in the prompt")
+    parser.add_argument("--transcript", default=TRANSCRIPT_FILE)
+    parser.add_argument("--comments", default="./UserEvaluationStudy_20_Comments.csv")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--parallel", type=int, default=OLLAMA_NUM_PARALLEL,
+                        help="Requests in flight per model; set to OLLAMA_NUM_PARALLEL of the Ollama server")
+    parser.add_argument("--overlap-load", action="store_true",
+                        help="Load the next model while the current one finishes (needs OLLAMA_MAX_LOADED_MODELS >= 2)")
+    parser.add_argument("--comments-per-prompt", type=int, default=1, help="Batch prompt mode, see batch_prompt.py")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Append-only checkpoint file (default: benchmark_checkpoints.jsonl in the output directory)")
+    parser.add_argument("--dataset", default=RESULTS_DATASET, help="Parquet results dataset, see results_store.py")
+    parser.add_argument("--rerun", action="store_true", help="Ignore checkpoints and classify every comment again")
+    parser.add_argument("--temperature", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    args = parser.parse_args()
+
+    start_time_total = time.time()
+    labels = LABELS[args.labels]
+    quote = QUOTED_COMMENT[(args.labels, args.with_context)]
+    options = {'temperature': args.temperature, 'seed': args.seed, 'num_ctx': args.num_ctx}
+    client = get_client(args.url)
+
+    context = ""
+    if args.with_context:
+        with open(args.transcript, 'r', encoding='utf-8') as file:
+            context = f"\nVideo Transcript Context:\n{file.read().rstrip()}"
+
+    cleaned_comments = load_comments(args.comments)
+    print(f"{len(cleaned_comments)} comments, labels: {args.labels}, context: {args.with_context}")
+
+    # Everything that changes the answer for a comment; cells of another
+    # configuration in the checkpoint file are not reused
+    config = config_key({
+        "labels": labels,
+        "prompt": build_prompt(labels, context, "{comment}", quote=quote),
+        "options": options,
+        "comments_per_prompt": args.comments_per_prompt,
+    })
+    os.makedirs(args.output_dir, exist_ok=True)
+    store = CheckpointStore(args.checkpoint or os.path.join(args.output_dir, "benchmark_checkpoints.jsonl"))
+    dataset = ResultsStore(args.dataset)
+    run_id = new_run_id()
+
+    # Models with comments still to classify; complete models only get their
+    # result file rewritten from the checkpoints
+    pending = []
+    for model in args.models:
+        output_file = os.path.join(args.output_dir, OUTPUT_FILES[(args.labels, args.with_context)].format(model=model.replace(':', '_')))
+        missing = cleaned_comments if args.rerun else store.missing(model, cleaned_comments, config)
+        if not missing:
+            print(f"-- Skipping {model}: all comments are checkpointed --")
+            save_results(store, model, cleaned_comments, config, args, output_file)
+            continue
+        print(f"-- {model}: {len(missing)}/{len(cleaned_comments)} comments to classify --")
+        pending.append((model, output_file, missing))
+
+    # Loads the next model in the background while the current one finishes
+    loader = ThreadPoolExecutor(max_workers=1)
+    next_load = loader.submit(client.load_model, pending[0][0], options) if pending else None
+    for i, (model, output_file, missing) in enumerate(pending):
+        start_time_model = time.time()
+        next_load.result()
+        print(f"-- Analyzing comments using model: {model} --")
+
+        following = pending[i + 1][0] if i + 1 < len(pending) else None
+        next_load = None
+
+        def preload():
+            nonlocal next_load
+            if following is not None and next_load is None:
+                next_load = loader.submit(client.load_model, following, options)
+
+        analyze(
+            client, missing, model, labels, context, options,
+            parallel=args.parallel, comments_per_prompt=args.comments_per_prompt,
+            on_tail=preload if args.overlap_load else None,
+            on_result=lambda comment, analysis: store.add(model, comment, config, analysis), quote=quote,
+        )
+        save_results(store, model, cleaned_comments, config, args, output_file)
+        append_to_dataset(dataset, run_id, store, model, cleaned_comments, config, args)
+
+        client.unload_model(model)
+        print(f"-- {model} model has been stopped. --")
+        preload()
+        print(f"Time taken for {model}: {time.time() - start_time_model:.2f} seconds\n")
+
+    loader.shutdown()
+    if pending:
+        print(f"Results appended to run {run_id} of {args.dataset}")
+    print(f"\nTotal execution time: {time.time() - start_time_total:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
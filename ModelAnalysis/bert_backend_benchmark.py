@@ -0,0 +1,108 @@
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from bert_backend import BACKENDS, MODEL_NAME, BertBackend
+
+# Parity check and latency/throughput benchmark of the DistilBERT backends
+# against eager PyTorch on the evaluation comments. For every backend it
+# reports how many labels agree with eager and the largest difference of a
+# class probability, then times single-comment calls and batches. Exits
+# with status 1 when a backend misses the parity thresholds.
+#
+#   python bert_backend_benchmark.py --backends onnx onnx-int8 torchscript
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_comments(path):
+    with open(path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)  # Skip the header
+        return [row[0] for row in reader]
+
+
+def time_calls(function, repeats):
+    # Seconds per call, after one warm-up call
+    function()
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def benchmark(backend, comments, batch_size, repeats):
+    single = []
+    for comment in comments:
+        single.extend(time_calls(lambda: backend.predict_proba([comment]), repeats))
+    batches = [comments[i:i + batch_size] for i in range(0, len(comments), batch_size)]
+    batch_total = sum(sum(time_calls(lambda: backend.predict_proba(batch), repeats)) for batch in batches) / repeats
+    single.sort()
+    return {
+        "single_p50_ms": round(1000 * statistics.median(single), 2),
+        "single_p95_ms": round(1000 * single[int(0.95 * (len(single) - 1))], 2),
+        "batch_comments_per_second": round(len(comments) / batch_total, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and speed of the DistilBERT backends against eager PyTorch")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=[b for b in BACKENDS if b != "eager"])
+    parser.add_argument("--comments", default=os.path.join(HERE, "without_context", "model_analysis_without_context_phi4.csv"),
+                        help="CSV whose first column holds the evaluation comments")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads for all backends")
+    parser.add_argument("--min-agreement", type=float, default=1.0, help="Required share of labels equal to eager")
+    parser.add_argument("--max-delta", type=float, default=0.05, help="Allowed absolute probability difference")
+    parser.add_argument("--output", default="bert_backend_benchmark.csv")
+    args = parser.parse_args()
+
+    comments = load_comments(args.comments)
+    eager = BertBackend(args.model, "eager", num_threads=args.threads)
+    # Scored one by one so padding cannot influence the reference
+    reference = np.concatenate([eager.predict_proba([comment]) for comment in comments])
+
+    rows = [{"Backend": "eager", "Label_Agreement": 1.0, "Max_Prob_Delta": 0.0,
+             **benchmark(eager, comments, args.batch_size, args.repeats)}]
+    failed = []
+    for kind in args.backends:
+        if kind == "eager":
+            continue
+        backend = BertBackend(args.model, kind, num_threads=args.threads)
+        probabilities = np.concatenate([backend.predict_proba([comment]) for comment in comments])
+        agreement = float((probabilities.argmax(axis=1) == reference.argmax(axis=1)).mean())
+        delta = float(np.abs(probabilities - reference).max())
+        row = {"Backend": kind, "Label_Agreement": round(agreement, 4), "Max_Prob_Delta": round(delta, 5),
+               **benchmark(backend, comments, args.batch_size, args.repeats)}
+        rows.append(row)
+        if agreement < args.min_agreement or delta > args.max_delta:
+            failed.append(kind)
+
+    for row in rows:
+        print(json.dumps(row))
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Report written to {args.output}")
+
+    if failed:
+        print(f"Parity check failed for: {', '.join(failed)} "
+              f"(agreement < {args.min_agreement} or probability delta > {args.max_delta})")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
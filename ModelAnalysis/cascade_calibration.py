@@ -0,0 +1,123 @@
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from cascade import CASCADE_MAX_CHARS, REASONS, escalation_reason
+
+# metrics.py lives in Charts/Analysis/
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "Charts", "Analysis"))
+from metrics import LABEL_SETS, find_truth_column, load_matrix, score_models
+
+# Calibrates the confidence threshold of the DistilBERT -> LLM cascade
+# (cascade.py) against the human annotations. The cascade is replayed from
+# existing results: DistilBERT's answer and confidence per comment, the LLM's
+# answer from the label matrix and its generation time from its
+# model_analysis CSV. For every threshold the report has the escalation
+# rate (by reason), macro F1 and its difference to the LLM alone, and the
+# estimated throughput.
+#
+#   python cascade_calibration.py
+#   python cascade_calibration.py --labels binary --context with \
+#       --llm-csv with_context/model_analysis_mistral-small_22b.csv
+
+CONFIDENCE = re.compile(r"(\w+): ([0-9.]+)")
+
+
+def load_bert_results(path):
+    # model_analysis_*distilbert.csv: Comment, "<model> - Sentiment",
+    # "<model> - Reasoning" = "Confidence scores - Negative: 0.001, Positive: 0.999"
+    df = pd.read_csv(path)
+    confidences = [max(float(value) for _, value in CONFIDENCE.findall(text)) for text in df.iloc[:, 2]]
+    return pd.DataFrame({"comment": df.iloc[:, 0], "label": df.iloc[:, 1], "confidence": confidences})
+
+
+def load_llm_seconds(path):
+    df = pd.read_csv(path)
+    model = df.columns[1].rsplit(" - ", 1)[0]
+    return df[f"{model} - Total Duration"].to_numpy(dtype=float)
+
+
+def replay(bert, llm_labels, llm_seconds, thresholds, max_chars, bert_seconds):
+    # One column of cascade answers per threshold, plus escalation details
+    predictions = {}
+    rows = []
+    for threshold in thresholds:
+        reasons = [escalation_reason(comment, confidence, threshold, max_chars)
+                   for comment, confidence in zip(bert["comment"], bert["confidence"])]
+        escalated = np.array([reason is not None for reason in reasons])
+        predictions[f"cascade@{threshold:g}"] = np.where(escalated, llm_labels, bert["label"])
+        seconds = bert_seconds * len(bert) + llm_seconds[escalated].sum()
+        rows.append({
+            "Threshold": threshold,
+            "Escalation_Rate": escalated.mean(),
+            **{f"Escalated_{reason}": reasons.count(reason) for reason in REASONS},
+            "Comments_Per_Second": len(bert) / seconds,
+        })
+    return predictions, pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the DistilBERT -> LLM cascade threshold on the human annotations")
+    parser.add_argument("--labels", choices=sorted(LABEL_SETS), default="three-way")
+    parser.add_argument("--context", choices=["with", "without"], default="without")
+    parser.add_argument("--csv", default=None, help="Semicolon-separated label matrix instead of the results dataset")
+    parser.add_argument("--llm", default="Mistral-small:22b", help="LLM column of the label matrix")
+    parser.add_argument("--llm-csv", default=os.path.join(HERE, "without_context", "model_analysis_without_context_mistral-small_22b.csv"),
+                        help="model_analysis CSV of the LLM, for its generation times")
+    parser.add_argument("--bert-csv", default=os.path.join(HERE, "without_context", "model_analysis_without_context_distilbert.csv"))
+    parser.add_argument("--bert-seconds", type=float, default=0.02, help="DistilBERT time per comment")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=None,
+                        help="Thresholds to try (default: 0.5 and every observed confidence)")
+    parser.add_argument("--max-chars", type=int, default=CASCADE_MAX_CHARS)
+    parser.add_argument("--max-f1-drop", type=float, default=0.01, help="Allowed macro F1 loss against the LLM alone")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    labels = LABEL_SETS[args.labels]
+    matrix = load_matrix(args.labels, args.context, args.csv)
+    bert = load_bert_results(args.bert_csv)
+    llm_seconds = load_llm_seconds(args.llm_csv)
+    if not len(matrix) == len(bert) == len(llm_seconds):
+        sys.exit(f"Row counts differ: label matrix {len(matrix)}, DistilBERT {len(bert)}, LLM {len(llm_seconds)}")
+
+    # The confidences are rounded to three decimals; just above one of them
+    # is where the routing changes
+    thresholds = args.thresholds or sorted({0.5, *np.minimum(np.round(bert["confidence"] + 0.0005, 4), 1.0)})
+    truth_column = find_truth_column(matrix)
+    llm_labels = matrix[args.llm].to_numpy()
+    predictions, report = replay(bert, llm_labels, llm_seconds, thresholds, args.max_chars, args.bert_seconds)
+
+    columns = {"Comment": matrix["Comment"], truth_column: matrix[truth_column],
+               "DistilBERT only": bert["label"].to_numpy(), "LLM only": llm_labels, **predictions}
+    scores = score_models(pd.DataFrame(columns), labels, truth_column).set_index("Model")["Macro_F1"]
+    llm_f1 = scores["LLM only"]
+    report["Macro_F1"] = scores[list(predictions)].to_numpy()
+    report["F1_Delta_vs_LLM"] = report["Macro_F1"] - llm_f1
+    llm_throughput = len(bert) / llm_seconds.sum()
+    report["Speedup_vs_LLM"] = report["Comments_Per_Second"] / llm_throughput
+
+    output = args.output or f"cascade_calibration_{args.labels}_{args.context}_context.csv"
+    report.round(4).to_csv(output, index=False)
+    print(report.round(3).to_string(index=False))
+    print(f"\nDistilBERT only: macro F1 {scores['DistilBERT only']:.3f}")
+    print(f"{args.llm} only: macro F1 {llm_f1:.3f}, {llm_throughput:.3f} comments/s")
+
+    acceptable = report[report["F1_Delta_vs_LLM"] >= -args.max_f1_drop]
+    if len(acceptable):
+        best = acceptable.sort_values(["Escalation_Rate", "Macro_F1"], ascending=[True, False]).iloc[0]
+        print(f"Lowest escalation within {args.max_f1_drop} macro F1 of the LLM: CASCADE_THRESHOLD={best['Threshold']:g} "
+              f"(escalates {best['Escalation_Rate']:.0%}, macro F1 {best['Macro_F1']:.3f}, {best['Speedup_vs_LLM']:.1f}x the LLM's throughput)")
+    else:
+        print(f"No threshold stays within {args.max_f1_drop} macro F1 of the LLM")
+    print(f"Report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
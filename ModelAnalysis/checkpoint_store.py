@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+import threading
+
+# Append-only checkpoint file for benchmark runs. Every finished
+# (model, comment, config) cell is written as one JSON line right away, so an
+# interrupted run loses at most the requests that were in flight and a rerun
+# only computes the cells that are missing.
+
+
+def config_key(config):
+    # Short stable hash of a run configuration (labels, prompt, options, ...)
+    return hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.cells = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of a run that was killed mid-write
+                    continue
+                self.cells[(record["model"], record["comment"], record["config"])] = record["analysis"]
+        # Start the next record on a new line after a partial write
+        with open(self.path, "rb+") as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+
+    def get(self, model, comment, config):
+        return self.cells.get((model, comment, config))
+
+    def missing(self, model, comments, config):
+        return [comment for comment in comments if (model, comment, config) not in self.cells]
+
+    def add(self, model, comment, config, analysis):
+        record = {"model": model, "comment": comment, "config": config, "analysis": analysis}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            self.cells[(model, comment, config)] = analysis
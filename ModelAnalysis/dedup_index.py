@@ -0,0 +1,189 @@
+import argparse
+import csv
+import hashlib
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+
+import numpy as np
+
+from benchmark_runner import clean_string
+
+# Classifies each distinct comment once. Comments are canonicalized on top of
+# clean_string (NFKC, whitespace, optionally casefolded) and hashed; only the
+# first comment of every canonical form goes to the model and its result is
+# handed to all later occurrences. With near_duplicates=True comments whose
+# character 4-grams overlap by at least `similarity` (Jaccard, estimated with
+# MinHash and found through LSH bands) also get an earlier result, which
+# catches copy-pasted spam with a changed name, link or emoji.
+#
+#   python dedup_index.py comments.csv --column text --casefold --near-duplicates
+
+# 32 bands of 4 hashes: comments sharing any band are compared, which finds
+# pairs above a Jaccard similarity of about 0.4 with high probability
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 1 << 31, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, MINHASH_PERMUTATIONS, dtype=np.uint64)
+WHITESPACE = re.compile(r"\s+")
+
+
+def canonicalize(text, casefold=False):
+    text = WHITESPACE.sub(" ", clean_string(text))
+    return text.casefold() if casefold else text
+
+
+def minhash(text, ngram=4):
+    text = text.casefold()
+    shingles = {text[i:i + ngram] for i in range(max(1, len(text) - ngram + 1))}
+    values = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+    return ((_A[:, None] * values[None, :] + _B[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+class DedupIndex:
+    def __init__(self, casefold=False, near_duplicates=False, similarity=0.9, max_entries=100000):
+        self.casefold = casefold
+        self.near_duplicates = near_duplicates
+        self.similarity = similarity
+        self.max_entries = max_entries
+        # canonical key -> result, least recently used first
+        self.results = OrderedDict()
+        # (band, band value) -> keys with that band, for the near-duplicate search
+        self.bands = defaultdict(list)
+        self.fingerprints = {}
+
+        self.comments = 0
+        self.model_inputs = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.lock = threading.Lock()
+
+    def key(self, comment):
+        return hashlib.sha1(canonicalize(comment, self.casefold).encode("utf-8")).hexdigest()
+
+    def _band_values(self, fingerprint):
+        return [(band, rows.tobytes()) for band, rows in enumerate(np.split(fingerprint, MINHASH_BANDS))]
+
+    def _find_near(self, fingerprint, pending):
+        for band in self._band_values(fingerprint):
+            for key in self.bands.get(band, ()):
+                if (key in self.results or key in pending) and \
+                        (self.fingerprints[key] == fingerprint).mean() >= self.similarity:
+                    return key
+        return None
+
+    def _add_fingerprint(self, key, fingerprint):
+        self.fingerprints[key] = fingerprint
+        for band in self._band_values(fingerprint):
+            keys = self.bands[band]
+            keys.append(key)
+            # Long buckets come from near-identical spam; recent keys suffice
+            del keys[:-8]
+
+    def _store(self, key, result):
+        self.results[key] = result
+        while len(self.results) > self.max_entries:
+            evicted, _ = self.results.popitem(last=False)
+            self.fingerprints.pop(evicted, None)
+
+    def _plan(self, comments):
+        # One entry per comment: a cached result, or the key of a comment
+        # that has to be classified (listed once in `new`)
+        self.comments += len(comments)
+        targets = []
+        new = OrderedDict()
+        for comment in comments:
+            key = self.key(comment)
+            if key in self.results:
+                self.exact_hits += 1
+                self.results.move_to_end(key)
+                targets.append((None, self.results[key]))
+                continue
+            if key in new:
+                self.exact_hits += 1
+                targets.append((key, None))
+                continue
+            if self.near_duplicates:
+                fingerprint = minhash(canonicalize(comment))
+                near = self._find_near(fingerprint, new)
+                if near is not None:
+                    self.near_hits += 1
+                    targets.append((near, None) if near in new else (None, self.results[near]))
+                    continue
+                self._add_fingerprint(key, fingerprint)
+            new[key] = comment
+            targets.append((key, None))
+        self.model_inputs += len(new)
+        return targets, new
+
+    def _fan_out(self, targets, fresh):
+        for key, result in fresh.items():
+            if result:
+                self._store(key, result)
+            else:
+                # Failed comments (empty results) are not kept, so they are retried
+                self.fingerprints.pop(key, None)
+        return [fresh[key] if key is not None else result for key, result in targets]
+
+    def classify(self, comments, classify_fn):
+        # classify_fn(list of comments) -> list of results in the same order.
+        # Returns one result per comment; results of earlier calls are reused.
+        # Safe to call from several threads: the model runs outside the lock,
+        # so a comment classified by two chunks at the same time costs two calls.
+        with self.lock:
+            targets, new = self._plan(comments)
+        fresh = dict(zip(new, classify_fn(list(new.values())))) if new else {}
+        with self.lock:
+            return self._fan_out(targets, fresh)
+
+    def stats(self):
+        saved = self.comments - self.model_inputs
+        return {
+            "comments": self.comments,
+            "model_calls": self.model_inputs,
+            "exact_duplicates": self.exact_hits,
+            "near_duplicates": self.near_hits,
+            "calls_saved": saved,
+            "calls_saved_pct": round(100 * saved / self.comments, 1) if self.comments else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how many model calls deduplication saves on a comments CSV")
+    parser.add_argument("comments", help="CSV with a header row")
+    parser.add_argument("--column", default=None, help="Column holding the comment (default: all columns of a row joined)")
+    parser.add_argument("--casefold", action="store_true")
+    parser.add_argument("--near-duplicates", action="store_true")
+    parser.add_argument("--similarity", type=float, default=0.9, help="Jaccard similarity of near duplicates")
+    parser.add_argument("--top", type=int, default=10, help="Largest duplicate groups to list")
+    args = parser.parse_args()
+
+    index = DedupIndex(args.casefold, args.near_duplicates, args.similarity)
+    groups = Counter()
+
+    def remember(comments):
+        # Dry run: the "result" of a comment is the comment itself
+        return [{"comment": comment} for comment in comments]
+
+    with open(args.comments, mode="r", newline="", encoding="utf-8") as file:
+        if args.column:
+            rows = [row[args.column] for row in csv.DictReader(file, quotechar='"')]
+        else:
+            reader = csv.reader(file, quotechar='"')
+            next(reader)  # Skip the header
+            rows = [" ".join(row) for row in reader]
+    groups.update(result["comment"] for result in index.classify(rows, remember))
+
+    for name, value in index.stats().items():
+        print(f"{name}: {value}")
+    print("\nLargest groups:")
+    for comment, count in groups.most_common(args.top):
+        if count > 1:
+            print(f"{count:6d}  {comment[:80]}")
+
+
+if __name__ == '__main__':
+    main()
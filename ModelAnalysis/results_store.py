@@ -0,0 +1,235 @@
+import argparse
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Long-format Parquet dataset of benchmark results: one row per
+# (run, model, comment) with the label, reasoning and Ollama timings,
+# partitioned by run (results_dataset/run_id=<run>/part-<n>.parquet).
+# Runs are only ever appended; readers filter on columns such as model,
+# labels or context and only the matching row groups are read.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DATASET = os.environ.get("RESULTS_DATASET_PATH", os.path.join(HERE, "results_dataset"))
+
+# Name used for the human annotations in the dataset
+HUMAN_ANNOTATOR = "Human Annotator"
+
+SCHEMA = pa.schema([
+    ("model", pa.string()),
+    ("comment_id", pa.int32()),
+    ("comment", pa.string()),
+    # "three-way" or "binary"
+    ("labels", pa.string()),
+    # "with" or "without" transcript context
+    ("context", pa.string()),
+    # Hash of the prompt and generation settings, see checkpoint_store.config_key
+    ("config", pa.string()),
+    ("label", pa.string()),
+    ("reasoning", pa.string()),
+    # Durations in nanoseconds as reported by Ollama
+    ("total_duration", pa.float64()),
+    ("load_duration", pa.float64()),
+    ("prompt_eval_count", pa.float64()),
+    ("prompt_eval_duration", pa.float64()),
+    ("eval_count", pa.float64()),
+    ("eval_duration", pa.float64()),
+    ("temperature", pa.float64()),
+    ("seed", pa.int64()),
+    ("num_ctx", pa.int64()),
+    ("created_at", pa.timestamp("ms", tz="UTC")),
+])
+PARTITIONING = ds.partitioning(pa.schema([("run_id", pa.string())]), flavor="hive")
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def _number(value):
+    # 'N/A' and other placeholders become nulls
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_DATASET):
+        self.path = path
+
+    def append(self, records, run_id):
+        # records: dicts with the SCHEMA fields (missing fields are null).
+        # Every call writes a new file into the run's partition.
+        if not records:
+            return
+        now = datetime.now(timezone.utc)
+        columns = {field.name: [] for field in SCHEMA}
+        for record in records:
+            for field in SCHEMA:
+                value = record.get(field.name)
+                if pa.types.is_floating(field.type) or pa.types.is_integer(field.type):
+                    value = _number(value)
+                elif field.name == "created_at":
+                    value = value or now
+                columns[field.name].append(value)
+        table = pa.table(columns, schema=SCHEMA)
+
+        partition = os.path.join(self.path, f"run_id={run_id}")
+        os.makedirs(partition, exist_ok=True)
+        pq.write_table(table, os.path.join(partition, f"part-{uuid.uuid4().hex}.parquet"))
+
+    def dataset(self):
+        return ds.dataset(self.path, format="parquet", schema=SCHEMA.append(pa.field("run_id", pa.string())),
+                          partitioning=PARTITIONING)
+
+    def exists(self):
+        return os.path.isdir(self.path) and any(name.startswith("run_id=") for name in os.listdir(self.path))
+
+    def read(self, columns=None, **equals):
+        # read(columns=["model", "label"], labels="binary", model=["phi4", "gemma2:9b"])
+        # The filters are pushed down to the Parquet files.
+        condition = None
+        for name, value in equals.items():
+            if value is None:
+                continue
+            term = ds.field(name).isin(value) if isinstance(value, (list, tuple, set)) else ds.field(name) == value
+            condition = term if condition is None else condition & term
+        return self.dataset().to_table(columns=columns, filter=condition).to_pandas()
+
+    def label_matrix(self, labels, context, models=None, config=None, annotations=None):
+        # Wide table like the *-classification-*.csv files: Comment, Human
+        # Annotator, then one column per model. Runs with a different prompt
+        # or settings (config) are never mixed: without a config, each model
+        # uses the config of its latest run, and within it the latest answer
+        # per comment. annotations (human labels indexed by comment text)
+        # fill the Human Annotator column when the dataset has none; a
+        # comment without an annotation raises ValueError. Empty if there
+        # are no rows.
+        df = self.read(columns=["run_id", "model", "comment_id", "comment", "label", "config", "created_at"],
+                       labels=labels, context=context, model=models, config=config)
+        if df.empty:
+            return pd.DataFrame()
+        # Imported CSVs have no config
+        df["config"] = df["config"].fillna("")
+        df = df.sort_values("created_at")
+        latest_config = df.groupby("model")["config"].last()
+        df = df[df["config"] == df["model"].map(latest_config)]
+        df = df.drop_duplicates(["model", "comment_id"], keep="last")
+        matrix = df.pivot(index="comment_id", columns="model", values="label").sort_index()
+        comments = df.drop_duplicates("comment_id").set_index("comment_id")["comment"]
+        if HUMAN_ANNOTATOR not in matrix.columns and annotations is not None:
+            truth = comments.reindex(matrix.index).str.strip().map(annotations)
+            missing = comments.reindex(matrix.index)[truth.isna()]
+            if len(missing):
+                raise ValueError(f"{len(missing)} of {len(matrix)} comments have no human annotation "
+                                 f"(matched on the comment text), e.g. {missing.iloc[0]!r}")
+            matrix[HUMAN_ANNOTATOR] = truth.values
+
+        order = [HUMAN_ANNOTATOR] if HUMAN_ANNOTATOR in matrix.columns else []
+        order += sorted(column for column in matrix.columns if column != HUMAN_ANNOTATOR)
+        matrix = matrix[order]
+        matrix.columns.name = None
+        matrix.insert(0, "Comment", comments.reindex(matrix.index).values)
+        return matrix.reset_index(drop=True)
+
+
+def load_label_matrix(labels, context, fallback_csv=None, path=RESULTS_DATASET):
+    # Label matrix from the dataset, or from the old semicolon-separated
+    # CSV when the dataset has no rows for these labels and context. Runs
+    # of benchmark_runner.py have no human annotations; they are taken from
+    # the CSV, joined on the comment text (ValueError if a comment of the
+    # dataset is not in the CSV or has conflicting annotations).
+    store = ResultsStore(path)
+    annotations = None
+    if fallback_csv:
+        csv = pd.read_csv(fallback_csv, sep=';')
+        truth_column = next((column for column in csv.columns if HUMAN_ANNOTATOR in column), None)
+        if truth_column:
+            labels_by_comment = csv.groupby(csv["Comment"].str.strip())[truth_column]
+            conflicting = labels_by_comment.nunique()
+            if (conflicting > 1).any():
+                raise ValueError(f"Conflicting human annotations in {fallback_csv} for "
+                                 f"{conflicting[conflicting > 1].index[0]!r}")
+            annotations = labels_by_comment.first()
+    matrix = store.label_matrix(labels, context, annotations=annotations) if store.exists() else pd.DataFrame()
+    if matrix.empty and fallback_csv:
+        return csv
+    return matrix
+
+
+def records_from_label_csv(path, labels, context):
+    # *-classification-*.csv: Comment;Human Annotator;<model>;...
+    df = pd.read_csv(path, sep=';')
+    records = []
+    for comment_id, row in df.iterrows():
+        for model in df.columns[1:]:
+            records.append({
+                "model": model, "comment_id": comment_id, "comment": row["Comment"],
+                "labels": labels, "context": context, "label": row[model],
+            })
+    return records
+
+
+def records_from_model_csv(path, labels, context):
+    # model_analysis_*.csv written by benchmark_runner.py: Comment,
+    # "<model> - Sentiment", "<model> - Reasoning", ... (durations in seconds)
+    df = pd.read_csv(path)
+    model = df.columns[1].rsplit(" - ", 1)[0]
+
+    def column(name):
+        return df[f"{model} - {name}"]
+
+    def nanoseconds(value):
+        return float(value) * 1e9 if pd.notna(value) and value != 'N/A' else None
+
+    def number(value):
+        return float(value) if pd.notna(value) and value != 'N/A' else None
+
+    records = []
+    for comment_id, comment in enumerate(df["Comment"]):
+        records.append({
+            "model": model, "comment_id": comment_id, "comment": comment,
+            "labels": labels, "context": context,
+            "label": column("Sentiment")[comment_id],
+            "reasoning": column("Reasoning")[comment_id],
+            "total_duration": nanoseconds(column("Total Duration")[comment_id]),
+            "load_duration": nanoseconds(column("Load Duration")[comment_id]),
+            "prompt_eval_count": number(column("Prompt Eval Count")[comment_id]),
+            "prompt_eval_duration": nanoseconds(column("Prompt Eval Duration")[comment_id]),
+            "eval_count": number(column("Eval Count")[comment_id]),
+            "eval_duration": nanoseconds(column("Eval Duration")[comment_id]),
+            "temperature": number(column("Temperature")[comment_id]),
+            "seed": int(column("Seed")[comment_id]),
+            "num_ctx": int(column("Num_ctx")[comment_id]),
+        })
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import existing result CSVs into the results dataset")
+    parser.add_argument("files", nargs="+", help="*-classification-*.csv label matrices or model_analysis_*.csv files")
+    parser.add_argument("--labels", choices=["three-way", "binary"], required=True)
+    parser.add_argument("--context", choices=["with", "without"], required=True)
+    parser.add_argument("--dataset", default=RESULTS_DATASET)
+    parser.add_argument("--run-id", default=None, help="Run to append to (default: a new run)")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.dataset)
+    run_id = args.run_id or new_run_id()
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as file:
+            header = file.readline()
+        if " - Sentiment" in header:
+            records = records_from_model_csv(path, args.labels, args.context)
+        else:
+            records = records_from_label_csv(path, args.labels, args.context)
+        store.append(records, run_id)
+        print(f"{path}: {len(records)} rows")
+    print(f"Imported into run {run_id} of {args.dataset}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from benchmark_runner import LABELS, QUOTED_COMMENT, TRANSCRIPT_FILE, analyze, clean_string
+from dedup_index import DedupIndex
+from ollama_client import OLLAMA_URL, get_client
+from results_store import ResultsStore, new_run_id
+
+# Out-of-core evaluation of large comment files. The CSV is read in chunks
+# of --chunk-size comments, every chunk is classified on a bounded pool
+# (at most --max-in-flight chunks read but not yet written) and the results
+# go through a buffered sink that appends to the output CSV every
+# --flush-rows rows. Memory therefore depends on the settings, not on the
+# size of the file, and the output grows while the job runs (in input order).
+# With --dedup every distinct comment is classified once (see dedup_index.py).
+#
+#   python stream_eval.py reviews.csv --column review --backend bert --output reviews_distilbert.csv
+#   python stream_eval.py comments.csv --backend ollama --model phi4 --workers 4
+#   python stream_eval.py comments.csv --backend ollama --dedup --casefold --near-duplicates
+
+FIELDS = ["comment_id", "comment", "model", "sentiment", "reasoning", "confidence",
+          "total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration",
+          "eval_count", "eval_duration"]
+
+
+def read_chunks(path, chunk_size, column=None):
+    # Yields (id of the first comment, cleaned comments) without reading the
+    # whole file. Without a column, all fields of a row form the comment.
+    with open(path, mode="r", newline="", encoding="utf-8") as file:
+        if column:
+            rows = (row[column] for row in csv.DictReader(file, quotechar='"'))
+        else:
+            reader = csv.reader(file, quotechar='"')
+            next(reader)  # Skip the header
+            rows = (" ".join(row) for row in reader)
+        start = 0
+        while True:
+            chunk = [clean_string(comment) for comment in islice(rows, chunk_size)]
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+
+class BufferedCsvSink:
+    # Appends rows to a CSV file in blocks of flush_rows; on_flush(rows) is
+    # called with every block, e.g. to append it to the results dataset
+    def __init__(self, path, fields=FIELDS, flush_rows=1000, on_flush=None):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=fields, extrasaction="ignore")
+        self.writer.writeheader()
+        self.flush_rows = flush_rows
+        self.on_flush = on_flush
+        self.buffer = []
+        self.rows_written = 0
+
+    def write(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.writer.writerows(self.buffer)
+        self.file.flush()
+        if self.on_flush is not None:
+            self.on_flush(self.buffer)
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def bert_classifier(backend_kind, batch_size):
+    from bert_backend import MODEL_NAME, BertBackend
+
+    backend = BertBackend(MODEL_NAME, backend_kind)
+
+    def classify(comments):
+        probabilities, _ = backend.predict_bucketed(comments, batch_size=batch_size)
+        results = []
+        for row in probabilities:
+            best = int(row.argmax())
+            scores = ", ".join(f"{label.capitalize()}: {p:.3f}" for label, p in zip(backend.labels, row))
+            results.append({
+                "sentiment": backend.labels[best].upper(),
+                "reasoning": f"Confidence scores - {scores}",
+                "confidence": float(row[best]),
+            })
+        return results
+
+    return "distilbert-sst2", classify
+
+
+def ollama_classifier(url, model, labels, context, options, comments_per_prompt, quote=True):
+    client = get_client(url)
+    client.load_model(model, options)
+
+    def classify(comments):
+        # One request at a time per chunk; --workers chunks run side by side
+        analyses = analyze(client, comments, model, LABELS[labels], context, options,
+                           parallel=1, comments_per_prompt=comments_per_prompt, quote=quote)
+        return [analyses.get(comment, {}) for comment in comments]
+
+    return model, classify
+
+
+def stream(chunks, classify, sink, model, workers=1, max_in_flight=4):
+    # Classifies chunks with `workers` threads and writes them in input
+    # order; reading pauses while max_in_flight chunks are unwritten
+    pending = deque()
+    done = 0
+    start_time = time.time()
+
+    def write_oldest():
+        nonlocal done
+        start, comments, future = pending.popleft()
+        results = future.result()
+        sink.write([
+            dict(result, comment_id=start + offset, comment=comment, model=model)
+            for offset, (comment, result) in enumerate(zip(comments, results))
+        ])
+        done += len(comments)
+        elapsed = time.time() - start_time
+        print(f"{done} comments classified ({done / elapsed:.1f}/s), {sink.rows_written} written")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start, comments in chunks:
+            pending.append((start, comments, executor.submit(classify, comments)))
+            while len(pending) >= max_in_flight:
+                write_oldest()
+        while pending:
+            write_oldest()
+    sink.close()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a large comments CSV in bounded memory")
+    parser.add_argument("comments", help="CSV with a header row")
+    parser.add_argument("--column", default=None, help="Column holding the comment (default: all columns of a row joined)")
+    parser.add_argument("--backend", choices=["bert", "ollama"], default="bert")
+    parser.add_argument("--output", default="stream_eval_results.csv")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Comments read and classified per chunk")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Chunks held in memory at most")
+    parser.add_argument("--workers", type=int, default=1, help="Chunks classified at the same time")
+    parser.add_argument("--flush-rows", type=int, default=1000, help="Rows buffered before the output is appended")
+    parser.add_argument("--dataset", default=None, help="Also append every flushed block to this results dataset")
+    parser.add_argument("--dedup", action="store_true", help="Classify every distinct comment once")
+    parser.add_argument("--casefold", action="store_true", help="With --dedup: comments differing only in case are duplicates")
+    parser.add_argument("--near-duplicates", action="store_true", help="With --dedup: also reuse results of MinHash near duplicates")
+    parser.add_argument("--similarity", type=float, default=0.9, help="With --near-duplicates: Jaccard similarity required")
+    parser.add_argument("--dedup-entries", type=int, default=100000, help="With --dedup: results kept for reuse at most")
+    # DistilBERT
+    parser.add_argument("--bert-backend", default=os.environ.get("BERT_BACKEND", "eager"))
+    parser.add_argument("--batch-size", type=int, default=32)
+    # Ollama
+    parser.add_argument("--url", default=OLLAMA_URL, help="Ollama generate endpoint")
+    parser.add_argument("--model", default="phi4")
+    parser.add_argument("--labels", choices=sorted(LABELS), default="three-way")
+    parser.add_argument("--with-context", action="store_true", help="Include the video transcript in the prompt")
+    parser.add_argument("--transcript", default=TRANSCRIPT_FILE)
+    parser.add_argument("--comments-per-prompt", type=int, default=1)
+    parser.add_argument("--temperature", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    args = parser.parse_args()
+
+    if args.backend == "bert":
+        model, classify = bert_classifier(args.bert_backend, args.batch_size)
+        labels, context = "binary", "without"
+    else:
+        context_text = ""
+        if args.with_context:
+            with open(args.transcript, 'r', encoding='utf-8') as file:
+                context_text = f"\nVideo Transcript Context:\n{file.read().rstrip()}"
+        options = {'temperature': args.temperature, 'seed': args.seed, 'num_ctx': args.num_ctx}
+        model, classify = ollama_classifier(args.url, args.model, args.labels, context_text, options,
+                                            args.comments_per_prompt, QUOTED_COMMENT[(args.labels, args.with_context)])
+        labels, context = args.labels, "with" if args.with_context else "without"
+
+    index = None
+    if args.dedup:
+        index = DedupIndex(args.casefold, args.near_duplicates, args.similarity, args.dedup_entries)
+        classify_comments = classify
+
+        def classify(comments):
+            return index.classify(comments, classify_comments)
+
+    on_flush = None
+    if args.dataset:
+        store = ResultsStore(args.dataset)
+        run_id = new_run_id()
+
+        def on_flush(rows):
+            store.append([dict(row, labels=labels, context=context, label=row.get("sentiment")) for row in rows], run_id)
+
+    start_time = time.time()
+    sink = BufferedCsvSink(args.output, flush_rows=args.flush_rows, on_flush=on_flush)
+    total = stream(read_chunks(args.comments, args.chunk_size, args.column), classify, sink, model,
+                   args.workers, args.max_in_flight)
+    print(f"\n{total} comments written to {args.output} in {time.time() - start_time:.2f} seconds")
+    if index is not None:
+        stats = index.stats()
+        print(f"Deduplication: {stats['model_calls']} comments classified, {stats['calls_saved']} model calls saved "
+              f"({stats['calls_saved_pct']}%; {stats['exact_duplicates']} exact, {stats['near_duplicates']} near duplicates)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,30 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 import requests
 import logging
 import json
-import csv
 import time
+import os
+import sys
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from youtube_transcript_api import YouTubeTranscriptApi
-import ollama
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import OLLAMA_URL, get_client
+from result_cache import ResultCache, make_cache_key
+from transcript_cache import TranscriptCache
+from transcript_context import TranscriptContext
+from log_sink import LogSink, log_path
+from server_metrics import CONTENT_TYPE, MetricsRegistry
+from stream_json import JSONStreamParser, sse
 
-# Path to the CSV file
+# Path to the result log (the extension follows LOG_FORMAT)
 CSV_FILE = "./analyzed_comments_ollama_custom_classification.csv"
 
 def format_duration(duration):
@@ -18,55 +33,69 @@ def format_duration(duration):
     # Convert nanoseconds to seconds and format with 2 decimal places
     return f"{duration / 1e9:.2f}"
 
-def save_to_csv(comment, classification, tone=None, special_flags=None, reasoning=None, model=None, 
-                execution_time=None, transcript_provided=False, video_id=None, ollama_response=None, seed=None, num_ctx=None):
-    with open(CSV_FILE, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        # Write the header if the file is empty
-        if file.tell() == 0:
-            writer.writerow([
-                "Timestamp", "Comment", "Classification", "Tone", "Special_Flags", 
-                "Reasoning_Complete", "Reasoning_Sentiment", "Reasoning_Tone", "Reasoning_Special_Flags",
-                "Model", "Total_Duration", "Load_Duration", "Prompt_Eval_Count",
-                "Prompt_Eval_Duration", "Eval_Count", "Eval_Duration",
-                "TranscriptProvided", "VideoID", "seed", "num_ctx"
-            ])
-        
-        # Format Ollama timing metrics if available
-        total_duration = format_duration(ollama_response.get('total_duration') if ollama_response else 'N/A')
-        load_duration = format_duration(ollama_response.get('load_duration') if ollama_response else 'N/A')
-        prompt_eval_duration = format_duration(ollama_response.get('prompt_eval_duration') if ollama_response else 'N/A')
-        eval_duration = format_duration(ollama_response.get('eval_duration') if ollama_response else 'N/A')
-        
-        # Extract individual reasoning components
-        reasoning_complete = json.dumps(reasoning) if reasoning else 'N/A'
-        reasoning_sentiment = reasoning.get('sentiment', 'N/A') if reasoning else 'N/A'
-        reasoning_tone = reasoning.get('tone', 'N/A') if reasoning else 'N/A'
-        reasoning_special_flags = reasoning.get('special_flags', 'N/A') if reasoning else 'N/A'
-        
-        # Write the comment data with detailed timing metrics
-        writer.writerow([
-            datetime.now().isoformat(),
-            comment,
-            classification,
-            tone,
-            special_flags,
-            reasoning_complete,
-            reasoning_sentiment,
-            reasoning_tone,
-            reasoning_special_flags,
-            model,
-            total_duration,
-            load_duration,
-            ollama_response.get('prompt_eval_count') if ollama_response else 'N/A',
-            prompt_eval_duration,
-            ollama_response.get('eval_count') if ollama_response else 'N/A',
-            eval_duration,
-            "Yes" if transcript_provided else "No",
-            video_id,
-            seed,
-            num_ctx
-        ])
+# Columns of the result log, one row per analyzed comment
+LOG_FIELDS = [
+    "Timestamp", "Comment", "Classification", "Tone", "Special_Flags",
+    "Reasoning_Complete", "Reasoning_Sentiment", "Reasoning_Tone", "Reasoning_Special_Flags",
+    "Model", "Total_Duration", "Load_Duration", "Prompt_Eval_Count",
+    "Prompt_Eval_Duration", "Eval_Count", "Eval_Duration",
+    "TranscriptProvided", "VideoID", "seed", "num_ctx", "cache_hit"
+]
+# Written in the background in LOG_FORMAT (csv, jsonl or parquet), see log_sink.py
+log_sink = LogSink(log_path(CSV_FILE), LOG_FIELDS)
+
+def log_result(comment, classification, tone=None, special_flags=None, reasoning=None, model=None,
+               execution_time=None, transcript_provided=False, video_id=None, ollama_response=None, seed=None, num_ctx=None,
+               cache_hit=False):
+    # Format Ollama timing metrics if available
+    total_duration = format_duration(ollama_response.get('total_duration') if ollama_response else 'N/A')
+    load_duration = format_duration(ollama_response.get('load_duration') if ollama_response else 'N/A')
+    prompt_eval_duration = format_duration(ollama_response.get('prompt_eval_duration') if ollama_response else 'N/A')
+    eval_duration = format_duration(ollama_response.get('eval_duration') if ollama_response else 'N/A')
+
+    # Extract individual reasoning components
+    reasoning_complete = json.dumps(reasoning) if reasoning else 'N/A'
+    reasoning_sentiment = reasoning.get('sentiment', 'N/A') if reasoning else 'N/A'
+    reasoning_tone = reasoning.get('tone', 'N/A') if reasoning else 'N/A'
+    reasoning_special_flags = reasoning.get('special_flags', 'N/A') if reasoning else 'N/A'
+
+    # Queue the comment data with detailed timing metrics; never waits for the disk
+    log_sink.log(dict(zip(LOG_FIELDS, [
+        datetime.now().isoformat(),
+        comment,
+        classification,
+        tone,
+        special_flags,
+        reasoning_complete,
+        reasoning_sentiment,
+        reasoning_tone,
+        reasoning_special_flags,
+        model,
+        total_duration,
+        load_duration,
+        ollama_response.get('prompt_eval_count') if ollama_response else 'N/A',
+        prompt_eval_duration,
+        ollama_response.get('eval_count') if ollama_response else 'N/A',
+        eval_duration,
+        "Yes" if transcript_provided else "No",
+        video_id,
+        seed,
+        num_ctx,
+        "Yes" if cache_hit else "No"
+    ])))
+
+# Ollama calls, transcript downloads and file writes are blocking, so they run
+# in bounded thread pools instead of on the event loop. MAX_CONCURRENT_INFERENCE
+# limits how many generations are sent to Ollama at the same time; the file
+# pool (result cache) has a single thread.
+MAX_CONCURRENT_INFERENCE = int(os.environ.get("MAX_CONCURRENT_INFERENCE", 4))
+inference_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_INFERENCE, thread_name_prefix="inference")
+transcript_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="transcript")
+file_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file")
+
+async def run_blocking(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
 
 # Create a FastAPI instance
 app = FastAPI()
@@ -83,8 +112,114 @@ app.add_middleware(
     allow_headers=["Content-Type"],
 )
 
-# Ollama API endpoint
-OLLAMA_URL = "http://localhost:11434/api/generate"
+# Pooled keep-alive client for the Ollama API endpoint (OLLAMA_URL)
+client = get_client(OLLAMA_URL)
+
+# Prometheus metrics of /analyze, served at GET /metrics. Labels: the model
+# and the context mode ("with" or "without" a transcript in the prompt).
+metrics = MetricsRegistry(prefix="ollama_custom_")
+REQUESTS = metrics.counter("requests_total", "Requests to /analyze", ["model", "context", "cache_hit"])
+ERRORS = metrics.counter("errors_total", "Failed /analyze requests by error type", ["model", "context", "type"])
+REQUEST_SECONDS = metrics.histogram("request_seconds", "Latency of /analyze", ["model", "context", "cache_hit"])
+# queue_wait, transcript_fetch, prompt_build, model_call (split into the
+# Ollama durations ollama_load, ollama_prompt_eval, ollama_eval),
+# json_parse and log_write; for /analyze_stream also time_to_label, from
+# the request to the sentiment event
+STAGE_SECONDS = metrics.histogram("stage_seconds", "Latency of the stages of /analyze", ["stage", "model", "context"])
+OLLAMA_DURATIONS = {"ollama_load": "load_duration", "ollama_prompt_eval": "prompt_eval_duration", "ollama_eval": "eval_duration"}
+
+async def generate(payload, labels):
+    # Ollama generation on the inference pool; records how long the call
+    # waited for a free slot, how long it took and Ollama's own timings
+    submitted = time.perf_counter()
+
+    def call():
+        started = time.perf_counter()
+        STAGE_SECONDS.observe(started - submitted, stage="queue_wait", **labels)
+        try:
+            return client.generate(payload)
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="model_call", **labels)
+
+    response = await run_blocking(inference_executor, call)
+    for stage, key in OLLAMA_DURATIONS.items():
+        if response.get(key) is not None:
+            STAGE_SECONDS.observe(response[key] / 1e9, stage=stage, **labels)
+    return response
+
+async def generate_stream(payload, labels, stop):
+    # Streaming variant of generate(): returns an async iterator of the
+    # Ollama chunks once the first one has arrived, so connection errors
+    # are raised here like in generate(). The generation holds its
+    # inference slot until it is done, the iterator is closed or the
+    # threading.Event stop is set (also when the iterator was never used).
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    submitted = time.perf_counter()
+
+    def call():
+        started = time.perf_counter()
+        STAGE_SECONDS.observe(started - submitted, stage="queue_wait", **labels)
+        lines = client.generate_stream(payload)
+        try:
+            for chunk in lines:
+                loop.call_soon_threadsafe(chunks.put_nowait, ("chunk", chunk))
+                if stop.is_set():
+                    break
+            loop.call_soon_threadsafe(chunks.put_nowait, ("end", None))
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, ("error", e))
+        finally:
+            lines.close()
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="model_call", **labels)
+
+    loop.run_in_executor(inference_executor, call)
+    kind, item = await chunks.get()
+    if kind == "error":
+        raise item
+
+    async def iterate(kind, item):
+        try:
+            while kind == "chunk":
+                if item.get("done"):
+                    for stage, key in OLLAMA_DURATIONS.items():
+                        if item.get(key) is not None:
+                            STAGE_SECONDS.observe(item[key] / 1e9, stage=stage, **labels)
+                yield item
+                kind, item = await chunks.get()
+            if kind == "error":
+                raise item
+        finally:
+            stop.set()
+
+    return iterate(kind, item)
+
+# Results of earlier identical requests (memory + SQLite)
+result_cache = ResultCache()
+
+# Transcripts per video (memory + disk), downloaded once per video
+transcript_cache = TranscriptCache(
+    YouTubeTranscriptApi.get_transcript,
+    lambda func, *args: run_blocking(transcript_executor, func, *args),
+)
+
+async def summarize_transcript(model, text, max_words):
+    response = await run_blocking(inference_executor, client.generate, {
+        "model": model,
+        "prompt": f"Summarize this part of a YouTube video transcript in at most {max_words} words. "
+                  f"Keep the topics, claims and the tone of the speaker.\n\n{text}",
+        "stream": False,
+        "options": {"temperature": 0, "seed": 1, "num_ctx": 4096},
+    })
+    return response["response"].strip()
+
+# Transcripts over the token budget of the model are reduced to the most
+# relevant chunks or a cached summary before they go into the prompt
+transcript_context = TranscriptContext(
+    lambda func, *args: run_blocking(transcript_executor, func, *args),
+    summarize_fn=summarize_transcript,
+    result_cache=result_cache,
+)
 
 
 def create_schema():
@@ -180,9 +315,26 @@ def create_schema():
         "required": ["sentiment", "tone", "special_flags", "reasoning"]
     }
 
-@app.post("/analyze")
-async def analyze_comment(request: Request):
+def stream_response(events, background=None):
+    return StreamingResponse(events, media_type="text/event-stream", background=background,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def result_events(result):
+    # A cached answer as the events of a stream
+    for field in ("sentiment", "tone", "special_flags"):
+        yield sse(field, {field: result[field]})
+    for part, text in (result["reasoning"] or {}).items():
+        yield sse("reasoning", {"part": part, "text": text})
+    yield sse("done", result)
+
+
+async def analyze(request, stream=False):
     start_time = time.time()
+    labels = {"model": "unknown", "context": "without"}
+    error_type = None
+    cache_hit = False
+    # Set once a stream response owns the request metrics
+    streaming = False
     try:
         body = await request.json()
         logger.info(f"Incoming request body: {body}")
@@ -191,14 +343,47 @@ async def analyze_comment(request: Request):
         # preserve special characters in the comment: Single quotes (') Double quotes (") Percent signs (%) Curly braces ({}) Backticks (`)  Newlines (\n) Escape characters (\)
         comment = json.dumps(comment_base)
         set_model = body.get("model", "llama3.2:1b")
+        fetch_start = time.perf_counter()
         transcript_base = body.get("transcript", "")
-        transcript = json.dumps(transcript_base)
+        # With include_transcript the transcript is taken from the cache filled
+        # by /prefetch_transcript. If it isn't ready yet the comment is analyzed
+        # without context rather than waiting for the download.
         video_id = body.get("video_id")
+        if video_id is not None and not isinstance(video_id, str):
+            error_type = "bad_request"
+            raise HTTPException(status_code=400, detail="video_id must be a string")
+        if not transcript_base and body.get("include_transcript") and video_id:
+            try:
+                cached_transcript = await transcript_cache.cached(video_id)
+                if cached_transcript is not None:
+                    transcript_base = "\n".join([entry['text'] for entry in cached_transcript])
+                else:
+                    transcript_cache.prefetch(video_id)
+            except ValueError as e:
+                logger.warning(f"Not using the transcript: {e}")
         
         if not comment:
             logger.error("Comment is required")
+            error_type = "bad_request"
             raise HTTPException(status_code=400, detail="Comment is required")
 
+        schema = create_schema()
+        set_model = "mistral-small:22b" #"llama3.2:1b" #"qwen2.5:3b",#"mistral-small:22b",#"llama3.2:1b", #mistral-small:22b
+        labels["model"] = set_model
+        # for reproducibility
+        seed = 1
+        # context length
+        num_ctx = 4096
+
+        # Keep the transcript within the token budget of the model
+        transcript_base, context_method = await transcript_context.build(transcript_base, comment_base, set_model, num_ctx)
+        if context_method != "full":
+            logger.info(f"Transcript reduced ({context_method}) to {len(transcript_base)} characters")
+        transcript = json.dumps(transcript_base)
+        labels["context"] = "with" if transcript_base else "without"
+        STAGE_SECONDS.observe(time.perf_counter() - fetch_start, stage="transcript_fetch", **labels)
+        build_start = time.perf_counter()
+
         # Include transcript context if available
         context_text = ""
         if transcript:
@@ -210,7 +395,10 @@ Your goal is to analyze and classify a comment based on a provided transcript
 Using the above video transcript as context,
 """
             
-        prompt = f"""
+        # Everything before the comment is the same for every comment on a
+        # video. It comes first and must stay identical byte for byte so
+        # Ollama can reuse the KV cache of the transcript.
+        prompt_prefix = f"""
 {context_text} analyze and classify the **YouTube COMMENT** using the multi-tier system below:
 
 **Step 1: Primary Classification** 
@@ -274,58 +462,186 @@ Mark if any apply:
 - Contextual/cultural considerations
 3. Flag special cases in reasoning
 
-**YouTube Comment**:
+"""
+        prompt_comment = f"""**YouTube Comment**:
 "{comment}"
 """
+        prompt = prompt_prefix + prompt_comment
 
-        schema = create_schema()
-        set_model = "mistral-small:22b" #"llama3.2:1b" #"qwen2.5:3b",#"mistral-small:22b",#"llama3.2:1b", #mistral-small:22b
-        # for reproducibility
-        seed = 1
-        # context length
-        num_ctx = 4096
-        try:
-            response = None
-            response = ollama.generate(
-            model=set_model,
-            prompt= prompt,#prompt,
-            format= schema, 
-            options={
+        # The same comment with the same transcript, model and settings is
+        # answered from the cache instead of running the model again
+        cache_key = make_cache_key(
+            comment_base, transcript_base, set_model, schema, seed, num_ctx, None
+        )
+        STAGE_SECONDS.observe(time.perf_counter() - build_start, stage="prompt_build", **labels)
+        # Memory hits are answered inline; the SQLite lookup runs on the file pool
+        cached_result = result_cache.get_memory(cache_key)
+        if cached_result is None:
+            cached_result = await run_blocking(file_executor, result_cache.get_disk, cache_key)
+        if cached_result is not None:
+            cache_hit = True
+            logger.info(f"Cache hit: {cached_result.get('sentiment')}")
+            log_result(
+                comment=comment,
+                classification=cached_result.get('sentiment'),
+                tone="|".join(cached_result.get('tone', [])),
+                special_flags="|".join(cached_result.get('special_flags', [])),
+                reasoning=cached_result.get('reasoning'),
+                model=set_model,
+                execution_time=time.time() - start_time,
+                transcript_provided=bool(transcript),
+                video_id=video_id,
+                seed=seed,
+                num_ctx=num_ctx,
+                cache_hit=True
+            )
+            result = {
+                "sentiment": cached_result.get('sentiment'),
+                "tone": cached_result.get('tone', []),
+                "special_flags": cached_result.get('special_flags', []),
+                "reasoning": cached_result.get('reasoning')
+            }
+            return stream_response(result_events(result)) if stream else result
+
+        payload = {
+            "model": set_model,
+            "prompt": prompt,
+            "format": schema,
+            "stream": False,
+            "options": {
                 "seed": seed,
                 "num_ctx": num_ctx,
-                },
-            )
+            },
+        }
+
+        if stream:
+            stop = threading.Event()
+            try:
+                chunks = await generate_stream(payload, labels, stop)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to connect to Ollama: {e}")
+                error_type = "ollama_unavailable"
+                raise HTTPException(status_code=503, detail="Ollama service unavailable")
+
+            finished = False
+
+            async def finish(stream_error=None):
+                # Ends the generation and records the request exactly once:
+                # at the end of events(), or from the response's background
+                # task when the client left before the body was iterated
+                nonlocal finished
+                if finished:
+                    return
+                finished = True
+                stop.set()
+                await chunks.aclose()
+                if stream_error:
+                    ERRORS.inc(type=stream_error, **labels)
+                REQUESTS.inc(cache_hit="false", **labels)
+                REQUEST_SECONDS.observe(time.time() - start_time, cache_hit="false", **labels)
+
+            async def events():
+                # Each classification field as soon as the model has written
+                # it, then the reasoning as it is generated, then the whole result
+                stream_error = None
+                parser = JSONStreamParser()
+                text = []
+                final = None
+                try:
+                    async for chunk in chunks:
+                        if "error" in chunk:
+                            raise ValueError(chunk["error"])
+                        text.append(chunk.get("response", ""))
+                        for kind, path, value in parser.feed(chunk.get("response", "")):
+                            if kind == "value" and path[0] in ("sentiment", "tone", "special_flags"):
+                                if path[0] == "sentiment":
+                                    STAGE_SECONDS.observe(time.time() - start_time, stage="time_to_label", **labels)
+                                yield sse(path[0], {path[0]: value})
+                            elif kind == "text" and len(path) == 2 and path[0] == "reasoning":
+                                yield sse("reasoning", {"part": path[1], "text": value})
+                        if chunk.get("done"):
+                            final = chunk
+                    if final is None:
+                        raise ValueError("Stream ended before the generation was done")
+                    with STAGE_SECONDS.time(stage="json_parse", **labels):
+                        result = json.loads("".join(text))
+
+                    with STAGE_SECONDS.time(stage="log_write", **labels):
+                        log_result(
+                            comment=comment,
+                            classification=result.get('sentiment'),
+                            tone="|".join(result.get('tone', [])),
+                            special_flags="|".join(result.get('special_flags', [])),
+                            reasoning=result.get('reasoning'),
+                            model=set_model,
+                            execution_time=time.time() - start_time,
+                            transcript_provided=bool(transcript),
+                            video_id=video_id,
+                            ollama_response=final,
+                            seed=seed,
+                            num_ctx=num_ctx
+                        )
+                    await run_blocking(file_executor, result_cache.set, cache_key, result)
+                    yield sse("done", {
+                        "sentiment": result.get('sentiment'),
+                        "tone": result.get('tone', []),
+                        "special_flags": result.get('special_flags', []),
+                        "reasoning": result.get('reasoning')
+                    })
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Ollama stream failed: {e}")
+                    stream_error = "ollama_unavailable"
+                    yield sse("error", {"detail": "Ollama service unavailable"})
+                except ValueError as e:
+                    logger.error(f"Invalid response format from Ollama: {e}")
+                    stream_error = "invalid_response"
+                    yield sse("error", {"detail": "Invalid response from Ollama service"})
+                finally:
+                    # Also reached when the client disconnects mid-stream
+                    await finish(stream_error)
+
+            streaming = True
+            return stream_response(events(), background=BackgroundTask(finish))
+
+        try:
+            response = None
+            response = await generate(payload, labels)
 
-            result = json.loads(response['response'])
+            with STAGE_SECONDS.time(stage="json_parse", **labels):
+                result = json.loads(response['response'])
 
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to connect to Ollama: {e}")
+            error_type = "ollama_unavailable"
             raise HTTPException(status_code=503, detail="Ollama service unavailable")
+        except (KeyError, json.JSONDecodeError) as e:
+            logger.error(f"Invalid response format from Ollama: {e}")
+            error_type = "invalid_response"
+            raise HTTPException(status_code=500, detail="Invalid response from Ollama service")
 
         if (response.get('done', False)):
-            print("successfull request")
-            
-
             tone_str = "|".join(result.get('tone', []))
             special_flags_str = "|".join(result.get('special_flags', []))
             
-            # Save results to CSV
+            # Log the results (written in the background)
             execution_time = time.time() - start_time
-            save_to_csv(
-                comment=comment,
-                classification=result.get('sentiment'),
-                tone=tone_str,
-                special_flags=special_flags_str,
-                reasoning=result.get('reasoning'),
-                model=set_model,
-                execution_time=execution_time,
-                transcript_provided=bool(transcript),
-                video_id=video_id,
-                ollama_response=response,
-                seed=seed,
-                num_ctx=num_ctx
-            )            
+            with STAGE_SECONDS.time(stage="log_write", **labels):
+                log_result(
+                    comment=comment,
+                    classification=result.get('sentiment'),
+                    tone=tone_str,
+                    special_flags=special_flags_str,
+                    reasoning=result.get('reasoning'),
+                    model=set_model,
+                    execution_time=execution_time,
+                    transcript_provided=bool(transcript),
+                    video_id=video_id,
+                    ollama_response=response,
+                    seed=seed,
+                    num_ctx=num_ctx
+                )
+            await run_blocking(file_executor, result_cache.set, cache_key, result)
             
 
             return {
@@ -335,12 +651,37 @@ Mark if any apply:
             "reasoning": result.get('reasoning')
         }
         else:
+            error_type = "invalid_response"
             raise HTTPException(status_code=500, detail="Error processing Ollama request")
 
+    except HTTPException as e:
+        # 400 / 503 / 500 raised above keep their status code
+        execution_time = time.time() - start_time
+        logger.error(f"Error analyzing comment: {e.detail}. Execution time: {execution_time:.2f}s")
+        ERRORS.inc(type=error_type or "internal", **labels)
+        raise
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Error analyzing comment: {str(e)}. Execution time: {execution_time:.2f}s")
+        ERRORS.inc(type=error_type or "internal", **labels)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if not streaming:
+            hit = "true" if cache_hit else "false"
+            REQUESTS.inc(cache_hit=hit, **labels)
+            REQUEST_SECONDS.observe(time.time() - start_time, cache_hit=hit, **labels)
+
+@app.post("/analyze")
+async def analyze_comment(request: Request):
+    return await analyze(request)
+
+@app.post("/analyze_stream")
+async def analyze_comment_stream(request: Request):
+    # /analyze as Server-Sent Events: "sentiment", "tone" and
+    # "special_flags" as soon as the model has produced them, "reasoning"
+    # pieces as they are generated, then "done" with the same JSON /analyze
+    # returns (or "error")
+    return await analyze(request, stream=True)
 
 @app.post("/get_transcript")
 async def get_transcript(request: Request):
@@ -352,7 +693,7 @@ async def get_transcript(request: Request):
             raise HTTPException(status_code=400, detail="Video ID is required")
             
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
+            transcript = await transcript_cache.get(video_id)
             full_transcript = "\n".join([entry['text'] for entry in transcript])
             return {"transcript": full_transcript}
         except Exception as e:
@@ -363,6 +704,58 @@ async def get_transcript(request: Request):
         logger.error(f"Error processing transcript request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/prefetch_transcript")
+async def prefetch_transcript(request: Request):
+    # Called by the extension when a video page opens, so the transcript is
+    # ready by the time comments are analyzed
+    body = await request.json()
+    video_id = body.get("video_id")
+
+    if not video_id:
+        raise HTTPException(status_code=400, detail="Video ID is required")
+    try:
+        status = transcript_cache.prefetch(video_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"video_id": video_id, "status": status}
+
+@app.get("/transcript_cache_stats")
+async def get_transcript_cache_stats():
+    return transcript_cache.stats()
+
+@app.get("/transcript_context_stats")
+async def get_transcript_context_stats():
+    return transcript_context.stats()
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    # Hit/miss counters and size of the result cache
+    return await run_blocking(file_executor, result_cache.stats)
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text format
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/log_stats")
+async def get_log_stats():
+    # Rows queued, written and dropped by the background result log
+    return log_sink.stats()
+
+@app.on_event("startup")
+async def start_log_sink():
+    await log_sink.start()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    # Rows still queued are written before the server exits
+    await log_sink.stop()
+    inference_executor.shutdown(wait=True)
+    transcript_executor.shutdown(wait=True)
+    file_executor.shutdown(wait=True)
+    result_cache.close()
+
 # Run the server
 if __name__ == "__main__":
     import uvicorn
@@ -371,10 +764,7 @@ if __name__ == "__main__":
 
     print("Loading the model ..")
     response = None
-    response = ollama.generate(
-        model= model_to_load,
-        keep_alive = -1
-    )
+    response = client.load_model(model_to_load)
     
     if (response.get('done', False)):
         print("successfull loaded: ", model_to_load)
@@ -385,10 +775,7 @@ if __name__ == "__main__":
 
         # Unload the model after the server is stopped
     print("Unloading the model ..") 
-    response = ollama.generate(
-        model= model_to_load,
-        keep_alive = 0
-        )
+    response = client.unload_model(model_to_load)
     if (response.get('done', False)):
         print("successfull unloaded: ", model_to_load)
     else:
@@ -18,6 +18,27 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
     }
 });
 
+// Prefetch the transcript as soon as a video page opens, so it is cached on
+// the server before the first comment is analyzed
+chrome.tabs.onUpdated.addListener((tabId, changeInfo, tab) => {
+    const pageUrl = changeInfo.url || (changeInfo.status === 'complete' ? tab.url : null);
+    if (!pageUrl) {
+        return;
+    }
+
+    const url = new URL(pageUrl);
+    const videoId = url.searchParams.get('v');
+    if (url.hostname !== 'www.youtube.com' || url.pathname !== '/watch' || !videoId) {
+        return;
+    }
+
+    fetch('http://localhost:8002/prefetch_transcript', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ video_id: videoId })
+    }).catch(error => console.error('Error prefetching transcript:', error));
+});
+
 // Add this new function at the end of the file
 async function getTranscript(sendResponse) { 
     try {
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+# Registry of the Ollama models the server may route to, and the set of them
+# kept loaded ("warm"). Warm models are loaded with keep_alive=-1 and count
+# against a memory budget; when a cold model does not fit, the least recently
+# used idle model is unloaded (keep_alive=0) first. Cold loads run one at a
+# time, so concurrent requests for a cold model wait for a single load
+# instead of each triggering one.
+
+logger = logging.getLogger(__name__)
+
+# Approximate memory (GB) per model; only these models can be requested
+OLLAMA_MODELS = json.loads(os.environ.get("OLLAMA_MODELS", '{"mistral-small:22b": 14}'))
+# Model for requests that do not name one
+OLLAMA_DEFAULT_MODEL = os.environ.get("OLLAMA_DEFAULT_MODEL", "mistral-small:22b")
+# Models loaded at startup, comma separated (default: the default model)
+OLLAMA_WARM_MODELS = [m for m in os.environ.get("OLLAMA_WARM_MODELS", OLLAMA_DEFAULT_MODEL).split(",") if m]
+# Memory available to warm models, in GB
+OLLAMA_MEMORY_BUDGET_GB = float(os.environ.get("OLLAMA_MEMORY_BUDGET_GB", 24))
+
+
+class ModelPool:
+    def __init__(self, load_fn, unload_fn, models=OLLAMA_MODELS, default_model=OLLAMA_DEFAULT_MODEL,
+                 budget_gb=OLLAMA_MEMORY_BUDGET_GB):
+        # load_fn(model) / unload_fn(model) are awaitables that load a model
+        # with keep_alive=-1 / unload it with keep_alive=0
+        if default_model not in models:
+            raise ValueError(f"Default model '{default_model}' is not in OLLAMA_MODELS")
+        self.load_fn = load_fn
+        self.unload_fn = unload_fn
+        self.models = models
+        self.default_model = default_model
+        self.budget_gb = budget_gb
+        # Warm models, least recently used first
+        self.warm = OrderedDict()
+        self.in_use = {model: 0 for model in models}
+        self.load_lock = asyncio.Lock()
+
+        # Per-model counters
+        self.counters = {model: {
+            "requests": 0, "cold_requests": 0, "loads": 0, "load_seconds": 0.0, "evictions": 0,
+            "ollama_load_seconds": 0.0, "inference_seconds": 0.0, "inferences": 0,
+        } for model in models}
+
+    def resolve(self, requested=None):
+        # Model name for a request; raises ValueError for unknown models
+        model = requested or self.default_model
+        if model not in self.models:
+            raise ValueError(f"Unknown model '{model}', expected one of {', '.join(self.models)}")
+        return model
+
+    def used_gb(self):
+        return sum(self.models[model] for model in self.warm)
+
+    async def acquire(self, model):
+        # Makes sure the model is loaded and marks it busy until release()
+        self.counters[model]["requests"] += 1
+        self.in_use[model] += 1
+        try:
+            if model in self.warm:
+                self.warm.move_to_end(model)
+                return
+            self.counters[model]["cold_requests"] += 1
+            async with self.load_lock:
+                # Another request may have loaded it while this one waited
+                if model not in self.warm:
+                    await self._evict_for(model)
+                    await self._load(model)
+        except BaseException:
+            self.in_use[model] -= 1
+            raise
+
+    def release(self, model):
+        self.in_use[model] -= 1
+        if self.used_gb() > self.budget_gb and self.in_use[model] == 0:
+            # A load went over budget while every warm model was busy
+            asyncio.ensure_future(self._trim())
+
+    async def _trim(self):
+        async with self.load_lock:
+            for candidate in list(self.warm):
+                if self.used_gb() <= self.budget_gb:
+                    return
+                if self.in_use[candidate] == 0:
+                    await self.unload(candidate)
+                    self.counters[candidate]["evictions"] += 1
+
+    async def _evict_for(self, model):
+        for candidate in list(self.warm):
+            if self.used_gb() + self.models[model] <= self.budget_gb:
+                return
+            if self.in_use[candidate] == 0:
+                await self.unload(candidate)
+                self.counters[candidate]["evictions"] += 1
+        if self.used_gb() + self.models[model] > self.budget_gb:
+            logger.warning(f"Loading {model} over the memory budget: all warm models are busy")
+
+    async def _load(self, model):
+        start = time.perf_counter()
+        await self.load_fn(model)
+        seconds = time.perf_counter() - start
+        self.warm[model] = True
+        self.counters[model]["loads"] += 1
+        self.counters[model]["load_seconds"] += seconds
+        logger.info(f"Loaded {model} in {seconds:.1f}s ({self.used_gb():g}/{self.budget_gb:g} GB)")
+
+    async def unload(self, model):
+        # Not warm from here on, so no new request counts on it
+        self.warm.pop(model, None)
+        await self.unload_fn(model)
+        logger.info(f"Unloaded {model}")
+
+    async def warm_up(self, models=OLLAMA_WARM_MODELS):
+        # A model that fails to load here is loaded by its first request
+        for model in models:
+            try:
+                async with self.load_lock:
+                    if model not in self.warm:
+                        await self._evict_for(model)
+                        await self._load(model)
+            except Exception as e:
+                logger.warning(f"Could not load {model} at startup: {e}")
+
+    def record(self, model, response, seconds):
+        # Ollama's load time versus the rest of a generation
+        load_seconds = (response.get("load_duration") or 0) / 1e9
+        counters = self.counters[model]
+        counters["ollama_load_seconds"] += load_seconds
+        counters["inference_seconds"] += seconds - load_seconds
+        counters["inferences"] += 1
+
+    def stats(self):
+        models = {}
+        for model, counters in self.counters.items():
+            models[model] = {
+                "warm": model in self.warm,
+                "memory_gb": self.models[model],
+                "in_use": self.in_use[model],
+                "requests": counters["requests"],
+                "cold_requests": counters["cold_requests"],
+                "loads": counters["loads"],
+                "evictions": counters["evictions"],
+                "avg_load_s": round(counters["load_seconds"] / counters["loads"], 3) if counters["loads"] else 0.0,
+                "avg_ollama_load_s": round(counters["ollama_load_seconds"] / counters["inferences"], 3) if counters["inferences"] else 0.0,
+                "avg_inference_s": round(counters["inference_seconds"] / counters["inferences"], 3) if counters["inferences"] else 0.0,
+            }
+        return {
+            "default_model": self.default_model,
+            "budget_gb": self.budget_gb,
+            "used_gb": self.used_gb(),
+            "models": models,
+        }
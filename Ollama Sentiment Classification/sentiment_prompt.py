@@ -0,0 +1,45 @@
+# Prompt of /analyze, also used by Benchmarks/prefix_reuse_parity.py.
+# Everything before the comment is the same for every comment on a video.
+# It comes first and must stay identical byte for byte so Ollama can reuse
+# the KV cache of the transcript.
+
+default_schema = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"enum": ["POSITIVE", "NEUTRAL", "NEGATIVE"]},
+        "reasoning": {"type": "string"}
+    },
+    "required": ["sentiment", "reasoning"]
+}
+
+
+def prompt_prefix(transcript):
+    # Task, transcript (if any) and instructions
+    context = f"\nVideo Transcript Context:\n{transcript}" if transcript else ""
+    return f"""
+            Task: Analyze the sentiment of the YouTube comment and provide detailed reasoning.
+            {context}
+
+            Instructions:
+            1. Analyze the comment's emotional tone, word choice, and context
+            2. If transcript is provided, consider the video context in your analysis
+            3. Classify the sentiment as POSITIVE, NEUTRAL, or NEGATIVE
+            4. Provide clear reasoning that includes:
+               - Tone analysis
+               - Key phrases or words that influenced your decision
+               - Context consideration from the transcript if available
+            5. Format your response as a JSON object with two fields:
+               - sentiment: Your classification (POSITIVE/NEUTRAL/NEGATIVE)
+               - reasoning: Your detailed analysis
+
+"""
+
+
+def prompt_comment(comment):
+    return f"""            YouTube Comment to analyze:
+            "{comment}"
+            """
+
+
+def build_prompt(transcript, comment):
+    return prompt_prefix(transcript) + prompt_comment(comment)
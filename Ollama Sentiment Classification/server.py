@@ -1,15 +1,33 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 import requests
 import logging
 import json
-import csv
 import time
+import os
+import sys
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from youtube_transcript_api import YouTubeTranscriptApi  # Add this import
-import ollama
-
-# Path to the CSV file
+# Helper modules shared by the servers and scripts live in shared/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from ollama_client import OLLAMA_URL, get_client
+from result_cache import ResultCache, make_cache_key
+from transcript_cache import TranscriptCache
+from transcript_context import TranscriptContext
+from log_sink import LogSink, log_path
+from server_metrics import CONTENT_TYPE, MetricsRegistry
+from model_pool import ModelPool
+from cascade import escalation_reason
+from stream_json import JSONStreamParser, sse
+from sentiment_prompt import build_prompt, default_schema
+
+# Path to the result log (the extension follows LOG_FORMAT)
 CSV_FILE = "./analyzed_comments_ollama_sentiment.csv"
 def format_duration(duration):
     if duration == 'N/A':
@@ -17,44 +35,61 @@ def format_duration(duration):
     # Convert nanoseconds to seconds and format with 2 decimal places
     return f"{duration / 1e9:.2f}"
 
-def save_to_csv(comment, sentiment, reasoning=None, model=None, transcript_provided=False, video_id=None, ollama_response = None, seed = None, num_ctx = None):
-    with open(CSV_FILE, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        # Write the header if the file is empty
-        if file.tell() == 0:
-            writer.writerow([
-                "Timestamp", "Comment", "Sentiment", "Reasoning", 
-                "Model", "Total_Duration", "Load_Duration", "Prompt_Eval_Count",
-                "Prompt_Eval_Duration", "Eval_Count", "Eval_Duration",
-                "TranscriptProvided", "VideoID", "seed", "num_ctx"
-            ])
-     
-
-        # Format Ollama timing metrics if available
-        total_duration = format_duration(ollama_response.get('total_duration') if ollama_response else 'N/A')
-        load_duration = format_duration(ollama_response.get('load_duration') if ollama_response else 'N/A')
-        prompt_eval_duration = format_duration(ollama_response.get('prompt_eval_duration') if ollama_response else 'N/A')
-        eval_duration = format_duration(ollama_response.get('eval_duration') if ollama_response else 'N/A')
-        
-        # Write the comment data with execution time
-        writer.writerow([
-            datetime.now().isoformat(),
-            comment,
-            sentiment,
-            reasoning,
-            model,
-            total_duration,
-            load_duration,
-            ollama_response.get('prompt_eval_count') if ollama_response else 'N/A',
-            prompt_eval_duration,
-            ollama_response.get('eval_count') if ollama_response else 'N/A',
-            eval_duration,
-            "Yes" if transcript_provided else "No",
-            video_id,
-            seed,
-            num_ctx
-        ])
-
+# Columns of the result log, one row per analyzed comment
+LOG_FIELDS = [
+    "Timestamp", "Comment", "Sentiment", "Reasoning",
+    "Model", "Total_Duration", "Load_Duration", "Prompt_Eval_Count",
+    "Prompt_Eval_Duration", "Eval_Count", "Eval_Duration",
+    "TranscriptProvided", "VideoID", "seed", "num_ctx", "cache_hit"
+]
+# Written in the background in LOG_FORMAT (csv, jsonl or parquet), see log_sink.py
+log_sink = LogSink(log_path(CSV_FILE), LOG_FIELDS)
+
+def log_result(comment, sentiment, reasoning=None, model=None, transcript_provided=False, video_id=None, ollama_response = None, seed = None, num_ctx = None, cache_hit = False):
+    # Format Ollama timing metrics if available
+    total_duration = format_duration(ollama_response.get('total_duration') if ollama_response else 'N/A')
+    load_duration = format_duration(ollama_response.get('load_duration') if ollama_response else 'N/A')
+    prompt_eval_duration = format_duration(ollama_response.get('prompt_eval_duration') if ollama_response else 'N/A')
+    eval_duration = format_duration(ollama_response.get('eval_duration') if ollama_response else 'N/A')
+
+    # Queue the comment data with execution time; never waits for the disk
+    log_sink.log(dict(zip(LOG_FIELDS, [
+        datetime.now().isoformat(),
+        comment,
+        sentiment,
+        reasoning,
+        model,
+        total_duration,
+        load_duration,
+        ollama_response.get('prompt_eval_count') if ollama_response else 'N/A',
+        prompt_eval_duration,
+        ollama_response.get('eval_count') if ollama_response else 'N/A',
+        eval_duration,
+        "Yes" if transcript_provided else "No",
+        video_id,
+        seed,
+        num_ctx,
+        "Yes" if cache_hit else "No"
+    ])))
+
+
+# Ollama calls, transcript downloads and file writes are blocking, so they run
+# in bounded thread pools instead of on the event loop. MAX_CONCURRENT_INFERENCE
+# limits how many generations are sent to Ollama at the same time; the file
+# pool (transcript.txt, result cache) has a single thread.
+MAX_CONCURRENT_INFERENCE = int(os.environ.get("MAX_CONCURRENT_INFERENCE", 4))
+inference_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_INFERENCE, thread_name_prefix="inference")
+transcript_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="transcript")
+file_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file")
+
+async def run_blocking(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+def write_transcript_file(transcript):
+    with open('transcript.txt', 'w') as file:
+        for i in transcript:
+            file.write(i['text'] + '\n')
 
 # Create a FastAPI instance
 app = FastAPI()
@@ -71,8 +106,181 @@ app.add_middleware(
     allow_headers=["Content-Type"],
 )
 
-# Ollama API endpoint
-OLLAMA_URL = "http://localhost:11434/api/generate"
+# Pooled keep-alive client for the Ollama API endpoint (OLLAMA_URL)
+client = get_client(OLLAMA_URL)
+
+# Prometheus metrics of /analyze, served at GET /metrics. Labels: the model
+# and the context mode ("with" or "without" a transcript in the prompt).
+metrics = MetricsRegistry(prefix="ollama_sentiment_")
+REQUESTS = metrics.counter("requests_total", "Requests to /analyze", ["model", "context", "cache_hit"])
+ERRORS = metrics.counter("errors_total", "Failed /analyze requests by error type", ["model", "context", "type"])
+REQUEST_SECONDS = metrics.histogram("request_seconds", "Latency of /analyze", ["model", "context", "cache_hit"])
+# queue_wait, transcript_fetch, prompt_build, model_call (split into the
+# Ollama durations ollama_load, ollama_prompt_eval, ollama_eval),
+# json_parse and log_write; for /analyze_stream also time_to_label, from
+# the request to the sentiment event
+STAGE_SECONDS = metrics.histogram("stage_seconds", "Latency of the stages of /analyze", ["stage", "model", "context"])
+# Cascade requests by route (distilbert, llm) and escalation reason
+CASCADE_ROUTES = metrics.counter("cascade_routes_total", "Cascade requests by route and escalation reason", ["route", "reason"])
+OLLAMA_DURATIONS = {"ollama_load": "load_duration", "ollama_prompt_eval": "prompt_eval_duration", "ollama_eval": "eval_duration"}
+
+# Models a request may name (OLLAMA_MODELS) and the ones kept loaded within
+# OLLAMA_MEMORY_BUDGET_GB, least recently used unloaded first (model_pool.py)
+WARM_OPTIONS = {"temperature": 0, "seed": 1, "num_ctx": 8192}
+model_pool = ModelPool(
+    lambda model: run_blocking(inference_executor, client.load_model, model, WARM_OPTIONS),
+    lambda model: run_blocking(inference_executor, client.unload_model, model),
+)
+
+async def generate(payload, labels):
+    # Ollama generation on the inference pool; records how long the call
+    # waited for a free slot, how long it took and Ollama's own timings.
+    # keep_alive=-1: a request without it would let Ollama unload the
+    # model after its default five minutes.
+    payload = dict(payload, keep_alive=-1)
+    submitted = time.perf_counter()
+    timing = {}
+
+    def call():
+        started = time.perf_counter()
+        STAGE_SECONDS.observe(started - submitted, stage="queue_wait", **labels)
+        try:
+            return client.generate(payload)
+        finally:
+            timing["seconds"] = time.perf_counter() - started
+            STAGE_SECONDS.observe(timing["seconds"], stage="model_call", **labels)
+
+    response = await run_blocking(inference_executor, call)
+    for stage, key in OLLAMA_DURATIONS.items():
+        if response.get(key) is not None:
+            STAGE_SECONDS.observe(response[key] / 1e9, stage=stage, **labels)
+    model_pool.record(payload["model"], response, timing["seconds"])
+    return response
+
+async def generate_stream(payload, labels, stop):
+    # Streaming variant of generate(): returns an async iterator of the
+    # Ollama chunks once the first one has arrived, so connection errors
+    # are raised here like in generate(). The generation holds its
+    # inference slot until it is done, the iterator is closed or the
+    # threading.Event stop is set (also when the iterator was never used).
+    payload = dict(payload, keep_alive=-1)
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    submitted = time.perf_counter()
+
+    def call():
+        started = time.perf_counter()
+        STAGE_SECONDS.observe(started - submitted, stage="queue_wait", **labels)
+        lines = client.generate_stream(payload)
+        try:
+            for chunk in lines:
+                loop.call_soon_threadsafe(chunks.put_nowait, ("chunk", chunk))
+                if stop.is_set():
+                    break
+            loop.call_soon_threadsafe(chunks.put_nowait, ("end", time.perf_counter() - started))
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, ("error", e))
+        finally:
+            lines.close()
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="model_call", **labels)
+
+    loop.run_in_executor(inference_executor, call)
+    kind, item = await chunks.get()
+    if kind == "error":
+        raise item
+
+    async def iterate(kind, item):
+        final = None
+        try:
+            while kind == "chunk":
+                if item.get("done"):
+                    final = item
+                yield item
+                kind, item = await chunks.get()
+            if kind == "error":
+                raise item
+            if final is not None:
+                for stage, key in OLLAMA_DURATIONS.items():
+                    if final.get(key) is not None:
+                        STAGE_SECONDS.observe(final[key] / 1e9, stage=stage, **labels)
+                model_pool.record(payload["model"], final, item)
+        finally:
+            stop.set()
+
+    return iterate(kind, item)
+
+# Results of earlier identical requests (memory + SQLite)
+result_cache = ResultCache()
+
+# Transcripts per video (memory + disk), downloaded once per video
+transcript_cache = TranscriptCache(
+    YouTubeTranscriptApi.get_transcript,
+    lambda func, *args: run_blocking(transcript_executor, func, *args),
+)
+# Video of the transcript currently in transcript.txt
+transcript_file_video_id = None
+
+async def summarize_transcript(model, text, max_words):
+    # Runs before the result cache lookup, so it holds the model itself
+    await model_pool.acquire(model)
+    try:
+        response = await run_blocking(inference_executor, client.generate, {
+            "model": model,
+            "prompt": f"Summarize this part of a YouTube video transcript in at most {max_words} words. "
+                      f"Keep the topics, claims and the tone of the speaker.\n\n{text}",
+            "stream": False,
+            "keep_alive": -1,
+            "options": {"temperature": 0, "seed": 1, "num_ctx": 8192},
+        })
+    finally:
+        model_pool.release(model)
+    return response["response"].strip()
+
+# Transcripts over the token budget of the model are reduced to the most
+# relevant chunks or a cached summary before they go into the prompt
+transcript_context = TranscriptContext(
+    lambda func, *args: run_blocking(transcript_executor, func, *args),
+    summarize_fn=summarize_transcript,
+    result_cache=result_cache,
+)
+
+# Cascade mode: the DistilBERT server (BERT_URL) answers first and only
+# comments it is unsure about, or that it handles poorly, reach the LLM
+# (cascade.py). On by default with CASCADE_MODE=1, or per request with
+# "cascade": true.
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "0") == "1"
+BERT_URL = os.environ.get("BERT_URL", "http://localhost:8001/analyze")
+BERT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+# Seconds to wait for a connection / for DistilBERT's answer
+BERT_TIMEOUT = (1, float(os.environ.get("BERT_TIMEOUT", 30)))
+# Keep-alive connections to the DistilBERT server. No retries: when it is
+# down the comment goes to the LLM right away.
+bert_session = requests.Session()
+# DistilBERT calls get their own pool, so slow transcript downloads never
+# hold up the first stage of the cascade
+bert_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("BERT_MAX_CONCURRENT", 8)), thread_name_prefix="bert")
+
+def bert_analyze(comment):
+    # {"sentiment": "POSITIVE", "confidence": 0.998} from the DistilBERT server
+    response = bert_session.post(BERT_URL, json={"comment": comment}, timeout=BERT_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+async def classify_with_bert(comment):
+    # DistilBERT's answer and the reason to escalate it (None: keep it)
+    try:
+        result = await run_blocking(bert_executor, bert_analyze, comment)
+    except ValueError as e:
+        # Not JSON (requests' JSONDecodeError is also a RequestException)
+        logger.warning(f"Unexpected DistilBERT answer, escalating to the LLM: {e}")
+        return None, "bert_invalid_response"
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"DistilBERT unavailable, escalating to the LLM: {e}")
+        return None, "bert_unavailable"
+    if not isinstance(result, dict) or "sentiment" not in result or not isinstance(result.get("confidence"), (int, float)):
+        logger.warning(f"Unexpected DistilBERT answer, escalating to the LLM: {result}")
+        return None, "bert_invalid_response"
+    return result, escalation_reason(comment, result["confidence"])
 
 
 def parse_response_to_json(response):
@@ -82,122 +290,264 @@ def parse_response_to_json(response):
     return json_response
 
 
-default_schema = {
-    "type": "object",
-    "properties": {
-        "sentiment": {"enum": ["POSITIVE", "NEUTRAL", "NEGATIVE"]},
-        "reasoning": {"type": "string"}
-    },
-    "required": ["sentiment", "reasoning"]
-}
+def stream_response(events, background=None):
+    return StreamingResponse(events, media_type="text/event-stream", background=background,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def result_events(result):
+    # A finished answer (cache hit, DistilBERT) as the events of a stream
+    yield sse("sentiment", {"sentiment": result["sentiment"]})
+    yield sse("reasoning", {"text": result["reasoning"]})
+    yield sse("done", result)
 
 
 # Fix the order of operations in the analyze_comment function
-@app.post("/analyze")
-async def analyze_comment(request: Request):
+async def analyze(request, stream=False):
     start_time = time.time()
+    labels = {"model": "unknown", "context": "without"}
+    error_type = None
+    cache_hit = False
+    acquired_model = None
+    # Set once a stream response owns the model and the request metrics
+    streaming = False
     try:
         body = await request.json()
         logger.info(f"Incoming request body: {body}")
         
         comment_base = body.get("comment")
-        print("comment_base: ", comment_base)
         # Removed json.dumps() to preserve emojis
         comment = comment_base
         
         model_type = body.get("modelType", "llama")
-        set_model = "mistral-small:22b" #qwen2.5:0.5b
+        # "model" picks one of OLLAMA_MODELS; without it the default model is used
+        try:
+            set_model = model_pool.resolve(body.get("model"))
+        except ValueError as e:
+            error_type = "bad_request"
+            raise HTTPException(status_code=400, detail=str(e))
+        labels["model"] = set_model
+        fetch_start = time.perf_counter()
         transcript_base = body.get("transcript", "")
+        # With include_transcript the transcript is taken from the cache filled
+        # by /prefetch_transcript. If it isn't ready yet the comment is analyzed
+        # without context rather than waiting for the download.
+        video_id = body.get("video_id")
+        if video_id is not None and not isinstance(video_id, str):
+            error_type = "bad_request"
+            raise HTTPException(status_code=400, detail="video_id must be a string")
+        if not transcript_base and body.get("include_transcript") and video_id:
+            try:
+                cached_transcript = await transcript_cache.cached(video_id)
+                if cached_transcript is not None:
+                    transcript_base = "\n".join([entry['text'] for entry in cached_transcript])
+                else:
+                    transcript_cache.prefetch(video_id)
+            except ValueError as e:
+                logger.warning(f"Not using the transcript: {e}")
         transcript = transcript_base
         
         # json dumps creates a string with double quotes representing a length of 2
-        if (len(transcript)>2):
-            print("transcript provided", len(transcript))
-            transcript_provided = True
-        else:
-            print("transcript not provided", len(transcript))
-            transcript_provided = False
-
-        video_id = None
+        transcript_provided = len(transcript) > 2
+        logger.debug(f"Transcript provided: {transcript_provided} ({len(transcript)} characters)")
 
-        if "video_id" in body:
-            video_id = body["video_id"]
-        
         if not comment:
             logger.error("Comment is required")
+            error_type = "bad_request"
             raise HTTPException(status_code=400, detail="Comment is required")
 
         if model_type == "llama":
-            # Modify the prompt to include transcript context if available
-            context = f"\nVideo Transcript Context:\n{transcript}" if transcript else ""
-            
-            prompt = f"""
-            Task: Analyze the sentiment of the YouTube comment and provide detailed reasoning.
-            {context}
-
-            Instructions:
-            1. Analyze the comment's emotional tone, word choice, and context
-            2. If transcript is provided, consider the video context in your analysis
-            3. Classify the sentiment as POSITIVE, NEUTRAL, or NEGATIVE
-            4. Provide clear reasoning that includes:
-               - Tone analysis
-               - Key phrases or words that influenced your decision
-               - Context consideration from the transcript if available
-            5. Format your response as a JSON object with two fields:
-               - sentiment: Your classification (POSITIVE/NEUTRAL/NEGATIVE)
-               - reasoning: Your detailed analysis
-
-            YouTube Comment to analyze:
-            "{comment}"
-            """
-              
-
-            schema = default_schema
-            # Prepare and send the request
-            
             # for reproducibility
             seed = 1
             # context length
             num_ctx = 8192 #4096 #8192 # 4096
             temperature= 0
 
+            escalation = None
+            if body.get("cascade", CASCADE_MODE):
+                bert_result, escalation = await classify_with_bert(comment)
+                if escalation is None:
+                    labels["model"] = BERT_MODEL
+                    CASCADE_ROUTES.inc(route="distilbert", reason="none")
+                    sentiment = bert_result["sentiment"]
+                    reasoning = f"DistilBERT confidence {bert_result['confidence']:.3f}"
+                    log_result(
+                        comment=comment,
+                        sentiment=sentiment,
+                        reasoning=reasoning,
+                        model=BERT_MODEL,
+                        transcript_provided=transcript_provided,
+                        video_id=video_id
+                    )
+                    result = {"sentiment": sentiment, "reasoning": reasoning,
+                              "confidence": bert_result["confidence"], "route": "distilbert"}
+                    return stream_response(result_events(result)) if stream else result
+                CASCADE_ROUTES.inc(route="llm", reason=escalation)
+            # Escalated answers say why they reached the LLM
+            route = {"route": "llm", "escalation_reason": escalation} if escalation else {}
+
+            # Keep the transcript within the token budget of the model
+            transcript, context_method = await transcript_context.build(transcript, comment, set_model, num_ctx)
+            if context_method != "full":
+                logger.info(f"Transcript reduced ({context_method}) to {len(transcript)} characters")
+            labels["context"] = "with" if transcript else "without"
+            STAGE_SECONDS.observe(time.perf_counter() - fetch_start, stage="transcript_fetch", **labels)
+            build_start = time.perf_counter()
+
+            # The transcript part of the prompt comes first (sentiment_prompt.py)
+            prompt = build_prompt(transcript, comment)
+              
+
+            schema = default_schema
+            # Prepare and send the request
+
             payload = {
-                "model": "mistral-small:22b",  # Replace with the model you want to use
+                "model": set_model,
                 "prompt": prompt,
                 "stream": False,
-                "format": {
-                "type": "object",
-                "properties": {
-                    "sentiment": {"enum": ["POSITIVE", "NEUTRAL", "NEGATIVE"]},
-                    "reasoning": {"type": "string"}
-                },
-                "required": ["sentiment", "reasoning"]
-            },
+                "format": schema,
                 "options" :
                         {
-                            "temperature": 0,
-                            "seed": 1,
-                            "num_ctx": 8192,
+                            "temperature": temperature,
+                            "seed": seed,
+                            "num_ctx": num_ctx,
                         },
             }
 
+            # The same comment with the same transcript, model and settings is
+            # answered from the cache instead of running the model again
+            cache_key = make_cache_key(
+                comment, transcript, set_model, schema, seed, num_ctx, temperature
+            )
+            STAGE_SECONDS.observe(time.perf_counter() - build_start, stage="prompt_build", **labels)
+            # Memory hits are answered inline; the SQLite lookup runs on the file pool
+            cached_result = result_cache.get_memory(cache_key)
+            if cached_result is None:
+                cached_result = await run_blocking(file_executor, result_cache.get_disk, cache_key)
+            if cached_result is not None:
+                cache_hit = True
+                sentiment = cached_result['sentiment']
+                reasoning = cached_result['reasoning']
+                logger.info(f"Cache hit: {sentiment}")
+                log_result(
+                    comment=comment,
+                    sentiment=sentiment,
+                    reasoning=reasoning,
+                    model=set_model,
+                    transcript_provided=transcript_provided,
+                    video_id=video_id,
+                    seed=seed,
+                    num_ctx=num_ctx,
+                    cache_hit=True
+                )
+                result = {"sentiment": sentiment, "reasoning": reasoning, **route}
+                return stream_response(result_events(result)) if stream else result
 
+            # Only a real generation needs the model: load it if it is cold
+            # (one load at a time). Cache hits never load or evict a model.
+            try:
+                await model_pool.acquire(set_model)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to load {set_model}: {e}")
+                error_type = "ollama_unavailable"
+                raise HTTPException(status_code=503, detail="Ollama service unavailable")
+            acquired_model = set_model
+
+            if stream:
+                stop = threading.Event()
+                try:
+                    chunks = await generate_stream(payload, labels, stop)
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Failed to connect to Ollama: {e}")
+                    error_type = "ollama_unavailable"
+                    raise HTTPException(status_code=503, detail="Ollama service unavailable")
+
+                finished = False
+
+                async def finish(stream_error=None):
+                    # Releases the model and records the request exactly once:
+                    # at the end of events(), or from the response's background
+                    # task when the client left before the body was iterated
+                    nonlocal finished
+                    if finished:
+                        return
+                    finished = True
+                    stop.set()
+                    await chunks.aclose()
+                    if stream_error:
+                        ERRORS.inc(type=stream_error, **labels)
+                    model_pool.release(set_model)
+                    REQUESTS.inc(cache_hit="false", **labels)
+                    REQUEST_SECONDS.observe(time.time() - start_time, cache_hit="false", **labels)
+
+                async def events():
+                    # The sentiment as soon as the model has written it, then
+                    # the reasoning as it is generated, then the whole result
+                    stream_error = None
+                    parser = JSONStreamParser()
+                    text = []
+                    final = None
+                    try:
+                        async for chunk in chunks:
+                            if "error" in chunk:
+                                raise ValueError(chunk["error"])
+                            text.append(chunk.get("response", ""))
+                            for kind, path, value in parser.feed(chunk.get("response", "")):
+                                if kind == "value" and path == ("sentiment",):
+                                    STAGE_SECONDS.observe(time.time() - start_time, stage="time_to_label", **labels)
+                                    yield sse("sentiment", {"sentiment": value})
+                                elif kind == "text" and path == ("reasoning",):
+                                    yield sse("reasoning", {"text": value})
+                            if chunk.get("done"):
+                                final = chunk
+                        if final is None:
+                            raise ValueError("Stream ended before the generation was done")
+                        with STAGE_SECONDS.time(stage="json_parse", **labels):
+                            result = json.loads("".join(text))
+                        sentiment = result['sentiment']
+                        reasoning = result['reasoning']
+                        logger.info(f"Sentiment analysis result: {sentiment}, Reasoning: {reasoning}")
+                        with STAGE_SECONDS.time(stage="log_write", **labels):
+                            log_result(
+                                comment=comment,
+                                sentiment=sentiment,
+                                reasoning=reasoning,
+                                model=set_model,
+                                transcript_provided=transcript_provided,
+                                video_id=video_id,
+                                ollama_response=final,
+                                seed=seed,
+                                num_ctx=num_ctx
+                            )
+                        await run_blocking(file_executor, result_cache.set, cache_key, result)
+                        yield sse("done", {"sentiment": sentiment, "reasoning": reasoning, **route})
+                    except requests.exceptions.RequestException as e:
+                        logger.error(f"Ollama stream failed: {e}")
+                        stream_error = "ollama_unavailable"
+                        yield sse("error", {"detail": "Ollama service unavailable"})
+                    except (ValueError, KeyError) as e:
+                        logger.error(f"Invalid response format from Ollama: {e}")
+                        stream_error = "invalid_response"
+                        yield sse("error", {"detail": "Invalid response from Ollama service"})
+                    finally:
+                        # Also reached when the client disconnects mid-stream
+                        await finish(stream_error)
+
+                streaming = True
+                return stream_response(events(), background=BackgroundTask(finish))
 
             try:
                 response = None
-                print(payload)
-                response = requests.post(OLLAMA_URL, json=payload, headers={"Content-Type": "application/json"})
-                response.raise_for_status()  # This will raise an exception for bad status codes
-
-                response_json = response.json()
-                result = json.loads(response_json['response'])
-                print(result)
+                response_json = await generate(payload, labels)
+                with STAGE_SECONDS.time(stage="json_parse", **labels):
+                    result = json.loads(response_json['response'])
 
             except requests.exceptions.RequestException as e:
                 logger.error(f"Failed to connect to Ollama: {e}")
+                error_type = "ollama_unavailable"
                 raise HTTPException(status_code=503, detail="Ollama service unavailable")
             except (KeyError, json.JSONDecodeError) as e:
                 logger.error(f"Invalid response format from Ollama: {e}")
+                error_type = "invalid_response"
                 raise HTTPException(status_code=500, detail="Invalid response from Ollama service")
             
             try:
@@ -205,38 +555,68 @@ async def analyze_comment(request: Request):
                 reasoning = result['reasoning']
                 logger.info(f"Sentiment analysis result: {sentiment}, Reasoning: {reasoning}")
                 
-                # Save the comment and analysis result to a CSV file
+                # Log the comment and analysis result (written in the background)
                 execution_time = time.time() - start_time
-                save_to_csv(
-                    comment=comment,
-                    sentiment=sentiment,
-                    reasoning=reasoning,
-                    model=set_model,
-                    transcript_provided=transcript_provided,
-                    video_id=video_id,
-                    ollama_response=response_json,
-                    seed=seed,
-                    num_ctx=num_ctx
-                )
-                print("time took: ", execution_time)
+                with STAGE_SECONDS.time(stage="log_write", **labels):
+                    log_result(
+                        comment=comment,
+                        sentiment=sentiment,
+                        reasoning=reasoning,
+                        model=set_model,
+                        transcript_provided=transcript_provided,
+                        video_id=video_id,
+                        ollama_response=response_json,
+                        seed=seed,
+                        num_ctx=num_ctx
+                    )
+                await run_blocking(file_executor, result_cache.set, cache_key, result)
+                logger.debug(f"Analyzed in {execution_time:.2f}s")
                 
-                return {"sentiment": sentiment, "reasoning": reasoning}
+                return {"sentiment": sentiment, "reasoning": reasoning, **route}
                 
             except KeyError as e:
                 logger.error(f"Missing required fields in result: {e}")
+                error_type = "invalid_response"
                 raise HTTPException(status_code=500, detail="Invalid response format from model")
 
         else:
             logger.error(f"Invalid model type: {model_type}")
+            error_type = "bad_request"
             raise HTTPException(status_code=400, detail="Invalid model type")
 
+    except HTTPException as e:
+        # 400 / 503 / 500 raised above keep their status code
+        execution_time = time.time() - start_time
+        logger.error(f"Error analyzing comment: {e.detail}. Execution time: {execution_time:.2f}s")
+        ERRORS.inc(type=error_type or "internal", **labels)
+        raise
     except Exception as e:
         execution_time = time.time() - start_time
         logger.error(f"Error analyzing comment: {str(e)}. Execution time: {execution_time:.2f}s")
+        ERRORS.inc(type=error_type or "internal", **labels)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if not streaming:
+            if acquired_model is not None:
+                model_pool.release(acquired_model)
+            hit = "true" if cache_hit else "false"
+            REQUESTS.inc(cache_hit=hit, **labels)
+            REQUEST_SECONDS.observe(time.time() - start_time, cache_hit=hit, **labels)
+
+@app.post("/analyze")
+async def analyze_comment(request: Request):
+    return await analyze(request)
+
+@app.post("/analyze_stream")
+async def analyze_comment_stream(request: Request):
+    # /analyze as Server-Sent Events: "sentiment" as soon as the model has
+    # produced it, "reasoning" pieces as they are generated, then "done"
+    # with the same JSON /analyze returns (or "error")
+    return await analyze(request, stream=True)
 
 @app.post("/get_transcript")
 async def get_transcript(request: Request):
+    global transcript_file_video_id
     try:
         body = await request.json()
         video_id = body.get("video_id")
@@ -245,12 +625,13 @@ async def get_transcript(request: Request):
             raise HTTPException(status_code=400, detail="Video ID is required")
             
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
+            transcript = await transcript_cache.get(video_id)
             # Join all transcript text with newlines
             full_transcript = "\n".join([entry['text'] for entry in transcript])
-            with open('transcript.txt', 'w') as file:
-                for i in transcript:
-                    file.write(i['text'] + '\n')
+            # Only rewrite transcript.txt when the video changes
+            if transcript_file_video_id != video_id:
+                transcript_file_video_id = video_id
+                await run_blocking(file_executor, write_transcript_file, transcript)
 
             return {"transcript": full_transcript}
         except Exception as e:
@@ -261,44 +642,76 @@ async def get_transcript(request: Request):
         logger.error(f"Error processing transcript request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Run the server
-if __name__ == "__main__":
-    model_to_load = "mistral-small:22b"
-
-
-    # Load the model before starting the server
-
-
-    print("Loading the model ..", model_to_load)
-    response = None
-    response = ollama.generate(
-        model= model_to_load,
-        keep_alive = -1,
-        options={
-                "temperature": 0,
-                "seed": 1,
-                "num_ctx": 8192,
-                },
-    )
-
-    print(response)
-    
-    if (response.get('done', False)):
-        print("successfull loaded: ", model_to_load)
-    else:
-        print("failed request")
+@app.post("/prefetch_transcript")
+async def prefetch_transcript(request: Request):
+    # Called by the extension when a video page opens, so the transcript is
+    # ready by the time comments are analyzed
+    body = await request.json()
+    video_id = body.get("video_id")
 
+    if not video_id:
+        raise HTTPException(status_code=400, detail="Video ID is required")
+    try:
+        status = transcript_cache.prefetch(video_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"video_id": video_id, "status": status}
+
+@app.get("/transcript_cache_stats")
+async def get_transcript_cache_stats():
+    return transcript_cache.stats()
+
+@app.get("/transcript_context_stats")
+async def get_transcript_context_stats():
+    return transcript_context.stats()
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    # Hit/miss counters and size of the result cache
+    return await run_blocking(file_executor, result_cache.stats)
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text format
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/log_stats")
+async def get_log_stats():
+    # Rows queued, written and dropped by the background result log
+    return log_sink.stats()
+
+@app.get("/model_stats")
+async def get_model_stats():
+    # Warm models, memory use, and load versus inference time per model
+    return model_pool.stats()
+
+@app.on_event("startup")
+async def start_log_sink():
+    await log_sink.start()
+    # Load the warm models (OLLAMA_WARM_MODELS) before serving
+    await model_pool.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    # Rows still queued are written before the server exits
+    await log_sink.stop()
+    inference_executor.shutdown(wait=True)
+    transcript_executor.shutdown(wait=True)
+    bert_executor.shutdown(wait=True)
+    file_executor.shutdown(wait=True)
+    result_cache.close()
 
+# Run the server
+if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
-  
-    # Unload the model after the server is stopped
-    print("Unloading the model ..") 
-    response = ollama.generate(
-        model= model_to_load,
-        keep_alive = 0
-    )
-    if (response.get('done', False)):
-        print("successfull unloaded: ", model_to_load)
-    else:
-        print("failed request")
\ No newline at end of file
+
+    # Unload the warm models after the server is stopped
+    for model_to_unload in list(model_pool.warm):
+        print("Unloading the model ..", model_to_unload)
+        response = client.unload_model(model_to_unload)
+        if (response.get('done', False)):
+            print("successfull unloaded: ", model_to_unload)
+        else:
+            print("failed request")
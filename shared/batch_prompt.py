@@ -0,0 +1,125 @@
+import json
+import os
+
+# Batch prompt mode: K comments, each with a numeric ID, go into one
+# structured-output request whose answer is an array with one result per ID.
+# The instructions and the transcript are then evaluated once per K comments
+# instead of once per comment. If the answer does not contain every ID
+# exactly once, the comments of that batch are classified one by one.
+
+# Comments per prompt; 1 keeps the single-comment mode
+COMMENTS_PER_PROMPT = int(os.environ.get("COMMENTS_PER_PROMPT", 1))
+
+BATCH_INSTRUCTIONS = (
+    "Each comment below is preceded by its ID in square brackets. "
+    "Analyze every comment on its own and return a JSON object with a field \"results\": "
+    "an array with exactly one entry per comment, each with the comment's \"id\" and its result."
+)
+
+# Response metrics that are split across the comments of a batch
+METRIC_FIELDS = [
+    "total_duration", "load_duration", "prompt_eval_count",
+    "prompt_eval_duration", "eval_count", "eval_duration",
+]
+
+
+def make_batch_schema(item_schema):
+    # Wraps the schema of a single result into an array of results with IDs
+    item = dict(item_schema)
+    item["properties"] = dict({"id": {"type": "integer"}}, **item_schema.get("properties", {}))
+    item["required"] = ["id"] + [field for field in item_schema.get("required", []) if field != "id"]
+    return {
+        "type": "object",
+        "properties": {"results": {"type": "array", "items": item}},
+        "required": ["results"],
+    }
+
+
+def format_batch_input(comments):
+    # One line per comment: "[id] "comment"", IDs starting at 1
+    return "\n".join(
+        f"[{comment_id}] {json.dumps(comment, ensure_ascii=False)}"
+        for comment_id, comment in enumerate(comments, start=1)
+    )
+
+
+def parse_batch_response(response_json, count, required=()):
+    # Returns the results ordered by ID; raises ValueError unless the IDs
+    # 1..count come back exactly once each with all required fields
+    results = json.loads(response_json["response"])["results"]
+    by_id = {}
+    for result in results:
+        comment_id = result.get("id")
+        if not isinstance(comment_id, int) or not 1 <= comment_id <= count:
+            raise ValueError(f"Unexpected ID in batch response: {comment_id!r}")
+        if comment_id in by_id:
+            raise ValueError(f"Duplicate ID in batch response: {comment_id}")
+        missing_fields = [field for field in required if field not in result]
+        if missing_fields:
+            raise ValueError(f"Result {comment_id} is missing {missing_fields}")
+        by_id[comment_id] = {key: value for key, value in result.items() if key != "id"}
+    if len(by_id) != count:
+        missing = sorted(set(range(1, count + 1)) - set(by_id))
+        raise ValueError(f"Missing IDs in batch response: {missing}")
+    return [by_id[comment_id] for comment_id in range(1, count + 1)]
+
+
+def split_metrics(response_json, count):
+    # The durations and token counts of one batch request, shared equally
+    # by its comments
+    metrics = {}
+    for field in METRIC_FIELDS:
+        value = response_json.get(field, 'N/A')
+        metrics[field] = value / count if count > 1 and isinstance(value, (int, float)) else value
+    return metrics
+
+
+def classify_comments(comments, generate_single, generate_batch=None, comments_per_prompt=COMMENTS_PER_PROMPT,
+                      required=(), on_result=None):
+    # generate_single(comment) and generate_batch(comments) send one request
+    # to Ollama and return its parsed response. Returns one entry per comment,
+    # in order: {"result", "metrics", "mode"} with mode "single", "batch" or
+    # "fallback". on_result(index, entry) is called as results come in.
+    entries = [None] * len(comments)
+    stats = {"requests": 0, "batches": 0, "fallback_batches": 0}
+
+    def finish(index, entry):
+        entries[index] = entry
+        if on_result is not None:
+            on_result(index, entry)
+
+    def single(index, mode):
+        response_json = generate_single(comments[index])
+        stats["requests"] += 1
+        finish(index, {
+            "result": json.loads(response_json["response"]),
+            "metrics": split_metrics(response_json, 1),
+            "mode": mode,
+        })
+
+    step = max(comments_per_prompt, 1)
+    for start in range(0, len(comments), step):
+        indices = list(range(start, min(start + step, len(comments))))
+        if step == 1 or generate_batch is None or len(indices) == 1:
+            for index in indices:
+                single(index, "single")
+            continue
+
+        stats["batches"] += 1
+        try:
+            response_json = generate_batch([comments[index] for index in indices])
+            stats["requests"] += 1
+            results = parse_batch_response(response_json, len(indices), required)
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            # json.JSONDecodeError is a ValueError
+            print(f"Batch of {len(indices)} comments failed validation ({e}), classifying them one by one")
+            stats["fallback_batches"] += 1
+            for index in indices:
+                single(index, "fallback")
+            continue
+
+        metrics = split_metrics(response_json, len(indices))
+        for index, result in zip(indices, results):
+            finish(index, {"result": result, "metrics": metrics, "mode": "batch"})
+
+    return entries, stats
@@ -0,0 +1,214 @@
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Interchangeable inference backends for the DistilBERT sentiment model.
+# Every backend takes a list of texts and returns softmax probabilities;
+# calling a backend returns the same [{"label", "score"}] list as the
+# transformers sentiment-analysis pipeline, so it can replace it directly.
+#
+#   eager        PyTorch FP32, as before
+#   torchscript  traced and frozen TorchScript module
+#   compile      torch.compile (PyTorch 2.x)
+#   onnx         exported ONNX model on ONNX Runtime
+#   onnx-int8    the ONNX model with dynamic INT8 quantization of the weights
+#
+# The ONNX files are exported once into BERT_ONNX_DIR and reused.
+
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+BACKENDS = ["eager", "torchscript", "compile", "onnx", "onnx-int8"]
+BERT_BACKEND = os.environ.get("BERT_BACKEND", "eager")
+# PyTorch device: auto picks cuda, then mps (Apple silicon), then cpu
+BERT_DEVICE = os.environ.get("BERT_DEVICE", "auto")
+BERT_ONNX_DIR = os.environ.get("BERT_ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"))
+# Same limit the pipeline uses for a single comment
+MAX_LENGTH = 512
+
+
+def pick_device(name=BERT_DEVICE):
+    import torch
+
+    if name != "auto":
+        return torch.device(name)
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
+def softmax(logits):
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class BertBackend:
+    def __init__(self, model_name=MODEL_NAME, kind=BERT_BACKEND, onnx_dir=BERT_ONNX_DIR, num_threads=None,
+                 device=BERT_DEVICE):
+        if kind not in BACKENDS:
+            raise ValueError(f"Unknown BERT backend '{kind}', expected one of {', '.join(BACKENDS)}")
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.model_name = model_name
+        self.kind = kind
+        self.onnx_dir = onnx_dir
+        self.num_threads = num_threads
+        # Only used by the PyTorch backends; ONNX Runtime runs on the CPU
+        self.device = device
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        config = AutoConfig.from_pretrained(model_name)
+        self.labels = [config.id2label[i] for i in range(config.num_labels)]
+
+        start = time.time()
+        if kind.startswith("onnx"):
+            self._load_onnx()
+        else:
+            self._load_torch()
+        logger.info(f"Loaded {model_name} with the {kind} backend"
+                    f"{'' if kind.startswith('onnx') else f' on {self.device}'} in {time.time() - start:.1f}s")
+
+    # --- PyTorch ---
+
+    def _load_torch(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self.device = pick_device(self.device)
+        model = AutoModelForSequenceClassification.from_pretrained(
+            self.model_name, torchscript=self.kind == "torchscript"
+        )
+        model.to(self.device)
+        model.eval()
+
+        if self.kind == "torchscript":
+            example = self.tokenizer(["An example comment"], return_tensors="pt").to(self.device)
+            with torch.inference_mode():
+                traced = torch.jit.trace(model, (example["input_ids"], example["attention_mask"]), strict=False)
+            self.model = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+        elif self.kind == "compile":
+            # dynamic=True: comments have different lengths in every batch
+            self.model = torch.compile(model, dynamic=True)
+        else:
+            self.model = model
+
+    def _torch_logits(self, encoded):
+        import torch
+
+        with torch.inference_mode():
+            inputs = {name: torch.from_numpy(encoded[name]).to(self.device) for name in ("input_ids", "attention_mask")}
+            if self.kind == "torchscript":
+                logits = self.model(inputs["input_ids"], inputs["attention_mask"])[0]
+            else:
+                logits = self.model(**inputs).logits
+            return logits.float().cpu().numpy()
+
+    # --- ONNX Runtime ---
+
+    def onnx_path(self, quantized=False):
+        name = self.model_name.replace("/", "_")
+        return os.path.join(self.onnx_dir, f"{name}-int8.onnx" if quantized else f"{name}.onnx")
+
+    def export_onnx(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        path = self.onnx_path()
+        os.makedirs(self.onnx_dir, exist_ok=True)
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        example = self.tokenizer(["An example comment"], return_tensors="pt")
+        with torch.inference_mode():
+            torch.onnx.export(
+                model,
+                (example["input_ids"], example["attention_mask"]),
+                path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=14,
+            )
+        logger.info(f"Exported {self.model_name} to {path}")
+        return path
+
+    def quantize_onnx(self):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        source = self.onnx_path()
+        if not os.path.exists(source):
+            self.export_onnx()
+        path = self.onnx_path(quantized=True)
+        # Weights of the linear layers to INT8, activations quantized on the fly
+        quantize_dynamic(source, path, weight_type=QuantType.QInt8)
+        logger.info(f"Quantized {source} to {path}")
+        return path
+
+    def _load_onnx(self):
+        import onnxruntime
+
+        quantized = self.kind == "onnx-int8"
+        path = self.onnx_path(quantized)
+        if not os.path.exists(path):
+            path = self.quantize_onnx() if quantized else self.export_onnx()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def _onnx_logits(self, encoded):
+        inputs = {name: encoded[name].astype(np.int64) for name in ("input_ids", "attention_mask")}
+        return self.session.run(["logits"], inputs)[0]
+
+    # --- Common interface ---
+
+    def _logits(self, encoded):
+        return self._onnx_logits(encoded) if self.kind.startswith("onnx") else self._torch_logits(encoded)
+
+    def predict_proba(self, texts, max_length=MAX_LENGTH):
+        # (len(texts), labels) probabilities for one padded batch
+        encoded = self.tokenizer(list(texts), padding=True, truncation=True, max_length=max_length, return_tensors="np")
+        return softmax(self._logits(encoded))
+
+    def predict_bucketed(self, texts, batch_size=32, max_length=MAX_LENGTH):
+        # Tokenizes all texts in one call, runs batches of texts with similar
+        # token counts (so little padding is computed) and returns the
+        # probabilities in input order plus one timing entry per batch
+        ids = self.tokenizer(list(texts), truncation=True, max_length=max_length)["input_ids"]
+        order = np.argsort([len(tokens) for tokens in ids], kind="stable")
+        probabilities = np.zeros((len(ids), len(self.labels)))
+        batches = []
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            batch_start = time.perf_counter()
+            encoded = self.tokenizer.pad({"input_ids": [ids[i] for i in bucket]}, return_tensors="np")
+            probabilities[bucket] = softmax(self._logits(encoded))
+            batches.append({
+                "size": len(bucket),
+                "padded_length": int(encoded["input_ids"].shape[1]),
+                "seconds": time.perf_counter() - batch_start,
+            })
+        return probabilities, batches
+
+    def __call__(self, texts, batch_size=None, padding=True, truncation=True, max_length=MAX_LENGTH):
+        # Pipeline-compatible: one {"label", "score"} per text. The texts are
+        # run in chunks of batch_size (all at once by default).
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        batch_size = batch_size or len(texts)
+        results = []
+        for start in range(0, len(texts), batch_size):
+            probabilities = self.predict_proba(texts[start:start + batch_size], max_length)
+            for row in probabilities:
+                best = int(row.argmax())
+                results.append({"label": self.labels[best], "score": float(row[best])})
+        return results
@@ -0,0 +1,34 @@
+import os
+import re
+
+# Routing rules of the DistilBERT -> LLM cascade. DistilBERT answers first;
+# a comment is escalated to the LLM (with reasoning and transcript context)
+# when DistilBERT is unsure or the comment is of a kind it handles poorly.
+# DistilBERT only knows POSITIVE and NEGATIVE, so neutral comments mostly
+# reach the LLM through low confidence. Calibrate the threshold with
+# ModelAnalysis/cascade_calibration.py.
+
+# Lowest DistilBERT confidence that is accepted without the LLM
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", 0.99))
+# Longer comments are escalated: they are often mixed and get truncated
+CASCADE_MAX_CHARS = int(os.environ.get("CASCADE_MAX_CHARS", 400))
+
+SARCASM_MARKERS = re.compile(
+    r"(?:^|\s)/s\b|\byeah,? right\b|\bas if\b|\bthanks a lot\b|\bwhat a surprise\b|\bsure,? (?:buddy|jan)\b"
+    r"|\boh (?:great|wow|sure|joy)\b|\bnot\b.{0,20}!{2,}|[🙄😒😏🤡🙃]",
+    re.IGNORECASE,
+)
+REASONS = ["emoji_only", "long", "sarcasm", "low_confidence"]
+
+
+def escalation_reason(comment, confidence, threshold=CASCADE_THRESHOLD, max_chars=CASCADE_MAX_CHARS):
+    # None if DistilBERT's answer is kept, otherwise one of REASONS
+    if not any(character.isalnum() for character in comment):
+        return "emoji_only"
+    if len(comment) > max_chars:
+        return "long"
+    if SARCASM_MARKERS.search(comment):
+        return "sarcasm"
+    if confidence < threshold:
+        return "low_confidence"
+    return None
@@ -0,0 +1,196 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Background writer for the per-comment result log. log() only puts the row
+# on a bounded queue, so the request path never waits for the disk; a single
+# writer task collects rows into blocks (LOG_FLUSH_ROWS rows or
+# LOG_FLUSH_SECONDS, whichever comes first) and appends each block on its own
+# thread. With one writer, rows of concurrent requests never interleave.
+#
+# The active file keeps its name; when it reaches LOG_ROTATE_MB or a new day
+# starts (LOG_ROTATE_DAILY) it is renamed to <name>.<YYYYmmdd-HHMMSS><ext>
+# and a new file is started. LOG_FORMAT selects csv (default), jsonl or
+# parquet (needs pyarrow; a Parquet file is readable once it is rotated or
+# the server stops). If the queue is full, rows are dropped and counted.
+
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "csv")
+LOG_FLUSH_ROWS = int(os.environ.get("LOG_FLUSH_ROWS", 100))
+LOG_FLUSH_SECONDS = float(os.environ.get("LOG_FLUSH_SECONDS", 1))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+LOG_ROTATE_MB = float(os.environ.get("LOG_ROTATE_MB", 50))
+LOG_ROTATE_DAILY = os.environ.get("LOG_ROTATE_DAILY", "0") == "1"
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+
+
+def log_path(csv_path, log_format=LOG_FORMAT):
+    # The CSV path of a server with the extension of the chosen format
+    return os.path.splitext(csv_path)[0] + EXTENSIONS[log_format]
+
+
+class LogSink:
+    def __init__(self, path, fields, log_format=LOG_FORMAT, flush_rows=LOG_FLUSH_ROWS,
+                 flush_seconds=LOG_FLUSH_SECONDS, max_queue=LOG_QUEUE_SIZE,
+                 rotate_bytes=int(LOG_ROTATE_MB * 1024 * 1024), rotate_daily=LOG_ROTATE_DAILY):
+        if log_format not in EXTENSIONS:
+            raise ValueError(f"Unknown log format '{log_format}', expected one of {', '.join(EXTENSIONS)}")
+        self.path = path
+        self.fields = fields
+        self.log_format = log_format
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_queue = max_queue
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log")
+        self.queue = None
+        self.worker = None
+        self.file = None
+        self.writer = None
+        self.file_day = None
+
+        # Metrics
+        self.rows_logged = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.total_write_time = 0.0
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Writes everything logged so far, then closes the file
+        if self.worker is None:
+            return
+        await self.queue.put(None)
+        await self.worker
+        self.worker = None
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._close)
+        self.executor.shutdown(wait=True)
+
+    def log(self, row):
+        # Never blocks: the row is queued or, if the writer is behind, dropped
+        try:
+            self.queue.put_nowait(row)
+            self.rows_logged += 1
+        except asyncio.QueueFull:
+            self.rows_dropped += 1
+            if self.rows_dropped % 1000 == 1:
+                logger.warning(f"Log queue full, {self.rows_dropped} row(s) dropped so far")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self.queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.flush_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            try:
+                await loop.run_in_executor(self.executor, self._write, batch)
+            except Exception as e:
+                logger.error(f"Could not write {len(batch)} log row(s) to {self.path}: {e}")
+
+    # --- Writer thread ---
+
+    def _open(self):
+        if self.log_format == "parquet" and os.path.exists(self.path):
+            # Parquet files cannot be appended to
+            self._rotate()
+        self.file_day = date.fromtimestamp(os.path.getmtime(self.path)) if os.path.exists(self.path) else date.today()
+        if self.log_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema([(field, pa.string()) for field in self.fields])
+            self.writer = pq.ParquetWriter(self.path, schema)
+            return
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, mode="a", newline="", encoding="utf-8")
+        if self.log_format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fields, extrasaction="ignore")
+            if new_file:
+                self.writer.writeheader()
+
+    def _close(self):
+        if self.log_format == "parquet" and self.writer is not None:
+            self.writer.close()
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.writer = None
+
+    def _rotate(self):
+        self._close()
+        stem, extension = os.path.splitext(self.path)
+        target = f"{stem}.{datetime.now().strftime('%Y%m%d-%H%M%S')}{extension}"
+        suffix = 1
+        while os.path.exists(target):
+            suffix += 1
+            target = f"{stem}.{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}{extension}"
+        os.replace(self.path, target)
+        self.rotations += 1
+
+    def _write(self, rows):
+        start = time.perf_counter()
+        if self.writer is None and self.file is None:
+            self._open()
+        if self.rotate_daily and date.today() != self.file_day:
+            self._rotate()
+            self._open()
+
+        if self.log_format == "csv":
+            self.writer.writerows(rows)
+        elif self.log_format == "jsonl":
+            self.file.writelines(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+        else:
+            import pyarrow as pa
+
+            self.writer.write_table(pa.table({
+                field: [None if row.get(field) is None else str(row.get(field)) for row in rows]
+                for field in self.fields
+            }, schema=self.writer.schema))
+        if self.file is not None:
+            self.file.flush()
+
+        self.rows_written += len(rows)
+        self.flushes += 1
+        self.total_write_time += time.perf_counter() - start
+        if self.rotate_bytes and os.path.getsize(self.path) >= self.rotate_bytes:
+            self._rotate()
+
+    def stats(self):
+        return {
+            "format": self.log_format,
+            "path": self.path,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "rows_logged": self.rows_logged,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "flushes": self.flushes,
+            "rotations": self.rotations,
+            "avg_flush_ms": round(1000 * self.total_write_time / self.flushes, 2) if self.flushes else 0.0,
+        }
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared client for the Ollama generate API. Every call goes through one
+# requests.Session per URL, so TCP connections are pooled and kept alive
+# between comments instead of being opened for every request.
+
+# Ollama generate endpoint
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+
+# Seconds to wait for a connection / for the full generation
+CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", 600))
+
+# Retries for refused connections and 502/503/504 answers (e.g. Ollama is
+# still starting up). Waits backoff_factor * 2^n seconds between attempts.
+RETRIES = int(os.environ.get("OLLAMA_RETRIES", 3))
+BACKOFF_FACTOR = float(os.environ.get("OLLAMA_BACKOFF_FACTOR", 0.5))
+
+# Number of keep-alive connections held open per client
+POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", 8))
+
+
+class OllamaClient:
+    def __init__(self, url=OLLAMA_URL, pool_size=POOL_SIZE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 retries=RETRIES, backoff_factor=BACKOFF_FACTOR):
+        self.url = url
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            # A generation that already started is not sent again
+            read=0,
+            status=retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, payload):
+        # Returns the parsed Ollama response; raises requests exceptions on
+        # connection problems and bad status codes
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def generate_stream(self, payload):
+        # Yields the parsed chunks of a streaming generation. Closing the
+        # generator closes the connection, which stops the generation.
+        payload = dict(payload, stream=True)
+        with self.session.post(self.url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def load_model(self, model, options=None):
+        # A request without a prompt loads the model; keep_alive=-1 keeps it loaded
+        payload = {"model": model, "keep_alive": -1, "stream": False}
+        if options:
+            payload["options"] = options
+        return self.generate(payload)
+
+    def unload_model(self, model):
+        return self.generate({"model": model, "keep_alive": 0, "stream": False})
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url=OLLAMA_URL):
+    # One shared client (and connection pool) per Ollama URL
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = OllamaClient(url)
+        return _clients[url]
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Two-tier cache for analysis results: an in-memory LRU in front of a SQLite
+# file, so the same comment (with the same transcript, model and generation
+# settings) is only sent to Ollama once, also across server restarts.
+
+CACHE_DB = os.environ.get("RESULT_CACHE_PATH", "./result_cache.sqlite")
+# Entries older than this are treated as missing and removed
+CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL_HOURS", 24 * 30)) * 3600
+# Maximum number of entries in memory / on disk
+CACHE_MEMORY_ITEMS = int(os.environ.get("RESULT_CACHE_MEMORY_ITEMS", 2048))
+CACHE_DISK_ITEMS = int(os.environ.get("RESULT_CACHE_DISK_ITEMS", 200000))
+# Seconds between removals of expired and surplus entries on disk
+CACHE_PRUNE_SECONDS = float(os.environ.get("RESULT_CACHE_PRUNE_SECONDS", 60))
+# Disk hits whose last_access update is written in one statement
+TOUCH_BATCH = 100
+
+
+def normalize_comment(comment):
+    # Same clean-up as clean_string in ModelAnalysis, plus collapsed whitespace
+    comment = comment.replace("\xa0", " ")
+    comment = unicodedata.normalize("NFKC", comment)
+    return " ".join(comment.split())
+
+
+def make_cache_key(comment, transcript, model, schema, seed, num_ctx, temperature, extra=None):
+    # extra: any other setting that changes the answer (e.g. the prompt mode)
+    transcript_hash = hashlib.sha256((transcript or "").encode("utf-8")).hexdigest()
+    key = json.dumps({
+        "comment": normalize_comment(comment or ""),
+        "transcript": transcript_hash,
+        "model": model,
+        "schema": schema,
+        "seed": seed,
+        "num_ctx": num_ctx,
+        "temperature": temperature,
+        "extra": extra,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    # get_memory() never touches the disk and may run on the event loop;
+    # get_disk(), get() and set() use SQLite and belong on an executor.
+    def __init__(self, path=CACHE_DB, ttl=CACHE_TTL, memory_items=CACHE_MEMORY_ITEMS, disk_items=CACHE_DISK_ITEMS,
+                 prune_seconds=CACHE_PRUNE_SECONDS):
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.prune_seconds = prune_seconds
+        self.memory = OrderedDict()
+        # The memory tier and the SQLite connection have separate locks, so a
+        # memory lookup never waits for a disk write
+        self.memory_lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        # last_access of disk hits, written in batches
+        self.touched = {}
+        self.last_prune = 0.0
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+        self.db.commit()
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.get_memory(key)
+        return value if value is not None else self.get_disk(key)
+
+    def get_memory(self, key):
+        now = time.time()
+        with self.memory_lock:
+            entry = self.memory.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if now - created > self.ttl:
+                del self.memory[key]
+                return None
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+
+    def get_disk(self, key):
+        now = time.time()
+        with self.db_lock:
+            row = self.db.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created = json.loads(row[0]), row[1]
+            if now - created > self.ttl:
+                self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.db.commit()
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self.touched[key] = now
+            if len(self.touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self.db.commit()
+            self.disk_hits += 1
+        with self.memory_lock:
+            self._remember(key, created, value)
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self.memory_lock:
+            self._remember(key, now, value)
+        with self.db_lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._flush_touched()
+            if now - self.last_prune >= self.prune_seconds:
+                self._prune(now)
+            self.db.commit()
+
+    def _flush_touched(self):
+        if self.touched:
+            self.db.executemany("UPDATE results SET last_access = ? WHERE key = ?",
+                                [(accessed, key) for key, accessed in self.touched.items()])
+            self.touched.clear()
+
+    def _prune(self, now):
+        # Drop expired entries, then the least recently used ones over the limit
+        self.last_prune = now
+        expired = self.db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,)).rowcount
+        over_limit = self.db.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.disk_items,),
+        ).rowcount
+        self.evictions += expired + over_limit
+
+    def _remember(self, key, created, value):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def stats(self):
+        with self.db_lock:
+            disk_entries = self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        with self.memory_lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self.memory),
+                "disk_entries": disk_entries,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0,
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        with self.db_lock:
+            self._flush_touched()
+            self.db.commit()
+            self.db.close()
@@ -0,0 +1,126 @@
+import json
+
+# Incremental parsing of the JSON object a model generates token by token
+# (Ollama "stream": true with a "format" schema), and Server-Sent Events for
+# the streaming endpoints. feed() returns events as soon as the text allows:
+#
+#   ("value", ("sentiment",), "POSITIVE")   a top-level field is complete
+#   ("text", ("reasoning",), "The comm")    new characters of a string value
+#
+# Paths are the keys (and array indexes) from the top-level object down, e.g.
+# ("reasoning", "tone") for a string inside a nested object.
+
+
+def sse(event, data):
+    # One Server-Sent Event with a JSON payload
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JSONStreamParser:
+    def __init__(self):
+        self.text = ""
+        self.position = 0
+        # Open objects and arrays: the current key (objects) or index (arrays)
+        self.stack = []
+        self.in_string = False
+        self.is_key = False
+        self.key_chars = []
+        self.escape = None
+        self.high_surrogate = ""
+        self.in_primitive = False
+        # Start of the top-level field value being read
+        self.value_start = None
+        self.complete = False
+
+    def feed(self, text):
+        events = []
+        self.text += text
+        while self.position < len(self.text) and not self.complete:
+            self._char(self.text[self.position], events)
+            self.position += 1
+        # Merge the characters of one string that arrived in this chunk
+        merged = []
+        for event in events:
+            if merged and event[0] == "text" and merged[-1][0] == "text" and merged[-1][1] == event[1]:
+                merged[-1] = ("text", event[1], merged[-1][2] + event[2])
+            else:
+                merged.append(event)
+        return merged
+
+    def _path(self):
+        return tuple(entry["key"] if entry["type"] == "object" else entry["index"] for entry in self.stack)
+
+    def _char(self, c, events):
+        if self.in_string:
+            if self.escape is not None:
+                self.escape += c
+                if len(self.escape) == 2 and c != "u" or len(self.escape) == 6:
+                    # An emoji may be escaped as a pair of \u sequences
+                    if "\\ud800" <= self.escape.lower() <= "\\udbff":
+                        self.high_surrogate = self.escape
+                    else:
+                        self._string_text(json.loads(f'"{self.high_surrogate}{self.escape}"'), events)
+                        self.high_surrogate = ""
+                    self.escape = None
+            elif c == "\\":
+                self.escape = c
+            elif c == '"':
+                self.in_string = False
+                if self.is_key:
+                    self.stack[-1]["key"] = "".join(self.key_chars)
+                else:
+                    self._value_end(self.position + 1, events)
+            else:
+                self._string_text(c, events)
+            return
+
+        if self.in_primitive:
+            if c not in ",}] \t\r\n":
+                return
+            # A number, true, false or null ends at the next delimiter
+            self.in_primitive = False
+            self._value_end(self.position, events)
+
+        if c.isspace():
+            return
+        top = self.stack[-1] if self.stack else None
+        if c == '"':
+            self.in_string = True
+            self.is_key = top is not None and top["type"] == "object" and top["expect"] == "key"
+            self.key_chars = []
+            if not self.is_key:
+                self._value_start()
+        elif c in "{[":
+            self._value_start()
+            self.stack.append({"type": "object" if c == "{" else "array", "key": None, "index": 0,
+                               "expect": "key" if c == "{" else "value"})
+        elif c in "}]":
+            self.stack.pop()
+            if self.stack:
+                self._value_end(self.position + 1, events)
+            else:
+                self.complete = True
+        elif c == ":":
+            top["expect"] = "value"
+        elif c == ",":
+            if top["type"] == "object":
+                top["expect"] = "key"
+            else:
+                top["index"] += 1
+        else:
+            self.in_primitive = True
+            self._value_start()
+
+    def _string_text(self, text, events):
+        if self.is_key:
+            self.key_chars.append(text)
+        else:
+            events.append(("text", self._path(), text))
+
+    def _value_start(self):
+        if len(self.stack) == 1:
+            self.value_start = self.position
+
+    def _value_end(self, end, events):
+        if len(self.stack) == 1:
+            events.append(("value", self._path(), json.loads(self.text[self.value_start:end])))
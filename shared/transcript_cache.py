@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import re
+from collections import OrderedDict
+
+# Per-video transcript cache. Transcripts are kept in memory (LRU) and as
+# JSON files on disk, and concurrent requests for the same video share one
+# download instead of each calling the YouTube transcript API.
+
+TRANSCRIPT_CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", "./transcript_cache")
+# Maximum number of transcripts in memory / on disk
+TRANSCRIPT_MEMORY_ITEMS = int(os.environ.get("TRANSCRIPT_MEMORY_ITEMS", 64))
+TRANSCRIPT_DISK_ITEMS = int(os.environ.get("TRANSCRIPT_DISK_ITEMS", 1000))
+
+# YouTube video IDs only contain these characters; anything else is not
+# used as a file name
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def check_video_id(video_id):
+    # Raises ValueError for anything that is not a video ID string
+    if not isinstance(video_id, str) or not VIDEO_ID_PATTERN.match(video_id):
+        raise ValueError(f"Invalid video ID: {video_id!r}")
+
+
+class TranscriptCache:
+    def __init__(self, fetch_fn, run_blocking, cache_dir=TRANSCRIPT_CACHE_DIR,
+                 memory_items=TRANSCRIPT_MEMORY_ITEMS, disk_items=TRANSCRIPT_DISK_ITEMS):
+        # fetch_fn(video_id) downloads the transcript entries (blocking);
+        # run_blocking(func, *args) runs a blocking call off the event loop
+        self.fetch_fn = fetch_fn
+        self.run_blocking = run_blocking
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.memory = OrderedDict()
+        self.in_flight = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.downloads = 0
+        self.shared_downloads = 0
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.json")
+
+    def _remember(self, video_id, transcript):
+        self.memory[video_id] = transcript
+        self.memory.move_to_end(video_id)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _read_disk(self, video_id):
+        path = self._path(video_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            transcript = json.load(file)
+        # Mark as recently used for the disk eviction
+        os.utime(path, None)
+        return transcript
+
+    def _write_disk(self, video_id, transcript):
+        with open(self._path(video_id), "w", encoding="utf-8") as file:
+            json.dump(transcript, file, ensure_ascii=False)
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        if len(files) > self.disk_items:
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.disk_items]:
+                os.remove(path)
+
+    async def cached(self, video_id):
+        # Transcript entries if they are in memory or on disk, without
+        # waiting for a download; None otherwise
+        check_video_id(video_id)
+        if video_id in self.memory:
+            self.memory.move_to_end(video_id)
+            self.memory_hits += 1
+            return self.memory[video_id]
+        transcript = await self.run_blocking(self._read_disk, video_id)
+        if transcript is not None:
+            self.disk_hits += 1
+            self._remember(video_id, transcript)
+        return transcript
+
+    async def get(self, video_id):
+        check_video_id(video_id)
+
+        if video_id in self.memory:
+            self.memory.move_to_end(video_id)
+            self.memory_hits += 1
+            return self.memory[video_id]
+
+        # Someone is already loading this video: wait for the same result
+        if video_id in self.in_flight:
+            self.shared_downloads += 1
+            return await asyncio.shield(self.in_flight[video_id])
+
+        # Shielded so a disconnecting client doesn't cancel the download
+        # for everyone else waiting on it
+        return await asyncio.shield(self._start(video_id))
+
+    def _start(self, video_id):
+        task = asyncio.ensure_future(self._load(video_id))
+        self.in_flight[video_id] = task
+        # A failed prefetch is simply retried by the next get(); mark the
+        # exception as retrieved so asyncio doesn't warn about it
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _load(self, video_id):
+        try:
+            transcript = await self.run_blocking(self._read_disk, video_id)
+            if transcript is not None:
+                self.disk_hits += 1
+            else:
+                transcript = await self.run_blocking(self.fetch_fn, video_id)
+                self.downloads += 1
+                await self.run_blocking(self._write_disk, video_id, transcript)
+            self._remember(video_id, transcript)
+            return transcript
+        finally:
+            self.in_flight.pop(video_id, None)
+
+    def prefetch(self, video_id):
+        # Start loading in the background; returns "cached" or "fetching"
+        check_video_id(video_id)
+        if video_id in self.memory:
+            return "cached"
+        if video_id not in self.in_flight:
+            self._start(video_id)
+        return "fetching"
+
+    def stats(self):
+        return {
+            "memory_entries": len(self.memory),
+            "in_flight": len(self.in_flight),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "downloads": self.downloads,
+            "shared_downloads": self.shared_downloads,
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, OrderedDict
+
+# Builds a bounded-size transcript context for a prompt. Transcripts that fit
+# the token budget of the model are used as they are; longer ones are cut into
+# chunks and either reduced to the chunks most relevant to the comment
+# ("select") or replaced by a cached summary of the video ("summary").
+
+logger = logging.getLogger(__name__)
+
+# "select" or "summary"; only used when the transcript is over budget
+TRANSCRIPT_CONTEXT_MODE = os.environ.get("TRANSCRIPT_CONTEXT_MODE", "select")
+# Per-model transcript budgets in tokens, e.g. '{"mistral-small:22b": 6000}'
+TRANSCRIPT_TOKEN_BUDGETS = json.loads(os.environ.get("TRANSCRIPT_TOKEN_BUDGETS", "{}"))
+# Without an explicit budget the transcript gets num_ctx minus this reserve
+# (instructions, comment and the generated answer)
+TRANSCRIPT_RESERVE_TOKENS = int(os.environ.get("TRANSCRIPT_RESERVE_TOKENS", 1536))
+# Approximate size of one chunk in tokens
+TRANSCRIPT_CHUNK_TOKENS = int(os.environ.get("TRANSCRIPT_CHUNK_TOKENS", 128))
+# Hugging Face tokenizers of the Ollama models, e.g.
+# '{"mistral-small:22b": "mistralai/Mistral-Small-Instruct-2409"}'
+TRANSCRIPT_TOKENIZERS = json.loads(os.environ.get("TRANSCRIPT_TOKENIZERS", "{}"))
+# Estimate for models without a tokenizer; on the low side so the estimate
+# rather over- than undercounts
+CHARS_PER_TOKEN = float(os.environ.get("TRANSCRIPT_CHARS_PER_TOKEN", 3.5))
+
+GAP_MARKER = "\n[...]\n"
+WORD_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "your", "this", "that", "with", "have", "was",
+    "his", "her", "they", "them", "what", "who", "how", "why", "its", "just", "from", "all", "can",
+    "will", "has", "had", "him", "she", "our", "out", "get", "got", "one", "about", "like", "when",
+}
+
+
+def words(text):
+    return [word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+class TokenCounter:
+    # Counts tokens with the model's tokenizer if one is configured and
+    # transformers is installed, otherwise estimates them from the length
+    def __init__(self, tokenizers=TRANSCRIPT_TOKENIZERS, chars_per_token=CHARS_PER_TOKEN):
+        self.tokenizer_names = tokenizers
+        self.chars_per_token = chars_per_token
+        self.tokenizers = {}
+
+    def _tokenizer(self, model):
+        if model not in self.tokenizers:
+            tokenizer = None
+            if model in self.tokenizer_names:
+                try:
+                    from transformers import AutoTokenizer
+                    tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_names[model])
+                except Exception as e:
+                    logger.warning(f"No tokenizer for {model}, estimating token counts: {e}")
+            self.tokenizers[model] = tokenizer
+        return self.tokenizers[model]
+
+    def count(self, model, text):
+        tokenizer = self._tokenizer(model)
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class TranscriptContext:
+    def __init__(self, run_blocking, summarize_fn=None, result_cache=None, mode=TRANSCRIPT_CONTEXT_MODE,
+                 budgets=TRANSCRIPT_TOKEN_BUDGETS, reserve_tokens=TRANSCRIPT_RESERVE_TOKENS,
+                 chunk_tokens=TRANSCRIPT_CHUNK_TOKENS, counter=None, max_items=64):
+        # run_blocking(func, *args) runs a blocking call off the event loop;
+        # summarize_fn(model, text, max_words) is a coroutine returning a
+        # summary of text; result_cache (a ResultCache) keeps the summaries
+        self.run_blocking = run_blocking
+        self.summarize_fn = summarize_fn
+        self.result_cache = result_cache
+        self.mode = mode
+        self.budgets = budgets
+        self.reserve_tokens = reserve_tokens
+        self.chunk_tokens = chunk_tokens
+        self.counter = counter or TokenCounter()
+        self.max_items = max_items
+        # Chunked transcripts per (model, transcript hash)
+        self.chunks = OrderedDict()
+        self.in_flight = {}
+
+        # Counters
+        self.full = 0
+        self.selected = 0
+        self.summarized = 0
+        self.summary_calls = 0
+
+    def budget(self, model, num_ctx):
+        if model in self.budgets:
+            return int(self.budgets[model])
+        return max(num_ctx - self.reserve_tokens, 0)
+
+    def _chunk(self, model, transcript):
+        # Groups transcript lines into chunks of about chunk_tokens tokens.
+        # Returns (total tokens, [(text, tokens, word counts)]).
+        chunks = []
+        lines = []
+        tokens = 0
+        for line in transcript.split("\n"):
+            lines.append(line)
+            tokens += self.counter.count(model, line + "\n")
+            if tokens >= self.chunk_tokens:
+                chunks.append(lines)
+                lines = []
+                tokens = 0
+        if lines:
+            chunks.append(lines)
+
+        result = []
+        for lines in chunks:
+            text = "\n".join(lines)
+            result.append((text, self.counter.count(model, text), Counter(words(text))))
+        return self.counter.count(model, transcript), result
+
+    async def _chunks(self, model, transcript):
+        key = (model, hashlib.sha256(transcript.encode("utf-8")).hexdigest())
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+        chunked = await self.run_blocking(self._chunk, model, transcript)
+        self.chunks[key] = chunked
+        while len(self.chunks) > self.max_items:
+            self.chunks.popitem(last=False)
+        return chunked
+
+    def select(self, model, chunks, comment, budget):
+        # Ranks the chunks by the idf-weighted overlap with the comment and
+        # keeps the best ones that fit, in transcript order. Earlier chunks
+        # win ties, so a comment without matches gets the start of the video.
+        document_frequency = Counter()
+        for _, _, counts in chunks:
+            document_frequency.update(counts.keys())
+        terms = set(words(comment))
+
+        def score(chunk):
+            counts = chunk[2]
+            return sum(
+                math.log((len(chunks) + 1) / (document_frequency[term] + 0.5)) * (1 + math.log(counts[term]))
+                for term in terms if counts[term]
+            )
+
+        ranked = sorted(range(len(chunks)), key=lambda i: (-score(chunks[i]), i))
+        gap_tokens = self.counter.count(model, GAP_MARKER)
+        chosen = []
+        used = 0
+        for i in ranked:
+            tokens = chunks[i][1] + gap_tokens
+            if used + tokens <= budget:
+                chosen.append(i)
+                used += tokens
+        return GAP_MARKER.join(chunks[i][0] for i in sorted(chosen))
+
+    async def summary(self, model, chunks, budget, cache_key):
+        # One summary per video and budget, shared by concurrent requests
+        if self.result_cache is not None:
+            cached = await self.run_blocking(self.result_cache.get, cache_key)
+            if cached is not None:
+                return cached["summary"]
+        if cache_key not in self.in_flight:
+            self.in_flight[cache_key] = asyncio.ensure_future(self._summarize(model, chunks, budget, cache_key))
+        return await asyncio.shield(self.in_flight[cache_key])
+
+    async def _summarize(self, model, chunks, budget, cache_key):
+        try:
+            # Summarizes groups of chunks that fit the budget, each into its
+            # share of the budget (about 0.75 words per token)
+            groups = []
+            group = []
+            tokens = 0
+            for text, chunk_tokens, _ in chunks:
+                if group and tokens + chunk_tokens > budget:
+                    groups.append("\n".join(group))
+                    group = []
+                    tokens = 0
+                group.append(text)
+                tokens += chunk_tokens
+            groups.append("\n".join(group))
+
+            max_words = max(int(budget * 0.75 / len(groups)), 20)
+            parts = []
+            for text in groups:
+                parts.append(await self.summarize_fn(model, text, max_words))
+                self.summary_calls += 1
+            summary = "\n".join(parts)
+
+            if self.result_cache is not None:
+                await self.run_blocking(self.result_cache.set, cache_key, {"summary": summary})
+            return summary
+        finally:
+            self.in_flight.pop(cache_key, None)
+
+    async def build(self, transcript, comment, model, num_ctx):
+        # Returns (context text, method) with method "full", "select" or
+        # "summary". Only "select" depends on the comment.
+        if not transcript:
+            return transcript, "full"
+        budget = self.budget(model, num_ctx)
+        total_tokens, chunks = await self._chunks(model, transcript)
+        if total_tokens <= budget:
+            self.full += 1
+            return transcript, "full"
+
+        if self.mode == "summary" and self.summarize_fn is not None:
+            try:
+                summary_key = hashlib.sha256(
+                    json.dumps(["transcript_summary", model, budget, transcript]).encode("utf-8")
+                ).hexdigest()
+                summary = await self.summary(model, chunks, budget, summary_key)
+                if self.counter.count(model, summary) <= budget:
+                    self.summarized += 1
+                    return summary, "summary"
+                logger.warning("Transcript summary is over budget, selecting chunks instead")
+            except Exception as e:
+                logger.warning(f"Could not summarize transcript, selecting chunks instead: {e}")
+
+        self.selected += 1
+        return self.select(model, chunks, comment, budget), "select"
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "budgets": self.budgets,
+            "reserve_tokens": self.reserve_tokens,
+            "chunked_transcripts": len(self.chunks),
+            "full": self.full,
+            "selected": self.selected,
+            "summarized": self.summarized,
+            "summary_calls": self.summary_calls,
+        }